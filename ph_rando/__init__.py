@@ -1,6 +1,18 @@
-from importlib.metadata import PackageNotFoundError, version
+from functools import cache
 
-try:
-    __version__ = version('ph_rando')
-except PackageNotFoundError:
-    __version__ = 'unknown_version'
+
+@cache
+def _get_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version('ph_rando')
+    except PackageNotFoundError:
+        return 'unknown_version'
+
+
+def __getattr__(name: str) -> str:
+    # Looking up the installed version is slow, so only do it when it's actually needed.
+    if name == '__version__':
+        return _get_version()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -2,20 +2,21 @@ from __future__ import annotations
 
 from collections.abc import Callable
 from dataclasses import dataclass
-import json
+from functools import cache
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import click
-import inflection
-
-from ph_rando.settings import Settings
 
 if TYPE_CHECKING:
     from click.decorators import FC
 
+    from ph_rando.settings import FlagSetting, MultipleChoiceSetting, SingleChoiceSetting
     from ph_rando.shuffler.aux_models import Area
 
+    # Loaded lazily, see `__getattr__` below.
+    RANDOMIZER_SETTINGS: dict[str, FlagSetting | SingleChoiceSetting | MultipleChoiceSetting]
+
 
 @dataclass
 class ShufflerAuxData:
@@ -25,17 +26,40 @@ class ShufflerAuxData:
     seed: str | None = None
 
 
-RANDOMIZER_SETTINGS = {
-    setting.name: setting
-    for setting in Settings(
-        **json.loads((Path(__file__).parent / 'settings.json').read_text())
-    ).settings
-}
+@cache
+def load_randomizer_settings(
+    check_hooks: bool = False,
+) -> dict[str, FlagSetting | SingleChoiceSetting | MultipleChoiceSetting]:
+    """
+    Load the randomizer settings from `settings.json`.
+
+    If `check_hooks` is set, also make sure that the patcher and shuffler hooks of each
+    setting exist. This is skipped by default, because it requires importing the entire
+    patcher and shuffler.
+    """
+    from ph_rando.settings import Settings
+
+    return {
+        setting.name: setting
+        for setting in Settings.model_validate_json(
+            (Path(__file__).parent / 'settings.json').read_bytes(),
+            context={'check_hooks': check_hooks},
+        ).settings
+    }
+
+
+def __getattr__(name: str) -> Any:
+    # Settings are loaded on first use, so that importing this module stays cheap.
+    if name == 'RANDOMIZER_SETTINGS':
+        return load_randomizer_settings()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def click_setting_options(function: Callable) -> Callable[[FC], FC]:
     """Generate `click` CLI options for each randomizer setting."""
-    for setting in RANDOMIZER_SETTINGS.values():
+    import inflection
+
+    for setting in load_randomizer_settings().values():
         cli_arg = f'--{inflection.dasherize(inflection.underscore(setting.name))}'
 
         click_option_kwargs = {}
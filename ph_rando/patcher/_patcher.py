@@ -9,7 +9,7 @@ from ph_rando.common import ShufflerAuxData
 from ph_rando.patcher._util import apply_base_patch
 from ph_rando.settings import PatcherHook
 from ph_rando.shuffler._parser import parse_aux_data
-from ph_rando.shuffler.aux_models import Area, Check
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Area, Check
 
 from ._util import patch_items
 
@@ -34,9 +34,10 @@ class Patcher:
         self.aux_data = aux_data
 
         # Figure out which items are still in their vanilla locations, and add them to
-        # a blacklist so we can avoid redundant work.
-        vanilla_areas = {
-            '.'.join([area.name, room.name, chest.name]): chest.contents
+        # a blacklist so we can avoid redundant work. Items are compared by their ids (see
+        # `ItemRegistry`).
+        vanilla_item_ids = {
+            '.'.join([area.name, room.name, chest.name]): ITEM_REGISTRY.id(chest.contents)
             for area in parse_aux_data().areas
             for room in area.rooms
             for chest in room.chests
@@ -46,13 +47,7 @@ class Patcher:
             for room in area.rooms:
                 for chest in room.chests:
                     chest_name = '.'.join([area.name, room.name, chest.name])
-                    if (
-                        vanilla_areas[chest_name].name,
-                        vanilla_areas[chest_name].states,
-                    ) == (
-                        chest.contents.name,
-                        chest.contents.states,
-                    ):
+                    if ITEM_REGISTRY.id(chest.contents) == vanilla_item_ids[chest_name]:
                         self._checks_to_exclude.add(chest)
 
         self.rom = self._apply_base_patch(rom.read_bytes())
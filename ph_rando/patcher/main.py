@@ -5,8 +5,6 @@ import click
 
 from ph_rando.common import click_setting_options
 
-from ._patcher import Patcher
-
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +43,7 @@ def patcher_cli(
     log_level: str,
     **settings: bool | str | set[str],
 ) -> None:
+    from ph_rando.patcher._patcher import Patcher
     from ph_rando.shuffler._shuffler import parse_aux_data
 
     logging.basicConfig(level=logging.getLevelNamesMapping()[log_level])
@@ -5,7 +5,7 @@ import json
 from pathlib import Path
 from typing import TYPE_CHECKING, Annotated, Literal, Protocol, Self, runtime_checkable
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, ValidationInfo, field_validator, model_validator
 
 if TYPE_CHECKING:
     from ph_rando.patcher._patcher import Patcher
@@ -32,15 +32,17 @@ class BaseSetting(BaseModel):
     patcher_hook: str | None = None
     shuffler_hook: str | None = None
 
+    # Checking that hooks exist means importing the patcher/shuffler, so it's only done
+    # when validating with `context={'check_hooks': True}`.
     @field_validator('patcher_hook', mode='before')
-    def import_patcher_hook(cls, v: str | None) -> str | None:
-        if v is not None:
+    def import_patcher_hook(cls, v: str | None, info: ValidationInfo) -> str | None:
+        if v is not None and info.context and info.context.get('check_hooks'):
             assert hasattr(importlib.import_module('ph_rando.patcher._settings'), v)
         return v
 
     @field_validator('shuffler_hook', mode='before')
-    def import_shuffler_hook(cls, v: str | None) -> str | None:
-        if v is not None:
+    def import_shuffler_hook(cls, v: str | None, info: ValidationInfo) -> str | None:
+        if v is not None and info.context and info.context.get('check_hooks'):
             assert hasattr(importlib.import_module('ph_rando.shuffler._settings'), v)
         return v
 
@@ -0,0 +1,140 @@
+"""
+Pools of empty checks, for placing items without logic.
+
+Items that are placed without logic go in a random empty check, picked by its index among
+all empty checks (or among the empty checks in a set of candidates) in the order of the
+logic graph. Rather than collecting every empty check for each item that is placed, the
+empty checks are kept in pools that are updated as checks are filled and emptied. Each pool
+is a Fenwick tree over its checks, so the `i`th empty check can be looked up, and checks
+filled or emptied, in O(log n). Looking up checks by index in the same order as before
+means that the same random numbers pick the same checks.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Node
+    from ph_rando.shuffler.aux_models import Check
+
+
+class CheckPool:
+    """The empty checks among a fixed, ordered list of checks."""
+
+    __slots__ = ('_checks', '_positions', '_empty', '_tree', '_size')
+
+    def __init__(self, checks: Iterable[Check], is_empty: Callable[[Check], bool]) -> None:
+        """
+        Params:
+            checks: Every check in the pool, in order.
+            is_empty: Whether a check starts out empty.
+        """
+        self._checks = list(checks)
+        self._positions = {check: i for i, check in enumerate(self._checks)}
+        self._empty = [is_empty(check) for check in self._checks]
+        self._size = 0
+
+        # `_tree[i]` is the number of empty checks in positions `i - (i & -i)` to `i - 1`
+        self._tree = [0] * (len(self._checks) + 1)
+        for i, empty in enumerate(self._empty, start=1):
+            self._tree[i] += empty
+            parent = i + (i & -i)
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+            self._size += empty
+
+    def __len__(self) -> int:
+        """Return the number of empty checks in the pool."""
+        return self._size
+
+    def __contains__(self, check: Check) -> bool:
+        """Whether `check` is in the pool, and empty."""
+        position = self._positions.get(check)
+        return position is not None and self._empty[position]
+
+    def __getitem__(self, index: int) -> Check:
+        """Return the `index`th empty check in the pool."""
+        if not 0 <= index < self._size:
+            raise IndexError(index)
+
+        # Find the last position with at most `index` empty checks before it
+        position = 0
+        remaining = index
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            next_position = position + step
+            if next_position < len(self._tree) and self._tree[next_position] <= remaining:
+                position = next_position
+                remaining -= self._tree[next_position]
+            step >>= 1
+        return self._checks[position]
+
+    def fill(self, check: Check) -> None:
+        """Remove `check` from the empty checks, if it's part of the pool."""
+        self._update(check, False)
+
+    def empty(self, check: Check) -> None:
+        """Add `check` back to the empty checks, if it's part of the pool."""
+        self._update(check, True)
+
+    def _update(self, check: Check, empty: bool) -> None:
+        position = self._positions.get(check)
+        if position is None or self._empty[position] == empty:
+            return
+        self._empty[position] = empty
+        delta = 1 if empty else -1
+        self._size += delta
+        i = position + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+
+class EmptyChecks:
+    """
+    Every empty check in the logic graph, plus pools of the empty checks among sets of
+    candidates, which are all kept up to date as checks are filled and emptied.
+    """
+
+    def __init__(self, nodes: Iterable[Node], is_empty: Callable[[Check], bool]) -> None:
+        """
+        Params:
+            nodes: Every node of the logic graph, in order.
+            is_empty: Whether a check is currently empty.
+        """
+        self._nodes: dict[Check, Node] = {check: node for node in nodes for check in node.checks}
+        self._is_empty = is_empty
+        self.all = CheckPool(self._nodes, is_empty)
+        self._order = {check: i for i, check in enumerate(self._nodes)}
+        self._subpools: dict[frozenset[Check], CheckPool] = {}
+        # The pools that each check is part of
+        self._pools: dict[Check, list[CheckPool]] = {check: [self.all] for check in self._nodes}
+
+    def node(self, check: Check) -> Node:
+        """Return the node that `check` is in."""
+        return self._nodes[check]
+
+    def subpool(self, candidates: Iterable[Check]) -> CheckPool:
+        """
+        Return the pool of the empty checks among `candidates`, in the order of the logic
+        graph. Pools are created once per set of candidates and reused after that.
+        """
+        key = frozenset(candidates)
+        pool = self._subpools.get(key)
+        if pool is None:
+            pool = self._subpools[key] = CheckPool(
+                sorted(key, key=self._order.__getitem__), self._is_empty
+            )
+            for check in key:
+                self._pools[check].append(pool)
+        return pool
+
+    def fill(self, check: Check) -> None:
+        for pool in self._pools[check]:
+            pool.fill(check)
+
+    def empty(self, check: Check) -> None:
+        for pool in self._pools[check]:
+            pool.empty(check)
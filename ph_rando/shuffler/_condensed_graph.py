@@ -0,0 +1,212 @@
+"""
+Condensed logic graph.
+
+A large share of the edges in the logic graph can always be traversed (e.g. plain
+`A <-> B` links, the edges between connected rooms, mail and shop edges). Nodes that are
+connected to each other in both directions by such edges are always reachable together,
+so searches can treat every strongly connected component of these edges as a single
+`SuperNode`, and only evaluate the edges that leave it.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from typing import TYPE_CHECKING
+
+from ordered_set import OrderedSet
+
+from ph_rando.shuffler._key_logic import KeyLogic
+from ph_rando.shuffler._requirements import ALWAYS, NEVER, Inventory, Requirement
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Edge, Node
+    from ph_rando.shuffler.aux_models import Check
+
+
+class SuperEdge:
+    """An edge between two super nodes, wrapping one edge of the original graph."""
+
+    __slots__ = ('edge', 'dest', 'requirement', 'locked_door')
+
+    def __init__(self, edge: Edge, dest: SuperNode) -> None:
+        assert edge.requirement is not None
+        self.edge = edge
+        self.dest = dest
+        self.requirement: Requirement = edge.requirement
+        self.locked_door = edge.locked_door
+
+    def __repr__(self) -> str:
+        return repr(self.edge)
+
+
+class SuperNode:
+    """A group of nodes that can always reach each other."""
+
+    __slots__ = ('nodes', 'edges')
+
+    def __init__(self, nodes: list[Node]) -> None:
+        self.nodes = nodes
+        # Edges that leave this super node
+        self.edges: list[SuperEdge] = []
+
+    def __repr__(self) -> str:
+        return f'SuperNode({", ".join(node.name for node in self.nodes)})'
+
+    @property
+    def checks(self) -> list[Check]:
+        return [check for node in self.nodes for check in node.checks]
+
+    @property
+    def flags(self) -> set[str]:
+        return {flag for node in self.nodes for flag in node.flags}
+
+    @property
+    def locks(self) -> list[str]:
+        return [node.lock for node in self.nodes if node.lock]
+
+    @property
+    def states_gained(self) -> set[str]:
+        return {state for node in self.nodes for state in node.states_gained}
+
+    @property
+    def states_lost(self) -> set[str]:
+        return {state for node in self.nodes for state in node.states_lost}
+
+
+def _is_free(edge: Edge) -> bool:
+    """Whether `edge` can always be traversed."""
+    return edge.requirement is ALWAYS and not edge.locked_door
+
+
+class CondensedGraph:
+    """
+    The logic graph, with every strongly connected component of always-traversable edges
+    contracted into a `SuperNode`.
+
+    Searching this graph reaches exactly the same set of nodes as searching the original
+    graph, but not necessarily in the same order.
+    """
+
+    def __init__(self, nodes: Iterable[Node]) -> None:
+        """
+        Params:
+            nodes: Every node of the logic graph. The requirements of their edges must have
+                   been compiled already.
+        """
+        nodes = list(nodes)
+
+        self.super_nodes: list[SuperNode] = [
+            SuperNode(component) for component in _strongly_connected_components(nodes)
+        ]
+        self._super_node: dict[Node, SuperNode] = {
+            node: super_node for super_node in self.super_nodes for node in super_node.nodes
+        }
+
+        for super_node in self.super_nodes:
+            free_dests: set[SuperNode] = set()
+            for node in super_node.nodes:
+                for edge in node.edges:
+                    dest = self._super_node[edge.dest]
+                    if dest is super_node or edge.requirement is NEVER:
+                        continue
+                    if _is_free(edge):
+                        # Only one always-traversable edge to each super node is needed
+                        if dest in free_dests:
+                            continue
+                        free_dests.add(dest)
+                    super_node.edges.append(SuperEdge(edge, dest))
+
+    def __len__(self) -> int:
+        return len(self.super_nodes)
+
+    def super_node(self, node: Node) -> SuperNode:
+        """Return the super node that `node` was contracted into."""
+        return self._super_node[node]
+
+    def search(self, inventory: Inventory, key_logic: KeyLogic, start: Node) -> OrderedSet[Node]:
+        """
+        Return every node that is reachable from `start` with the given inventory and keys.
+        This is the same search as `Shuffler._search`, but over super nodes.
+        """
+        reachable: OrderedSet[Node] = OrderedSet()
+
+        start_node = self._super_node[start]
+        queue: deque[SuperNode] = deque([start_node])
+        visited: set[SuperNode] = {start_node}
+
+        while len(queue) > 0:
+            while len(queue) > 0:
+                super_node = queue.popleft()
+                for edge in super_node.edges:
+                    target = edge.dest
+                    if target not in visited and edge.requirement.evaluate(inventory):
+                        if edge.locked_door and not key_logic.reach(edge.edge):
+                            continue
+                        queue.append(target)
+                        visited.add(target)
+                reachable.update(super_node.nodes)
+
+            for raw_edge in key_logic.open_doors(lambda node: self._super_node[node] in visited):
+                target = self._super_node[raw_edge.dest]
+                if target not in visited:
+                    queue.append(target)
+                    visited.add(target)
+
+        return reachable
+
+
+def _strongly_connected_components(nodes: list[Node]) -> list[list[Node]]:
+    """
+    Return the strongly connected components of the graph of always-traversable edges
+    between `nodes` (using an iterative version of Tarjan's algorithm).
+
+    Components are ordered by their first node in `nodes`, and the nodes of each component
+    keep their order in `nodes`.
+    """
+    order = {node: i for i, node in enumerate(nodes)}
+    index: dict[Node, int] = {}
+    lowlink: dict[Node, int] = {}
+    stack: list[Node] = []
+    on_stack: set[Node] = set()
+    components: list[list[Node]] = []
+
+    def successors_of(node: Node) -> Iterator[Node]:
+        return iter([edge.dest for edge in node.edges if _is_free(edge) and edge.dest in order])
+
+    for root in nodes:
+        if root in index:
+            continue
+        # Each frame is a node and an iterator over its remaining free edges
+        work = [(root, successors_of(root))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, successors_of(successor)))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component: list[Node] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.remove(member)
+                        component.append(member)
+                        if member is node:
+                            break
+                    components.append(sorted(component, key=order.__getitem__))
+
+    components.sort(key=lambda component: order[component[0]])
+    return components
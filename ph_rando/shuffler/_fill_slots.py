@@ -0,0 +1,74 @@
+"""
+Compact representation of the item placements of a fill.
+
+During a fill, the item in each check is kept in an array of item ids indexed by check id
+(see `Shuffler.checks` and `ItemRegistry`), rather than in the `contents` of the checks
+themselves. The logic graph is never modified by a fill, so any number of fills can share
+it, and the placements are only turned into aux data once a fill is done (see
+`Shuffler.load_fill_state`).
+
+Every item that is placed is recorded in a journal, so the fill can be saved with
+`FillSlots.checkpoint` and restored with `FillSlots.rollback`: a checkpoint is just the
+length of the journal, and rolling back only touches the checks that were filled after
+it, instead of walking every check.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections.abc import Sequence
+
+# Item id of empty checks
+EMPTY = -1
+
+
+class FillSlots:
+    """The item id in each check, by check id, with a journal of the items placed."""
+
+    __slots__ = ('_slots', '_journal')
+
+    def __init__(self, slots: array[int]) -> None:
+        """
+        Params:
+            slots: The item id in each check. It's updated in place as items are placed.
+        """
+        self._slots = slots
+        self._journal: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __getitem__(self, check_id: int) -> int:
+        """Return the id of the item in the given check, or `EMPTY`."""
+        return self._slots[check_id]
+
+    @property
+    def placements(self) -> Sequence[int]:
+        """Ids of the checks that items were placed in, in the order they were placed."""
+        return self._journal
+
+    def clear(self, check_id: int) -> None:
+        """Empty the given check, without recording it in the journal."""
+        self._slots[check_id] = EMPTY
+
+    def place(self, check_id: int, item_id: int) -> None:
+        """Place an item in the given check, which must be empty."""
+        assert self._slots[check_id] == EMPTY
+        self._slots[check_id] = item_id
+        self._journal.append(check_id)
+
+    def checkpoint(self) -> int:
+        """Return a checkpoint that `rollback` can restore the placements to."""
+        return len(self._journal)
+
+    def rollback(self, checkpoint: int) -> list[int]:
+        """
+        Undo every placement made since `checkpoint`, and return the ids of the checks that
+        were emptied, most recent placement first.
+        """
+        undone = self._journal[checkpoint:]
+        undone.reverse()
+        del self._journal[checkpoint:]
+        for check_id in undone:
+            self._slots[check_id] = EMPTY
+        return undone
@@ -0,0 +1,174 @@
+"""
+Small key logic.
+
+Locked doors (edges with an `open` requirement) can only be traversed by spending one of
+the small keys of the area the door is in. Since the player is free to spend their keys
+on any door they can reach, a door can only be considered open if *every* reachable,
+unopened door in the area can be opened with the keys that are left; otherwise, the
+player could have spent their keys on the wrong doors.
+
+`KeyLogic` also charges the doors it opens against the area's keys for the rest of the
+search. Searches use `RoundKeyLogic` by default instead, which recounts the keys in every
+round of the search the way the search always has, so that seeds keep generating the same
+way; see `Shuffler(strict_key_logic=...)`.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Mapping
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Edge, Node
+
+
+def locked_doors_by_area(edges: Iterable[Edge]) -> dict[str, frozenset[str]]:
+    """Return the names of all locked doors in each area, given every edge of the graph."""
+    doors: defaultdict[str, set[str]] = defaultdict(set)
+    for edge in edges:
+        if edge.locked_door:
+            doors[edge.src.area.name].add(edge.locked_door)
+    return {area: frozenset(area_doors) for area, area_doors in doors.items()}
+
+
+class KeyLogic:
+    """
+    Tracks, for each area, the small keys held and the locked doors that have been
+    reached and opened over the course of a single search.
+    """
+
+    def __init__(self, key_counts: Mapping[str, int], doors: Mapping[str, frozenset[str]]) -> None:
+        """
+        Params:
+            key_counts: The number of small keys held for each area.
+            doors: Every locked door in each area, see `locked_doors_by_area`.
+        """
+        self._key_counts = key_counts
+        self._doors = doors
+        self._opened: defaultdict[str, set[str]] = defaultdict(set)
+        # Edges through reached, but not (yet) opened, doors in each area
+        self._reached: dict[str, list[Edge]] = {}
+
+    def copy(self, key_counts: Mapping[str, int]) -> KeyLogic:
+        """
+        Return a copy of this key logic, which reads the number of small keys from
+        `key_counts` from now on.
+        """
+        key_logic = KeyLogic(key_counts, self._doors)
+        for area, opened in self._opened.items():
+            key_logic._opened[area] = set(opened)
+        key_logic._reached = {area: list(edges) for area, edges in self._reached.items()}
+        return key_logic
+
+    def keys_left(self, area: str) -> int:
+        return self._key_counts.get(area, 0) - len(self._opened[area])
+
+    def is_key_locked(self, area: str) -> bool:
+        """
+        Whether any door in `area` may stay locked, i.e. there are fewer keys left than
+        unopened doors in the entire area. If not, every door in the area is opened once
+        it is reached, without having to count the reached doors.
+        """
+        return self.keys_left(area) < len(self._doors.get(area, ())) - len(self._opened[area])
+
+    def opened_key_locked_doors(self) -> bool:
+        """
+        Whether any door has been opened in an area that doesn't have enough keys left to
+        open all of its doors (see `is_key_locked`). Reaching more of the area's doors could
+        have kept such a door locked, so a search that opened one can't simply be continued
+        once more of the graph becomes reachable.
+        """
+        return any(opened and self.is_key_locked(area) for area, opened in self._opened.items())
+
+    def reach(self, edge: Edge) -> bool:
+        """
+        Record that the locked door of `edge` has been reached (and that the edge's other
+        requirements are met).
+
+        Returns `True` if the door has already been opened, in which case `edge` can be
+        traversed right away. Otherwise, the edge is returned by `open_doors` once the door
+        is opened.
+        """
+        assert edge.locked_door is not None
+        area = edge.src.area.name
+        if edge.locked_door in self._opened[area]:
+            return True
+        self._reached.setdefault(area, []).append(edge)
+        return False
+
+    def open_doors(self, is_visited: Callable[[Node], bool]) -> list[Edge]:
+        """
+        Open the reached doors of every area that has enough keys left to open all of
+        them, and return the edges through the newly opened doors.
+
+        This should only be called once every node that is reachable without opening any
+        more doors has been found, so that all of the doors the player could spend their
+        keys on are taken into account. Doors that only lead to nodes that have been
+        visited in the meantime are no longer counted, since there's no need to open them;
+        this also makes the result independent of the order the search visited nodes in.
+        """
+        edges: list[Edge] = []
+        for area, area_edges in list(self._reached.items()):
+            area_edges = [edge for edge in area_edges if not is_visited(edge.dest)]
+            self._reached[area] = area_edges
+            doors = {edge.locked_door for edge in area_edges} - self._opened[area]
+            # The reached doors are a subset of the area's unopened doors, so `is_key_locked`
+            # holds whenever this does. It can also hold when there are enough keys for the
+            # reached doors but not for every door, which `opened_key_locked_doors` tracks.
+            if self.keys_left(area) < len(doors):
+                continue
+            self._opened[area].update(door for door in doors if door is not None)
+            edges.extend(area_edges)
+            del self._reached[area]
+        return edges
+
+
+class RoundKeyLogic:
+    """
+    Key logic that `Shuffler` searches use unless `strict_key_logic` is set.
+
+    The locked doors reached in a round of a search (everything found before
+    `open_doors` is called) are opened at the end of the round if the area has enough keys
+    for all of them. Keys aren't charged for doors opened in earlier rounds, so a key can
+    open a door in more than one round. Doors that couldn't be opened are forgotten at the
+    end of the round, unless they're reached again.
+    """
+
+    def __init__(self, key_counts: Mapping[str, int]) -> None:
+        """
+        Params:
+            key_counts: The number of small keys held for each area.
+        """
+        self._key_counts = key_counts
+        self._opened: set[str] = set()
+        # Edges through locked doors reached in the current round, in each area
+        self._reached: defaultdict[str, list[Edge]] = defaultdict(list)
+
+    def reach(self, edge: Edge) -> bool:
+        """
+        Record that the locked door of `edge` has been reached. Edges are never traversed
+        right away, even if the door has been opened before; they're returned by
+        `open_doors` at the end of the round instead.
+        """
+        self._reached[edge.src.area.name].append(edge)
+        return False
+
+    def open_doors(self) -> list[Edge]:
+        """
+        End the current round: open the reached doors of every area that has enough keys
+        for all of them, and return every edge reached in the round whose door is open.
+        Nodes behind them are entered again even if they have been visited in the meantime.
+        """
+        for area, edges in self._reached.items():
+            doors = {edge.locked_door for edge in edges}
+            if self._key_counts.get(area, 0) >= len(doors):
+                self._opened.update(door for door in doors if door is not None)
+        edges = [
+            edge
+            for area_edges in self._reached.values()
+            for edge in area_edges
+            if edge.locked_door in self._opened
+        ]
+        self._reached.clear()
+        return edges
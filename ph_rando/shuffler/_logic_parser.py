@@ -0,0 +1,335 @@
+"""
+Hand-written parser for .logic files.
+
+This is a single-pass, line-oriented lexer and recursive descent parser for the
+`area`/`room`/`node`/edge syntax of .logic files, as well as for edge requirement
+expressions. It produces exactly the same output as the (much slower) pyparsing-based
+reference implementations in `_parser.py`, and reports syntax errors with line and
+column numbers.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import cache
+import re
+from typing import Literal
+
+from pydantic import BaseModel
+
+from ph_rando.shuffler._descriptors import EdgeDescriptor, NodeDescriptor
+
+
+# Intermediate representation of a parsed .logic file.
+class _LogicEdge(BaseModel):
+    source_node: str
+    destination_node: str
+    direction: Literal['->', '<->']
+    requirements: str | None = None
+
+
+class _LogicNodeDescriptor(BaseModel):
+    type: str
+    value: str
+
+
+class _LogicNode(BaseModel):
+    name: str
+    descriptors: list[_LogicNodeDescriptor] | None = None
+
+
+class _LogicRoom(BaseModel):
+    name: str
+    nodes_and_edges: list[_LogicNode | _LogicEdge]
+
+    @property
+    def nodes(self) -> list[_LogicNode]:
+        return [n for n in self.nodes_and_edges if isinstance(n, _LogicNode)]
+
+    @property
+    def edges(self) -> list[_LogicEdge]:
+        return [e for e in self.nodes_and_edges if isinstance(e, _LogicEdge)]
+
+
+class _LogicArea(BaseModel):
+    name: str
+    rooms: list[_LogicRoom]
+
+
+class _ParsedLogic(BaseModel):
+    areas: list[_LogicArea]
+
+
+_TOKEN_REGEX = re.compile(r'\s*(?:(<->|->|[:()&|])|([A-Za-z0-9.\[\]]+)|(\S))')
+
+_NAME_REGEX = re.compile(r'[A-Za-z0-9]+')
+_DESCRIPTOR_VALUE_REGEX = re.compile(r'[A-Za-z0-9.]+')
+_REQUIREMENT_VALUE_REGEX = re.compile(r'[A-Za-z0-9\[\]]+')
+
+_NODE_DESCRIPTORS = frozenset(descriptor.value for descriptor in NodeDescriptor)
+_EDGE_DESCRIPTORS = frozenset(descriptor.value for descriptor in EdgeDescriptor)
+
+
+class LogicSyntaxError(Exception):
+    def __init__(self, message: str, line: int, column: int, filename: str = '<logic>') -> None:
+        # All arguments are passed on, so that errors can be pickled (and sent back from the
+        # processes that logic files are parsed in) and copied
+        super().__init__(message, line, column, filename)
+        self.message = message
+        self.line = line
+        self.column = column
+        self.filename = filename
+
+    def __str__(self) -> str:
+        return f'{self.filename}:{self.line}:{self.column}: {self.message}'
+
+
+class _Token:
+    __slots__ = ('text', 'line', 'column', 'end')
+
+    def __init__(self, text: str, line: int, column: int, end: int) -> None:
+        self.text = text
+        self.line = line  # 1-indexed
+        self.column = column  # 1-indexed
+        self.end = end  # 0-indexed offset into the line just past this token
+
+
+class _Lexer:
+    """Lazily splits the lines of a .logic file into tokens."""
+
+    def __init__(self, text: str, filename: str, end_name: str = 'end of file') -> None:
+        self.filename = filename
+        self.end_name = end_name
+        self.lines: list[str] = []
+        for line in text.splitlines():
+            line = line.rstrip()
+            if '#' in line:
+                line = line[: line.index('#')]  # remove any comments
+            self.lines.append(line)
+        self._line = 0
+        self._pos = 0
+        self._peeked: _Token | None = None
+
+    def error(self, message: str, token: _Token | None) -> LogicSyntaxError:
+        if token is None:
+            last_line = self.lines[-1] if self.lines else ''
+            return LogicSyntaxError(
+                f'{message}, found {self.end_name}',
+                max(len(self.lines), 1),
+                len(last_line) + 1,
+                self.filename,
+            )
+        return LogicSyntaxError(
+            f'{message}, found {token.text!r}', token.line, token.column, self.filename
+        )
+
+    def peek(self) -> _Token | None:
+        if self._peeked is None:
+            self._peeked = self._scan()
+        return self._peeked
+
+    def next(self) -> _Token | None:
+        token = self.peek()
+        self._peeked = None
+        return token
+
+    def rest_of_line(self, after: _Token) -> tuple[str, int]:
+        """Consume and return the remainder of the line that `after` is on."""
+        assert self._peeked is None, 'cannot read the rest of a line after peeking'
+        line = self.lines[after.line - 1]
+        rest = line[after.end :]
+        self._line, self._pos = after.line, 0
+        return rest.lstrip(), after.end + len(rest) - len(rest.lstrip()) + 1
+
+    def _scan(self) -> _Token | None:
+        while self._line < len(self.lines):
+            line = self.lines[self._line]
+            match = _TOKEN_REGEX.match(line, self._pos)
+            if match is not None:
+                assert match.lastindex is not None
+                self._pos = match.end()
+                return _Token(
+                    match.group(match.lastindex),
+                    self._line + 1,
+                    match.start(match.lastindex) + 1,
+                    match.end(),
+                )
+            self._line += 1
+            self._pos = 0
+        return None
+
+
+def parse_logic(text: str, filename: str = '<logic>') -> _ParsedLogic:
+    """Parse the contents of a .logic file."""
+    lexer = _Lexer(text, filename)
+
+    areas: list[_LogicArea] = []
+    while lexer.peek() is not None:
+        areas.append(_parse_area(lexer))
+
+    if not areas:
+        raise lexer.error("Expected 'area'", None)
+
+    return _ParsedLogic.model_construct(areas=areas)
+
+
+def _expect(lexer: _Lexer, text: str) -> _Token:
+    token = lexer.next()
+    if token is None or token.text != text:
+        raise lexer.error(f'Expected {text!r}', token)
+    return token
+
+
+def _expect_name(lexer: _Lexer, what: str, regex: re.Pattern[str] = _NAME_REGEX) -> str:
+    token = lexer.next()
+    if token is None or not regex.fullmatch(token.text):
+        raise lexer.error(f'Expected {what}', token)
+    return token.text
+
+
+def _parse_area(lexer: _Lexer) -> _LogicArea:
+    _expect(lexer, 'area')
+    name = _expect_name(lexer, 'area name')
+    _expect(lexer, ':')
+
+    rooms: list[_LogicRoom] = []
+    while (token := lexer.peek()) is not None and token.text == 'room':
+        rooms.append(_parse_room(lexer))
+
+    if not rooms:
+        raise lexer.error("Expected 'room'", lexer.peek())
+
+    return _LogicArea.model_construct(name=name, rooms=rooms)
+
+
+def _parse_room(lexer: _Lexer) -> _LogicRoom:
+    _expect(lexer, 'room')
+    name = _expect_name(lexer, 'room name')
+    _expect(lexer, ':')
+
+    nodes_and_edges: list[_LogicNode | _LogicEdge] = []
+    while (token := lexer.peek()) is not None and token.text not in ('area', 'room'):
+        if token.text == 'node':
+            nodes_and_edges.append(_parse_node(lexer))
+        else:
+            nodes_and_edges.append(_parse_edge(lexer))
+
+    if not nodes_and_edges:
+        raise lexer.error("Expected 'node' or an edge", lexer.peek())
+
+    return _LogicRoom.model_construct(name=name, nodes_and_edges=nodes_and_edges)
+
+
+def _parse_node(lexer: _Lexer) -> _LogicNode:
+    _expect(lexer, 'node')
+    name = _expect_name(lexer, 'node name')
+
+    descriptors: list[_LogicNodeDescriptor] | None = None
+    if (token := lexer.peek()) is not None and token.text == ':':
+        lexer.next()
+        descriptors = []
+        while (token := lexer.peek()) is not None and token.text in _NODE_DESCRIPTORS:
+            lexer.next()
+            value = _expect_name(lexer, 'descriptor value', _DESCRIPTOR_VALUE_REGEX)
+            descriptors.append(_LogicNodeDescriptor.model_construct(type=token.text, value=value))
+        if not descriptors:
+            raise lexer.error('Expected a node descriptor', lexer.peek())
+
+    return _LogicNode.model_construct(name=name, descriptors=descriptors)
+
+
+def _parse_edge(lexer: _Lexer) -> _LogicEdge:
+    source_node = _expect_name(lexer, "'node', 'room', 'area' or an edge")
+
+    direction = lexer.next()
+    if direction is None or direction.text not in ('->', '<->'):
+        raise lexer.error("Expected '->' or '<->'", direction)
+
+    destination_node = _expect_name(lexer, 'destination node name')
+
+    requirements: str | None = None
+    if (token := lexer.peek()) is not None and token.text == ':':
+        colon = lexer.next()
+        assert colon is not None
+        requirements, column = lexer.rest_of_line(colon)
+        if not requirements.strip():
+            raise LogicSyntaxError(
+                "Expected edge requirements after ':'", colon.line, column, lexer.filename
+            )
+        # Make sure the requirements are valid, so that errors have accurate line numbers
+        try:
+            parse_requirement(requirements)
+        except LogicSyntaxError as e:
+            raise LogicSyntaxError(
+                e.message, colon.line, column + e.column - 1, lexer.filename
+            ) from None
+
+    return _LogicEdge.model_construct(
+        source_node=source_node,
+        destination_node=destination_node,
+        direction=direction.text,
+        requirements=requirements,
+    )
+
+
+# Parsed edge requirement, in the same nested-list format as pyparsing's `infix_notation`.
+Requirement = list[str | list]
+
+# A single operand of a requirement; either a `type value` pair or a nested group.
+_Operand = tuple[str, str] | Requirement
+
+
+@cache
+def parse_requirement(requirement: str) -> Requirement:
+    """
+    Parse an edge requirement expression, e.g. `item Bombs & (flag Foo | macro Bar)`.
+
+    `&` binds tighter than `|`. A single requirement (e.g. `item Bombs`) is returned
+    as a flat `[type, value]` list; otherwise the result is a list containing one
+    group, where each group alternates operands and operators, and operands are either
+    flattened `type, value` pairs or nested groups.
+    """
+    lexer = _Lexer(requirement, '<requirement>', end_name='end of requirement')
+    result = _parse_or(lexer)
+    if (token := lexer.peek()) is not None:
+        raise lexer.error("Expected '&', '|' or end of requirement", token)
+    return list(result) if isinstance(result, tuple) else [result]
+
+
+def _parse_or(lexer: _Lexer) -> _Operand:
+    return _parse_group(lexer, '|', _parse_and)
+
+
+def _parse_and(lexer: _Lexer) -> _Operand:
+    return _parse_group(lexer, '&', _parse_operand)
+
+
+def _parse_group(
+    lexer: _Lexer, operator: str, parse_operand: Callable[[_Lexer], _Operand]
+) -> _Operand:
+    operand = parse_operand(lexer)
+    if (token := lexer.peek()) is None or token.text != operator:
+        return operand
+
+    group: Requirement = []
+    while True:
+        if isinstance(operand, tuple):
+            group.extend(operand)
+        else:
+            group.append(operand)
+        if (token := lexer.peek()) is None or token.text != operator:
+            return group
+        lexer.next()
+        group.append(operator)
+        operand = parse_operand(lexer)
+
+
+def _parse_operand(lexer: _Lexer) -> _Operand:
+    token = lexer.next()
+    if token is not None and token.text == '(':
+        result = _parse_or(lexer)
+        _expect(lexer, ')')
+        return result
+    if token is None or token.text not in _EDGE_DESCRIPTORS:
+        raise lexer.error("Expected '(' or a requirement type", token)
+    return token.text, _expect_name(lexer, 'requirement value', _REQUIREMENT_VALUE_REGEX)
@@ -0,0 +1,318 @@
+"""
+NumPy-backed search engine, for running large numbers of searches at once.
+
+Every search in a batch is evaluated in parallel, one bit per search: each requirement,
+node and locked door is represented as a row of 64-bit words, where bit `i` of the row is
+its value in the `i`-th search of the batch.
+
+Requirements are compiled into a circuit of AND/OR gates over the bits of the inventories
+(items, flags, states and item counts), which is evaluated one level at a time. Searches
+then expand the set of visited nodes over every traversable edge at once (with the edges
+stored in CSR form, sorted by destination), until nothing changes. Locked doors are
+handled in between, the same way as `KeyLogic` does.
+
+This is much slower than `Shuffler._search` for a single search, but the cost of a batch
+barely grows with the number of searches in it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+import numpy.typing as npt
+from ordered_set import OrderedSet
+
+from ph_rando.shuffler._requirements import (
+    AllOf,
+    AnyOf,
+    Constant,
+    HasAll,
+    HasAny,
+    HasCount,
+    Inventory,
+    NameIndex,
+    Requirement,
+)
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Node
+
+_Bits = npt.NDArray[np.uint64]
+_Indices = npt.NDArray[np.intp]
+
+_TRUE = 0
+_FALSE = 1
+
+
+def _pack(values: npt.NDArray[np.bool_], words: int) -> _Bits:
+    """Pack a (rows x searches) boolean array into (rows x words) bitsets."""
+    padded = np.zeros((values.shape[0], words * 64), dtype=np.bool_)
+    padded[:, : values.shape[1]] = values
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8')
+
+
+def _unpack(bits: _Bits, searches: int) -> npt.NDArray[np.bool_]:
+    """Inverse of `_pack`."""
+    return np.unpackbits(bits.view(np.uint8), axis=1, bitorder='little')[:, :searches].astype(
+        np.bool_
+    )
+
+
+def _unpack_masks(masks: list[int], bits: int) -> npt.NDArray[np.bool_]:
+    """Return a (bits x masks) boolean array of the lowest `bits` bits of each mask."""
+    size = (bits + 7) // 8
+    buffer = b''.join(mask.to_bytes(size, 'little') for mask in masks)
+    as_bytes = np.frombuffer(buffer, dtype=np.uint8).reshape(len(masks), size)
+    return np.unpackbits(as_bytes, axis=1, bitorder='little')[:, :bits].T.astype(np.bool_)
+
+
+def _mask_bits(mask: int) -> list[int]:
+    """Return the positions of the set bits of `mask`."""
+    return [i for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+class _Circuit:
+    """Requirements, compiled into levels of AND/OR gates over the bits of inventories."""
+
+    def __init__(self, index: NameIndex) -> None:
+        self.index = index
+        # Rows 0 and 1 are the constants, followed by the inventory's items, flags, states
+        # and item count thresholds; every other row is the output of a gate.
+        offset = 2
+        self.item_rows = list(range(offset, offset + len(index.items)))
+        offset += len(index.items)
+        self.flag_rows = list(range(offset, offset + len(index.flags)))
+        offset += len(index.flags)
+        self.state_rows = list(range(offset, offset + len(index.states)))
+        offset += len(index.states)
+        self.count_thresholds: dict[tuple[int, int], int] = {}
+        self.rows = offset
+
+        # Gates, by level; each is a list of (output row, operator, input rows)
+        self._levels: list[list[tuple[int, str, list[int]]]] = []
+        # Output row and level of each distinct gate, so that shared subexpressions are
+        # only evaluated once
+        self._gate_rows: dict[str, tuple[int, int]] = {}
+        self._row_levels: dict[int, int] = {}
+
+        self._compiled_levels: list[tuple[str, _Indices, _Indices, _Indices]] = []
+
+    def _level(self, row: int) -> int:
+        return self._row_levels.get(row, 0)
+
+    def _gate(self, operator: str, inputs: list[int]) -> int:
+        inputs = list(dict.fromkeys(inputs))
+        if len(inputs) == 1:
+            return inputs[0]
+        key = f'{operator}{inputs}'
+        if key in self._gate_rows:
+            return self._gate_rows[key][0]
+        row = self.rows
+        self.rows += 1
+        level = 1 + max(self._level(i) for i in inputs)
+        while len(self._levels) < level:
+            self._levels.append([])
+        self._levels[level - 1].append((row, operator, inputs))
+        self._gate_rows[key] = (row, level)
+        self._row_levels[row] = level
+        return row
+
+    def _mask_rows(self, requirement: HasAll | HasAny) -> list[int]:
+        return (
+            [self.item_rows[i] for i in _mask_bits(requirement.items)]
+            + [self.flag_rows[i] for i in _mask_bits(requirement.flags)]
+            + [self.state_rows[i] for i in _mask_bits(requirement.states)]
+        )
+
+    def add(self, requirement: Requirement) -> int:
+        """Compile `requirement` and return the row of its value."""
+        match requirement:
+            case Constant():
+                return _TRUE if requirement.value else _FALSE
+            case HasAll():
+                rows = self._mask_rows(requirement)
+                return self._gate('&', rows) if rows else _TRUE
+            case HasAny():
+                rows = self._mask_rows(requirement)
+                return self._gate('|', rows) if rows else _FALSE
+            case HasCount():
+                key = (requirement.slot, requirement.count)
+                if key not in self.count_thresholds:
+                    self.count_thresholds[key] = self.rows
+                    self.rows += 1
+                return self.count_thresholds[key]
+            case AllOf():
+                return self._gate('&', [self.add(r) for r in requirement.requirements])
+            case AnyOf():
+                return self._gate('|', [self.add(r) for r in requirement.requirements])
+        raise ValueError(f'Requirement "{requirement}" cannot be evaluated')
+
+    def compile(self) -> None:
+        """Prepare the gates for `evaluate`, once every requirement has been added."""
+        for gates in self._levels:
+            for operator in ('&', '|'):
+                selected = [gate for gate in gates if gate[1] == operator]
+                if not selected:
+                    continue
+                outputs = np.array([row for row, _, _ in selected], dtype=np.intp)
+                inputs = np.array([i for _, _, rows in selected for i in rows], dtype=np.intp)
+                starts = np.cumsum([0] + [len(rows) for _, _, rows in selected[:-1]])
+                self._compiled_levels.append((operator, outputs, inputs, starts.astype(np.intp)))
+
+    def evaluate(self, inventories: Sequence[Inventory], words: int) -> _Bits:
+        """Return the value of every row for each of the given inventories."""
+        atoms = np.zeros((self.rows, len(inventories)), dtype=np.bool_)
+        atoms[_TRUE] = True
+        for rows, masks in (
+            (self.item_rows, [inventory.items for inventory in inventories]),
+            (self.flag_rows, [inventory.flags for inventory in inventories]),
+            (self.state_rows, [inventory.states for inventory in inventories]),
+        ):
+            if rows:
+                atoms[rows[0] : rows[-1] + 1] = _unpack_masks(masks, len(rows))
+        if self.count_thresholds:
+            counts = np.array([inventory.counts for inventory in inventories], dtype=np.int64)
+            for (slot, count), row in self.count_thresholds.items():
+                atoms[row] = counts[:, slot] >= count
+
+        values = _pack(atoms, words)
+        values[_TRUE] = np.uint64(0xFFFF_FFFF_FFFF_FFFF)
+        for operator, outputs, inputs, starts in self._compiled_levels:
+            reduce = np.bitwise_and if operator == '&' else np.bitwise_or
+            values[outputs] = reduce.reduceat(values[inputs], starts, axis=0)
+        return values
+
+
+class NumpySearch:
+    """
+    Search engine over the logic graph, see the module docstring.
+
+    Reaches the same nodes as `Shuffler._search`, but returns them in graph order rather
+    than in the order they were reached.
+    """
+
+    def __init__(
+        self,
+        nodes: Iterable[Node],
+        index: NameIndex,
+        locked_doors: Mapping[str, frozenset[str]],
+    ) -> None:
+        """
+        Params:
+            nodes: Every node of the logic graph. The requirements of their edges must have
+                   been compiled already.
+            index: The `NameIndex` that the requirements were compiled with.
+            locked_doors: Every locked door in each area, see `locked_doors_by_area`.
+        """
+        self.nodes: list[Node] = list(nodes)
+        self._node_index = {node: i for i, node in enumerate(self.nodes)}
+        self._circuit = _Circuit(index)
+
+        self._areas = sorted(locked_doors)
+        doors = [(area, door) for area in self._areas for door in sorted(locked_doors[area])]
+        door_index = {door: i for i, (_, door) in enumerate(doors)}
+        self._door_areas = np.array([self._areas.index(area) for area, _ in doors], dtype=np.intp)
+        self._area_starts = np.searchsorted(self._door_areas, np.arange(len(self._areas)))
+
+        # (source, destination, requirement row, door) of every edge that can be traversed
+        edges: list[tuple[int, int, int, int]] = []
+        for node in self.nodes:
+            for edge in node.edges:
+                assert edge.requirement is not None
+                row = self._circuit.add(edge.requirement)
+                if row == _FALSE or edge.dest not in self._node_index:
+                    continue
+                door = -1 if edge.locked_door is None else door_index[edge.locked_door]
+                edges.append((self._node_index[node], self._node_index[edge.dest], row, door))
+        self._circuit.compile()
+
+        # Sort by destination, so that edges can be reduced into their destination nodes
+        edges.sort(key=lambda edge: edge[1])
+        self._src = np.array([e[0] for e in edges], dtype=np.intp)
+        self._dest = np.array([e[1] for e in edges], dtype=np.intp)
+        self._requirement = np.array([e[2] for e in edges], dtype=np.intp)
+        # Index into the rows of opened doors, the last of which is always set
+        self._door = np.array([len(doors) if e[3] == -1 else e[3] for e in edges], dtype=np.intp)
+        self._dest_nodes, self._dest_starts = np.unique(self._dest, return_index=True)
+
+        # Edges through locked doors, sorted by door
+        locked = sorted((e[3], i) for i, e in enumerate(edges) if e[3] != -1)
+        self._locked_edges = np.array([i for _, i in locked], dtype=np.intp)
+        locked_doors_of_edges = np.array([door for door, _ in locked], dtype=np.intp)
+        self._locked_doors, self._locked_door_starts = np.unique(
+            locked_doors_of_edges, return_index=True
+        )
+        self._doors = len(doors)
+
+    def search(
+        self, inventory: Inventory, key_counts: Mapping[str, int], start: Node
+    ) -> OrderedSet[Node]:
+        """Return every node that is reachable from `start`, like `Shuffler._search`."""
+        reachable = self.search_many([(inventory, key_counts)], start)[0]
+        return OrderedSet([self.nodes[i] for i in np.flatnonzero(reachable)])
+
+    def search_many(
+        self, searches: Sequence[tuple[Inventory, Mapping[str, int]]], start: Node
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Run a search for each (inventory, small key counts) pair in `searches`.
+
+        Returns a (searches x nodes) boolean array of whether each node in `nodes` is
+        reachable in each search.
+        """
+        count = len(searches)
+        words = max(1, (count + 63) // 64)
+        values = self._circuit.evaluate([inventory for inventory, _ in searches], words)
+        edge_requirements = values[self._requirement]
+
+        keys = np.array(
+            [[key_counts.get(area, 0) for area in self._areas] for _, key_counts in searches],
+            dtype=np.int64,
+        ).T.reshape(len(self._areas), count)
+        opened = np.zeros((self._doors, count), dtype=np.bool_)
+        open_doors = np.full((self._doors + 1, words), 0xFFFF_FFFF_FFFF_FFFF, dtype=np.uint64)
+        open_doors[: self._doors] = 0
+
+        visited = np.zeros((len(self.nodes), words), dtype=np.uint64)
+        visited[self._node_index[start]] = 0xFFFF_FFFF_FFFF_FFFF
+
+        while True:
+            traversable = edge_requirements & open_doors[self._door]
+            while True:
+                active = traversable & visited[self._src]
+                incoming = np.bitwise_or.reduceat(active, self._dest_starts, axis=0)
+                updated = visited[self._dest_nodes] | incoming
+                if np.array_equal(updated, visited[self._dest_nodes]):
+                    break
+                visited[self._dest_nodes] = updated
+
+            if not len(self._locked_edges):
+                break
+
+            # Open the reached doors of each area that has enough keys for all of them, only
+            # counting the doors that lead to a node that hasn't been visited yet
+            locked = self._locked_edges
+            reached = (
+                edge_requirements[locked]
+                & visited[self._src[locked]]
+                & ~visited[self._dest[locked]]
+            )
+            reached_doors = np.zeros((self._doors, words), dtype=np.uint64)
+            reached_doors[self._locked_doors] = np.bitwise_or.reduceat(
+                reached, self._locked_door_starts, axis=0
+            )
+            new_doors = _unpack(reached_doors, count) & ~opened
+            if not new_doors.any():
+                break
+            new_counts = np.add.reduceat(new_doors.astype(np.int64), self._area_starts, axis=0)
+            keys_left = keys - np.add.reduceat(opened.astype(np.int64), self._area_starts, axis=0)
+            can_open = (keys_left >= new_counts)[self._door_areas]
+            newly_opened = new_doors & can_open
+            if not newly_opened.any():
+                break
+            opened |= newly_opened
+            open_doors[: self._doors] = _pack(opened, words)
+
+        return _unpack(visited, count).T
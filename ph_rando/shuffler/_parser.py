@@ -1,19 +1,25 @@
 from __future__ import annotations
 
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from functools import cache, cached_property
+from functools import cache, cached_property, partial
+import hashlib
 import json
 import logging
+import os
 from pathlib import Path
+import pickle
 import re
-from typing import TYPE_CHECKING, Literal
-
-from pydantic import BaseModel
-import pyparsing as pp
+from typing import TYPE_CHECKING, Protocol, TypeVar
 
+from ph_rando import __version__
 from ph_rando.common import ShufflerAuxData
 from ph_rando.patcher._items import ITEMS
 from ph_rando.shuffler._descriptors import EdgeDescriptor, NodeDescriptor
+from ph_rando.shuffler._logic_parser import _ParsedLogic, parse_logic, parse_requirement
+from ph_rando.shuffler._requirements import Requirement, RequirementCompiler
 from ph_rando.shuffler.aux_models import Area, Check, Enemy, Exit, Room
 
 if TYPE_CHECKING:
@@ -28,8 +34,24 @@ logger = logging.getLogger(__name__)
 # TODO: make this a configurable setting in shuffler
 MAILBOX_NODE_NAME = 'Mail.Mail.Mail'
 
+# Default locations of the logic and aux data that ship with the randomizer.
+LOGIC_DIRECTORY = Path(__file__).parent / 'logic'
+ENEMY_MAPPING_FILE = Path(__file__).parent / 'enemies.json'
+MACROS_FILE = Path(__file__).parent / 'macros.json'
 
-@dataclass
+# Environment variable that overrides the number of processes used to load the aux data
+# and logic files (see `_load_files`). `1` loads them in the current process.
+LOADER_WORKERS_ENV_VAR = 'PH_RANDO_LOADER_WORKERS'
+
+# Fewer files than this are always loaded in the current process, since starting a pool
+# costs more than loading them. See `scripts/benchmark_loader.py`.
+MIN_PARALLEL_FILES = 32
+
+
+# Nodes compare and hash by identity: searches hash nodes constantly, and this lets them do
+# so without calling into Python. Nodes are unique by name within a logic graph, but the
+# nodes (and so the rooms) of two logic graphs are never equal; compare them by name instead.
+@dataclass(slots=True, eq=False)
 class Node:
     name: str
     area: Area
@@ -46,20 +68,16 @@ class Node:
     mailbox: bool = False
     shops: set[str] = field(default_factory=set)
 
-    def __hash__(self) -> int:
-        return hash(self.name)
-
-    def __eq__(self, __o: object) -> bool:
-        if isinstance(__o, Node):
-            return __o.name == self.name
-        raise Exception('Invalid comparison')
-
 
 @dataclass
 class Edge:
     src: Node
     dest: Node
     requirements: list[str | list[str | list]] | None
+    # Compiled form of `requirements`, see `compile_requirements`
+    requirement: Requirement | None = field(default=None, compare=False)
+    # The .logic file that defines this edge (relative to the logic directory), if any
+    logic_file: str | None = field(default=None, compare=False)
 
     def __repr__(self) -> str:
         return f'{self.src.name} -> {self.dest.name}'
@@ -80,16 +98,20 @@ class Edge:
             flags: A set of strings containing all `flags` that are logically set.
 
         """
-        if self.requirements is not None and len(self.requirements):
-            return requirements_met(
-                parsed_expr=self.requirements,
-                items=items,
-                flags=flags,
-                states=states,
-                shuffler_instance=shuffler_instance,
-                edge_instance=self,
+        if self.requirement is None:
+            compiler = RequirementCompiler(
+                macros=shuffler_instance.aux_data.requirement_macros,
+                enemy_requirements=shuffler_instance.aux_data.enemy_requirements,
+                settings=shuffler_instance.settings,
+                index=shuffler_instance.requirement_index,
             )
-        return True
+            requirement = compiler.compile_edge(self)
+            if compiler.errors:
+                raise Exception('\n'.join(compiler.errors))
+            self.requirement = requirement
+        return self.requirement.evaluate(
+            shuffler_instance.requirement_index.inventory(items, flags, states)
+        )
 
     @cached_property
     def locked_door(self) -> str | None:
@@ -120,6 +142,8 @@ class Edge:
         Creating this object is relatively expensive, so we cache it to ensure that
         it's only created once.
         """
+        import pyparsing as pp  # only needed by the reference implementations
+
         edge_item = None
         for edge_descriptor in EdgeDescriptor:
             if edge_item is None:
@@ -136,6 +160,9 @@ class Edge:
         )
 
 
+# `requirements_met` and `evaluate_requirement` interpret parsed requirements directly. They
+# are kept as the reference implementation of edge requirement semantics for the compiled
+# requirements in `_requirements.py`, which are what the shuffler actually uses.
 def requirements_met(
     parsed_expr: list[str | list[str | list]],
     items: list[str],
@@ -285,58 +312,35 @@ def evaluate_requirement(
             return True
 
 
-@cache
 def parse_edge_requirement(requirement: str) -> list[str | list[str | list]]:
     """
     Parse an edge requirement into a recursive list of strings for further processing
     by the Edge._evaluate_requirement() method.
-    """
-    parser = Edge.get_edge_parser()
-    return parser.parse_string(requirement, parse_all=True).as_list()
-
-
-# Helper classes for parsing dict outputted by pyparsing.
-class _LogicEdge(BaseModel):
-    source_node: str
-    destination_node: str
-    direction: Literal['->', '<->']
-    requirements: str | None = None
-
-
-class _LogicNodeDescriptor(BaseModel):
-    type: str
-    value: str
-
-
-class _LogicNode(BaseModel):
-    name: str
-    descriptors: list[_LogicNodeDescriptor] | None = None
-
-
-class _LogicRoom(BaseModel):
-    name: str
-    nodes_and_edges: list[_LogicNode | _LogicEdge]
-
-    @property
-    def nodes(self) -> list[_LogicNode]:
-        return [n for n in self.nodes_and_edges if isinstance(n, _LogicNode)]
 
-    @property
-    def edges(self) -> list[_LogicEdge]:
-        return [e for e in self.nodes_and_edges if isinstance(e, _LogicEdge)]
+    See `Edge.get_edge_parser()` for the (slower) pyparsing-based reference implementation.
+    """
+    return parse_requirement(requirement)
 
 
-class _LogicArea(BaseModel):
-    name: str
-    rooms: list[_LogicRoom]
+def _parse_logic_file(logic_file_contents: str) -> _ParsedLogic:
+    """
+    Parse the contents of a .logic file using pyparsing.
 
+    This is the reference implementation of the grammar; `annotate_logic` uses the much
+    faster hand-written parser in `_logic_parser.py`, which must produce identical output.
+    """
+    lines: list[str] = []
 
-class _ParsedLogic(BaseModel):
-    areas: list[_LogicArea]
+    for line in logic_file_contents.splitlines():
+        line = line.strip()  # strip off leading and trailing whitespace
+        if '#' in line:
+            line = line[: line.index('#')]  # remove any comments
+        if line:
+            lines.append(line)
 
+    logic_file_contents = '\n'.join(lines)
 
-def _parse_logic_file(logic_file_contents: str) -> _ParsedLogic:
-    from ph_rando.shuffler._descriptors import NodeDescriptor
+    import pyparsing as pp  # only needed by the reference implementations
 
     edge_parser = (
         pp.Word(pp.alphanums)('source_node')
@@ -382,40 +386,153 @@ def _parse_logic_file(logic_file_contents: str) -> _ParsedLogic:
     return _ParsedLogic(**parsed)
 
 
-def annotate_logic(areas: list[Area], logic_directory: Path | None = None) -> None:
+class _Named(Protocol):
+    name: str
+
+
+_T = TypeVar('_T', bound=_Named)
+
+
+_R = TypeVar('_R')
+
+
+def _load_files(load: Callable[[Path], _R], files: list[Path], workers: int | None) -> list[_R]:
     """
-    Parse .logic files and annotate the given aux data with them.
+    Call `load` on every file in `files`, in a pool of `workers` processes.
 
-    First, the `parse_logic` function parses the .logic files into an intermediate
-    `ParsedLogic` object. Then, it annotates the list of aux `Rooms` with the nodes
-    from `ParsedLogic`.
+    If `workers` is `None`, the `PH_RANDO_LOADER_WORKERS` environment variable is used, or
+    one worker per CPU if it isn't set. If only one worker would be used, or there are fewer
+    than `MIN_PARALLEL_FILES` files, the files are loaded serially in the current process.
+    Either way, the results are returned in the same order as `files`.
     """
-    from ph_rando.shuffler._shuffler import Edge, Node
+    if workers is None:
+        workers = int(os.environ.get(LOADER_WORKERS_ENV_VAR, 0)) or os.cpu_count() or 1
+    workers = min(workers, len(files))
 
-    if logic_directory is None:
-        logic_directory = Path(__file__).parent / 'logic'
+    if workers <= 1 or len(files) < MIN_PARALLEL_FILES:
+        return [load(file) for file in files]
 
-    for file in logic_directory.rglob('*.logic'):
-        lines: list[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(load, files, chunksize=-(-len(files) // workers)))
 
-        for line in file.read_text().splitlines():
-            line = line.strip()  # strip off leading and trailing whitespace
-            if '#' in line:
-                line = line[: line.index('#')]  # remove any comments
-            if line:
-                lines.append(line)
 
-        file_contents = '\n'.join(lines)
+# Previously validated aux data files, as a mapping of content hash to pickled `Area`.
+# See `_load_area_file`.
+_validated_areas: dict[str, bytes] = {}
 
-        parsed_logic = _parse_logic_file(file_contents)
 
+@cache
+def _validation_inputs_digest() -> bytes:
+    """
+    Return a hash of everything besides the aux data file itself that validating it depends
+    on: the item table that item names are checked against (see `Item`), and the enemy
+    types that enemies are checked against (see `Enemy`).
+    """
+    digest = hashlib.sha256(f'{__version__}:'.encode())
+    digest.update(json.dumps(ITEMS, sort_keys=True).encode())
+    digest.update(hashlib.sha256(ENEMY_MAPPING_FILE.read_bytes()).digest())
+    return digest.digest()
+
+
+def _load_area_file(file: Path, records_directory: Path | None = None) -> Area:
+    """
+    Load and validate an aux data file.
+
+    Validation only happens the first time a file with any given contents is seen. The
+    validated `Area` is recorded under the hash of the file's contents and of everything
+    else that validation depends on (see `_validation_inputs_digest`), in memory and, if
+    `records_directory` is given, on disk. Later loads of identical contents are served
+    from that record. Changed files hash differently, so they're always validated.
+    """
+    contents = file.read_bytes()
+    digest = hashlib.sha256(_validation_inputs_digest() + contents).hexdigest()
+    record_file = records_directory / f'{digest}.area' if records_directory else None
+
+    record = _validated_areas.get(digest)
+    if record is None and record_file is not None and record_file.exists():
+        record = _validated_areas[digest] = record_file.read_bytes()
+    if record is not None:
+        try:
+            return pickle.loads(record)
+        except Exception:
+            logger.warning(f'Failed to load validated record of {file}, ignoring it')
+
+    area = Area.model_validate_json(contents)
+
+    record = _validated_areas[digest] = pickle.dumps(area, protocol=pickle.HIGHEST_PROTOCOL)
+    if record_file is not None:
+        record_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = record_file.with_name(f'{record_file.name}.{os.getpid()}.tmp')
+        tmp_file.write_bytes(record)
+        os.replace(tmp_file, record_file)
+
+    return area
+
+
+def _load_logic_file(file: Path) -> _ParsedLogic:
+    return parse_logic(file.read_text(), filename=str(file))
+
+
+def _first_by_name(objects: Iterable[_T]) -> dict[str, _T]:
+    """Index `objects` by their `name`, keeping the first object with any given name."""
+    index: dict[str, _T] = {}
+    for obj in objects:
+        index.setdefault(obj.name, obj)
+    return index
+
+
+def _index_nodes(areas: list[Area]) -> dict[str, Node]:
+    """Return a mapping of full node name (`Area.Room.Node`) to node."""
+    return _first_by_name(node for area in areas for room in area.rooms for node in room.nodes)
+
+
+def annotate_logic(
+    areas: list[Area], logic_directory: Path | None = None, workers: int | None = None
+) -> None:
+    """
+    Parse .logic files and annotate the given aux data with them.
+
+    First, the `parse_logic` function parses the .logic files into an intermediate
+    `ParsedLogic` object (in parallel, see `_load_files`). Then, it annotates the list
+    of aux `Rooms` with the nodes from `ParsedLogic`.
+    """
+    from ph_rando.shuffler._shuffler import Edge, Node
+
+    if logic_directory is None:
+        logic_directory = LOGIC_DIRECTORY
+
+    areas_by_name: dict[str, list[Area]] = defaultdict(list)
+    for area in areas:
+        areas_by_name[area.name].append(area)
+
+    # Lookup tables for each room, built the first time the room is encountered.
+    # Keyed by `id()`, because aux models aren't hashable.
+    rooms_by_name: dict[int, dict[str, Room]] = {}
+    room_chests: dict[int, dict[str, Check]] = {}
+    room_exits: dict[int, dict[str, Exit]] = {}
+    room_enemies: dict[int, dict[str, Enemy]] = {}
+    room_nodes: dict[int, dict[str, Node]] = {}
+
+    logic_files = list(logic_directory.rglob('*.logic'))
+    for logic_file, parsed_logic in zip(
+        logic_files, _load_files(_load_logic_file, logic_files, workers), strict=True
+    ):
+        logic_file_name = logic_file.relative_to(logic_directory).as_posix()
         for logic_area in parsed_logic.areas:
-            _areas = [area for area in areas if area.name == logic_area.name]
+            _areas = areas_by_name.get(logic_area.name, [])
             assert len(_areas), f'Area {logic_area.name} not found!'
             assert len(_areas) == 1, f'Multiple areas with name "{logic_area.name}" found!'
             area = _areas[0]
+            if id(area) not in rooms_by_name:
+                rooms_by_name[id(area)] = _first_by_name(area.rooms)
             for logic_room in logic_area.rooms:
-                room = [room for room in area.rooms if room.name == logic_room.name][0]
+                room = rooms_by_name[id(area)][logic_room.name]
+                if id(room) not in room_nodes:
+                    room_chests[id(room)] = _first_by_name(room.chests)
+                    room_exits[id(room)] = _first_by_name(room.exits)
+                    room_enemies[id(room)] = _first_by_name(room.enemies)
+                    room_nodes[id(room)] = {}
+                nodes = room_nodes[id(room)]
                 for logic_node in logic_room.nodes:
                     full_node_name = '.'.join([logic_area.name, logic_room.name, logic_node.name])
                     node = Node(name=full_node_name, area=area, room=room)
@@ -423,14 +540,8 @@ def annotate_logic(areas: list[Area], logic_directory: Path | None = None) -> No
                         match descriptor.type:
                             case NodeDescriptor.CHEST:
                                 try:
-                                    node.checks.append(
-                                        [
-                                            check
-                                            for check in room.chests
-                                            if check.name == descriptor.value
-                                        ][0]
-                                    )
-                                except IndexError:
+                                    node.checks.append(room_chests[id(room)][descriptor.value])
+                                except KeyError:
                                     raise Exception(
                                         f'{node.area.name}.{room.name}: '
                                         f'{descriptor.type} {descriptor.value!r} '
@@ -454,12 +565,8 @@ def annotate_logic(areas: list[Area], logic_directory: Path | None = None) -> No
                                     NodeDescriptor.EXIT,
                                 ):
                                     try:
-                                        new_exit = [
-                                            exit
-                                            for exit in room.exits
-                                            if exit.name == descriptor.value
-                                        ][0]
-                                    except IndexError:
+                                        new_exit = room_exits[id(room)][descriptor.value]
+                                    except KeyError:
                                         raise Exception(
                                             f'{node.area.name}.{node.room.name}: '
                                             f'{descriptor.type} {descriptor.value!r} '
@@ -482,14 +589,8 @@ def annotate_logic(areas: list[Area], logic_directory: Path | None = None) -> No
                                 node.lock = descriptor.value
                             case NodeDescriptor.ENEMY:
                                 try:
-                                    node.enemies.append(
-                                        [
-                                            enemy
-                                            for enemy in room.enemies
-                                            if enemy.name == descriptor.value
-                                        ][0]
-                                    )
-                                except IndexError:
+                                    node.enemies.append(room_enemies[id(room)][descriptor.value])
+                                except KeyError:
                                     raise Exception(
                                         f'{node.area.name}.{room.name}: '
                                         f'{descriptor.type} {descriptor.value!r} '
@@ -515,47 +616,42 @@ def annotate_logic(areas: list[Area], logic_directory: Path | None = None) -> No
                                     )
                                 logger.warning(f'Node descriptor {other!r} not implemented yet.')
                     room.nodes.append(node)
+                    nodes.setdefault(logic_node.name, node)
                 for edge in logic_room.edges:
-                    for node1 in room.nodes:
-                        if node1.name.split('.')[2] == edge.source_node:
-                            for node2 in room.nodes:
-                                if node2.name.split('.')[2] == edge.destination_node:
-                                    node1.edges.append(
-                                        Edge(
-                                            src=node1,
-                                            dest=node2,
-                                            requirements=(
-                                                parse_edge_requirement(edge.requirements)
-                                                if edge.requirements
-                                                else None
-                                            ),
-                                        )
-                                    )
-                                    if edge.direction == '<->':
-                                        node2.edges.append(
-                                            Edge(
-                                                src=node2,
-                                                dest=node1,
-                                                requirements=(
-                                                    parse_edge_requirement(edge.requirements)
-                                                    if edge.requirements
-                                                    else None
-                                                ),
-                                            )
-                                        )
-                                    break
-                            else:
-                                raise Exception(
-                                    f'{area.name}.{room.name}: '
-                                    f"node {edge.destination_node} doesn't exist"
-                                )
-                            break
-                    else:
+                    if (node1 := nodes.get(edge.source_node)) is None:
                         raise Exception(
                             f'{area.name}.{room.name}: ' f"node {edge.source_node} doesn't exist"
                         )
-                if f'{area.name}.{room.name}' not in [f'{area.name}.{r.name}' for r in area.rooms]:
-                    area.rooms.append(room)
+                    if (node2 := nodes.get(edge.destination_node)) is None:
+                        raise Exception(
+                            f'{area.name}.{room.name}: '
+                            f"node {edge.destination_node} doesn't exist"
+                        )
+                    node1.edges.append(
+                        Edge(
+                            src=node1,
+                            dest=node2,
+                            requirements=(
+                                parse_edge_requirement(edge.requirements)
+                                if edge.requirements
+                                else None
+                            ),
+                            logic_file=logic_file_name,
+                        )
+                    )
+                    if edge.direction == '<->':
+                        node2.edges.append(
+                            Edge(
+                                src=node2,
+                                dest=node1,
+                                requirements=(
+                                    parse_edge_requirement(edge.requirements)
+                                    if edge.requirements
+                                    else None
+                                ),
+                                logic_file=logic_file_name,
+                            )
+                        )
 
 
 def connect_rooms(areas: list[Area]) -> None:
@@ -565,25 +661,14 @@ def connect_rooms(areas: list[Area]) -> None:
     Any entrance randomization should take place *before* this
     function is called.
     """
-
-    def _get_dest_node(dest_node_entrance: str) -> Node:
-        dest_node_split = dest_node_entrance.split('.')
-
-        area_name = dest_node_split[0]
-        room_name = dest_node_split[1]
-
-        dest_node_name = '.'.join(dest_node_split[:-1])
-
-        for area in areas:
-            if area.name == area_name:
-                for room in area.rooms:
-                    if room.name == room_name:
-                        for node in room.nodes:
-                            if dest_node_name == node.name:
-                                for entrance in node.entrances:
-                                    if entrance == dest_node_entrance:
-                                        return node
-        raise Exception(f'Entrance {dest_node_entrance!r} not found')
+    # Entrances are named after the node they belong to (`Area.Room.Node.Entrance`),
+    # so each one uniquely identifies its destination node.
+    entrance_nodes: dict[str, Node] = {}
+    for area in areas:
+        for room in area.rooms:
+            for node in room.nodes:
+                for entrance in node.entrances:
+                    entrance_nodes.setdefault(entrance, node)
 
     for area in areas:
         for room in area.rooms:
@@ -591,35 +676,18 @@ def connect_rooms(areas: list[Area]) -> None:
                 for exit in src_node.exits:
                     if not len(exit.entrance):
                         raise Exception(f'exit {exit.name!r} has no "link".')
-                    src_node.edges.append(
-                        Edge(src=src_node, dest=_get_dest_node(exit.entrance), requirements=None)
-                    )
+                    if (dest_node := entrance_nodes.get(exit.entrance)) is None:
+                        raise Exception(f'Entrance {exit.entrance!r} not found')
+                    src_node.edges.append(Edge(src=src_node, dest=dest_node, requirements=None))
 
 
 def connect_mail_nodes(areas: list[Area], mail_node_name: str = MAILBOX_NODE_NAME) -> None:
     """Connect all nodes with a `mail` descriptor to the "Mail" node."""
-    mailbox_node: Node | None = None
+    mailbox_node = _index_nodes(areas).get(mail_node_name)
 
-    # Find mailbox_node
-    found = False
-    for area in areas:
-        if found:
-            break
-        for room in area.rooms:
-            if found:
-                break
-            for node in room.nodes:
-                if found:
-                    break
-                if node.name == mail_node_name:
-                    mailbox_node = node
-                    found = True
-
-    if not found:
+    if mailbox_node is None:
         raise Exception(f'Mailbox node "{mail_node_name}" not found!')
 
-    assert mailbox_node is not None  # for type-checker
-
     # Add edge between the mailbox node and each node that has a `mail` descriptor
     for area in areas:
         for room in area.rooms:
@@ -630,29 +698,14 @@ def connect_mail_nodes(areas: list[Area], mail_node_name: str = MAILBOX_NODE_NAM
 
 def connect_shop_nodes(areas: list[Area]) -> None:
     """Add edges to connect areas to their shops."""
-
-    def _get_shop_node(shop_node_name: str) -> Node:
-        area_name, room_name, _ = shop_node_name.split('.')
-        for area in areas:
-            if area.name != area_name:
-                continue
-            for room in area.rooms:
-                if room.name != room_name:
-                    continue
-                for node in room.nodes:
-                    if node.name != shop_node_name:
-                        continue
-                    return node
-        raise Exception(f'Shop node "{shop_node_name}" not found!')
-
-    shop_nodes: dict[str, Node] = {}
+    nodes_by_name = _index_nodes(areas)
 
     for area in areas:
         for room in area.rooms:
             for node in room.nodes:
                 for shop in node.shops:
-                    shop_node = shop_nodes.get(shop, _get_shop_node(shop))
-                    shop_nodes[shop] = shop_node
+                    if (shop_node := nodes_by_name.get(shop)) is None:
+                        raise Exception(f'Shop node "{shop}" not found!')
                     node.edges.append(Edge(src=node, dest=shop_node, requirements=None))
 
 
@@ -660,27 +713,35 @@ def parse_aux_data(
     areas_directory: Path | None = None,
     enemy_mapping_file: Path | None = None,
     macros_file: Path | None = None,
+    workers: int | None = None,
+    cache_directory: Path | None = None,
 ) -> ShufflerAuxData:
+    """
+    Load the aux data in `areas_directory`.
+
+    If `cache_directory` is given, records of validated aux data files are stored in it,
+    so that unchanged files don't need to be validated again (see `_load_area_file`).
+    """
     if areas_directory is None:
-        areas_directory = Path(__file__).parent / 'logic'
+        areas_directory = LOGIC_DIRECTORY
     if enemy_mapping_file is None:
-        enemy_mapping_file = Path(__file__).parent / 'enemies.json'
+        enemy_mapping_file = ENEMY_MAPPING_FILE
     if macros_file is None:
-        macros_file = Path(__file__).parent / 'macros.json'
+        macros_file = MACROS_FILE
 
     areas: dict[str, Area] = {}
-    for file in areas_directory.rglob('*.json'):
-        with open(file) as fd:
-            area = Area(**json.load(fd))
-
-            # It's possible for an Area to be spread across multiple files.
-            # To support this, check if this area exists first. If it does,
-            # add the new area's rooms to the existing area's rooms.
-            # Otherwise, add the new area.
-            if area.name in areas:
-                areas[area.name].rooms.extend(area.rooms)
-            else:
-                areas[area.name] = area
+    area_files = list(areas_directory.rglob('*.json'))
+    records_directory = cache_directory / 'aux' if cache_directory is not None else None
+    load = partial(_load_area_file, records_directory=records_directory)
+    for area in _load_files(load, area_files, workers):
+        # It's possible for an Area to be spread across multiple files.
+        # To support this, check if this area exists first. If it does,
+        # add the new area's rooms to the existing area's rooms.
+        # Otherwise, add the new area.
+        if area.name in areas:
+            areas[area.name].rooms.extend(area.rooms)
+        else:
+            areas[area.name] = area
 
     enemy_mapping = json.loads(enemy_mapping_file.read_text())
     macros = json.loads(macros_file.read_text())
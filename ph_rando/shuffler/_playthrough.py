@@ -0,0 +1,101 @@
+"""
+Incremental search, for computing the spheres of a playthrough (and for assumed searches,
+see `Shuffler(incremental_search=True)`).
+
+Computing spheres means searching the logic graph over and over with a growing inventory.
+Since an inventory that only grows can never make a reached node unreachable again, each
+search can pick up where the previous one left off: only the edges that were blocked the
+last time need to be evaluated again, instead of searching the whole graph from scratch.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
+from ph_rando.shuffler._key_logic import KeyLogic
+from ph_rando.shuffler._requirements import Inventory
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Edge, Node
+
+
+class IncrementalSearch:
+    """A search of the logic graph that can be resumed once the inventory grows."""
+
+    def __init__(self, start: Node, key_logic: KeyLogic, track_blocked: bool = True) -> None:
+        """
+        Params:
+            start: The node to start searching at.
+            key_logic: Keeps track of locked doors. Its key counts may grow between calls
+                       to `expand`.
+            track_blocked: Whether to keep track of blocked edges. If not, every call to
+                           `expand` must be given the edges to evaluate again.
+        """
+        self.key_logic = key_logic
+        self._visited: set[Node] = {start}
+        self._queue: deque[Node] = deque([start])
+        # Edges out of reached nodes whose requirements weren't met yet
+        self._blocked: list[Edge] | None = [] if track_blocked else None
+
+    def copy(self, key_logic: KeyLogic) -> IncrementalSearch:
+        """Return a copy of this search that keeps track of locked doors with `key_logic`."""
+        search = IncrementalSearch.__new__(IncrementalSearch)
+        search.key_logic = key_logic
+        search._visited = set(self._visited)
+        search._queue = deque(self._queue)
+        search._blocked = None if self._blocked is None else list(self._blocked)
+        return search
+
+    def is_reached(self, node: Node) -> bool:
+        return node in self._visited
+
+    def expand(self, inventory: Inventory, edges: Iterable[Edge] | None = None) -> list[Node]:
+        """
+        Continue searching with `inventory`, which must contain at least everything that
+        the previous inventory did. Returns the newly reached nodes, in the order they
+        were reached.
+
+        By default, every edge that was blocked so far is evaluated again. If `edges` is
+        given, only those edges are: they must include every blocked edge whose
+        requirements may be met now (e.g. the edges that depend on something the
+        inventory gained, see `DependencyIndex`).
+        """
+        reached: list[Node] = []
+
+        if edges is None:
+            if self._blocked is None:
+                raise ValueError('Blocked edges are not tracked, so `edges` must be given')
+            blocked, self._blocked = self._blocked, []
+        else:
+            blocked = [edge for edge in edges if edge.src in self._visited]
+        for edge in blocked:
+            self._traverse(edge, inventory)
+
+        while True:
+            while self._queue:
+                node = self._queue.popleft()
+                for edge in node.edges:
+                    self._traverse(edge, inventory)
+                reached.append(node)
+
+            for edge in self.key_logic.open_doors(self._visited.__contains__):
+                self._visit(edge.dest)
+            if not self._queue:
+                return reached
+
+    def _traverse(self, edge: Edge, inventory: Inventory) -> None:
+        if edge.dest in self._visited:
+            return
+        assert edge.requirement is not None
+        if not edge.requirement.evaluate(inventory):
+            if self._blocked is not None:
+                self._blocked.append(edge)
+        elif not edge.locked_door or self.key_logic.reach(edge):
+            self._visit(edge.dest)
+
+    def _visit(self, node: Node) -> None:
+        if node not in self._visited:
+            self._visited.add(node)
+            self._queue.append(node)
@@ -0,0 +1,535 @@
+"""
+Compilation of edge requirements into predicate trees.
+
+Edge requirements are parsed into nested lists of strings (see `parse_edge_requirement`).
+Evaluating those directly means re-walking the lists, re-parsing counted items and
+re-resolving macros and enemies every time an edge is checked. Instead, every edge's
+requirements are compiled once, at graph-build time, into a small tree of `Requirement`
+objects, with macros and enemy requirements inlined and settings resolved. Any invalid
+references (unknown items, macros, enemies or settings) are reported all at once when
+the requirements are compiled, rather than when an edge happens to be evaluated.
+
+Item, flag and state names are interned into bit positions by a `NameIndex`, so that
+requirements are evaluated against integer bitmasks (see `Inventory`) rather than lists
+and sets of strings.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator, Mapping
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+from ph_rando.shuffler._descriptors import EdgeDescriptor
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Edge, Node
+
+_COUNTED_ITEM_REGEX = re.compile(r'(.+)\[(\d+)\]')
+
+
+class RequirementError(Exception):
+    """Raised when one or more edge requirements reference something that doesn't exist."""
+
+    def __init__(self, errors: list[str]) -> None:
+        super().__init__('Invalid edge requirements:\n' + '\n'.join(f'  {e}' for e in errors))
+        self.errors = errors
+
+
+class NameIndex:
+    """
+    Interns item, flag and state names into bit positions.
+
+    Inventories are represented as one integer bitmask each for items, flags and states,
+    so that most requirements can be evaluated with a single mask test. Items that
+    requirements need more than one of (e.g. `ProgressiveSword[2]`) are additionally
+    assigned a slot in the inventory's `counts` array.
+    """
+
+    def __init__(self) -> None:
+        self.items: dict[str, int] = {}
+        self.flags: dict[str, int] = {}
+        self.states: dict[str, int] = {}
+        self.counted_items: dict[str, int] = {}
+        # Highest count of each counted item that any requirement asks for
+        self.required_counts: dict[str, int] = {}
+
+    @staticmethod
+    def _bit(names: dict[str, int], name: str) -> int:
+        if name not in names:
+            names[name] = 1 << len(names)
+        return names[name]
+
+    def item_bit(self, name: str) -> int:
+        return self._bit(self.items, name)
+
+    def flag_bit(self, name: str) -> int:
+        return self._bit(self.flags, name)
+
+    def state_bit(self, name: str) -> int:
+        return self._bit(self.states, name)
+
+    def count_slot(self, name: str, count: int) -> int:
+        if name not in self.counted_items:
+            self.counted_items[name] = len(self.counted_items)
+        self.required_counts[name] = max(self.required_counts.get(name, 0), count)
+        return self.counted_items[name]
+
+    def mask(self, names: dict[str, int], values: Iterable[str]) -> int:
+        """
+        Return the bitmask of the given names. Names that were never interned aren't
+        referenced by any requirement, so they are simply ignored.
+        """
+        mask = 0
+        for value in values:
+            mask |= names.get(value, 0)
+        return mask
+
+    def inventory(
+        self, items: Iterable[str], flags: Iterable[str], states: Iterable[str]
+    ) -> Inventory:
+        item_mask = 0
+        counts = [0] * len(self.counted_items)
+        for item in items:
+            item_mask |= self.items.get(item, 0)
+            if item in self.counted_items:
+                counts[self.counted_items[item]] += 1
+        return Inventory(
+            items=item_mask,
+            counts=counts,
+            flags=self.mask(self.flags, flags),
+            states=self.mask(self.states, states),
+        )
+
+
+class Inventory:
+    """Everything the player has logically obtained at some point of a search."""
+
+    __slots__ = ('items', 'counts', 'flags', 'states')
+
+    def __init__(self, items: int, counts: list[int], flags: int, states: int) -> None:
+        self.items = items
+        self.counts = counts
+        self.flags = flags
+        self.states = states
+
+
+class Dependencies(NamedTuple):
+    """
+    Masks of the items, count slots, flags and states that a requirement tests.
+
+    Uses the same bit positions as `Inventory`, except for `counts`, where bit `n` stands
+    for `Inventory.counts[n]`.
+    """
+
+    items: int
+    counts: int
+    flags: int
+    states: int
+
+
+def _bits(mask: int) -> Iterator[int]:
+    """Yield each set bit of `mask`, as an integer with just that bit set."""
+    while mask:
+        bit = mask & -mask
+        yield bit
+        mask ^= bit
+
+
+class DependencyIndex:
+    """
+    Inverted index of the edges whose requirements test each item, flag and state.
+
+    This is used to figure out which edges can evaluate differently between two inventories
+    without re-evaluating every edge. Settings don't need to be indexed, since they're
+    resolved when requirements are compiled.
+    """
+
+    def __init__(self, edges: Iterable[Edge]) -> None:
+        self.items: defaultdict[int, list[Edge]] = defaultdict(list)
+        self.counts: defaultdict[int, list[Edge]] = defaultdict(list)
+        self.flags: defaultdict[int, list[Edge]] = defaultdict(list)
+        self.states: defaultdict[int, list[Edge]] = defaultdict(list)
+        for edge in edges:
+            assert edge.requirement is not None
+            dependencies = edge.requirement.dependencies()
+            for index, mask in (
+                (self.items, dependencies.items),
+                (self.counts, dependencies.counts),
+                (self.flags, dependencies.flags),
+                (self.states, dependencies.states),
+            ):
+                for bit in _bits(mask):
+                    index[bit].append(edge)
+
+    def affected_edges(self, old: Inventory, new: Inventory) -> Iterator[Edge]:
+        """
+        Yield every edge whose requirements test something that differs between `old` and
+        `new`. Edges may be yielded more than once.
+        """
+        changed_counts = 0
+        for slot, (old_count, new_count) in enumerate(zip(old.counts, new.counts)):
+            if old_count != new_count:
+                changed_counts |= 1 << slot
+        for index, changed in (
+            (self.items, old.items ^ new.items),
+            (self.counts, changed_counts),
+            (self.flags, old.flags ^ new.flags),
+            (self.states, old.states ^ new.states),
+        ):
+            for bit in _bits(changed):
+                yield from index.get(bit, ())
+
+
+class Requirement:
+    """A compiled edge requirement."""
+
+    __slots__ = ()
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        raise NotImplementedError
+
+    def dependencies(self) -> Dependencies:
+        """Return masks of everything in an inventory that this requirement tests."""
+        return Dependencies(0, 0, 0, 0)
+
+
+class Constant(Requirement):
+    __slots__ = ('value',)
+
+    def __init__(self, value: bool) -> None:
+        self.value = value
+
+    def __repr__(self) -> str:
+        return repr(self.value)
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        return self.value
+
+
+ALWAYS = Constant(True)
+NEVER = Constant(False)
+
+
+class _Masks(Requirement):
+    """Base class for requirements that test bits of an inventory's masks."""
+
+    __slots__ = ('items', 'flags', 'states', 'terms')
+
+    def __init__(self, items: int, flags: int, states: int, terms: tuple[str, ...]) -> None:
+        self.items = items
+        self.flags = flags
+        self.states = states
+        self.terms = terms  # human-readable form of each tested bit, for debugging
+
+    def dependencies(self) -> Dependencies:
+        return Dependencies(self.items, 0, self.flags, self.states)
+
+
+class HasAll(_Masks):
+    """Requires every item, flag and state in the masks."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return ' & '.join(self.terms) if len(self.terms) == 1 else f'({" & ".join(self.terms)})'
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        return (
+            inventory.items & self.items == self.items
+            and inventory.flags & self.flags == self.flags
+            and inventory.states & self.states == self.states
+        )
+
+
+class HasAny(_Masks):
+    """Requires at least one of the items, flags and states in the masks."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return f'({" | ".join(self.terms)})'
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        return bool(
+            inventory.items & self.items
+            or inventory.flags & self.flags
+            or inventory.states & self.states
+        )
+
+
+class HasCount(Requirement):
+    """Requires at least `count` of an item."""
+
+    __slots__ = ('name', 'slot', 'count')
+
+    def __init__(self, name: str, slot: int, count: int) -> None:
+        self.name = name
+        self.slot = slot
+        self.count = count
+
+    def __repr__(self) -> str:
+        return f'item {self.name}[{self.count}]'
+
+    def dependencies(self) -> Dependencies:
+        return Dependencies(0, 1 << self.slot, 0, 0)
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        return inventory.counts[self.slot] >= self.count
+
+
+class _Group(Requirement):
+    __slots__ = ('requirements',)
+
+    def __init__(self, requirements: list[Requirement]) -> None:
+        self.requirements = requirements
+
+    def dependencies(self) -> Dependencies:
+        items = counts = flags = states = 0
+        for requirement in self.requirements:
+            dependencies = requirement.dependencies()
+            items |= dependencies.items
+            counts |= dependencies.counts
+            flags |= dependencies.flags
+            states |= dependencies.states
+        return Dependencies(items, counts, flags, states)
+
+
+class AllOf(_Group):
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return '(' + ' & '.join(repr(r) for r in self.requirements) + ')'
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        for requirement in self.requirements:
+            if not requirement.evaluate(inventory):
+                return False
+        return True
+
+
+class AnyOf(_Group):
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return '(' + ' | '.join(repr(r) for r in self.requirements) + ')'
+
+    def evaluate(self, inventory: Inventory) -> bool:
+        for requirement in self.requirements:
+            if requirement.evaluate(inventory):
+                return True
+        return False
+
+
+def _combine(operator: str, requirements: list[Requirement]) -> Requirement:
+    """
+    Build an `AllOf`/`AnyOf` out of `requirements`, folding constants and nested groups
+    and merging plain item/flag/state tests into a single mask test where possible.
+    """
+    absorbing, identity = (NEVER, ALWAYS) if operator == '&' else (ALWAYS, NEVER)
+    group_type: type[_Group] = AllOf if operator == '&' else AnyOf
+    mask_type: type[_Masks] = HasAll if operator == '&' else HasAny
+
+    flattened: list[Requirement] = []
+    masks: list[_Masks] = []
+    for requirement in requirements:
+        if isinstance(requirement, Constant):
+            if requirement.value == absorbing.value:
+                return absorbing
+        elif isinstance(requirement, group_type):
+            flattened.extend(requirement.requirements)
+        elif isinstance(requirement, mask_type) or (
+            isinstance(requirement, _Masks) and len(requirement.terms) == 1
+        ):
+            masks.append(requirement)
+        else:
+            flattened.append(requirement)
+
+    if len(masks) == 1:
+        flattened.insert(0, masks[0])
+    elif masks:
+        merged = mask_type(0, 0, 0, ())
+        for mask in masks:
+            merged.items |= mask.items
+            merged.flags |= mask.flags
+            merged.states |= mask.states
+            merged.terms += mask.terms
+        flattened.insert(0, merged)
+
+    if not flattened:
+        return identity
+    if len(flattened) == 1:
+        return flattened[0]
+    return group_type(flattened)
+
+
+class RequirementCompiler:
+    """
+    Compiles parsed edge requirements into `Requirement` trees.
+
+    Macros and enemy requirements are compiled once and shared between every edge that
+    references them, so they can't contain `defeated` requirements themselves. Errors are
+    collected in `errors` instead of being raised, so that all problems with the logic can
+    be reported at once.
+    """
+
+    def __init__(
+        self,
+        macros: Mapping[str, str],
+        enemy_requirements: Mapping[str, str],
+        settings: Mapping[str, str | set[str] | bool],
+        index: NameIndex,
+    ) -> None:
+        self.macros = macros
+        self.enemy_requirements = enemy_requirements
+        self.settings = settings
+        self.index = index
+        self.errors: list[str] = []
+
+        self._compiled_macros: dict[str, Requirement] = {}
+        self._compiled_enemies: dict[str, Requirement] = {}
+        self._in_progress: list[str] = []
+
+    def compile_edge(self, edge: Edge) -> Requirement:
+        if not edge.requirements:
+            return ALWAYS
+        context = f'{edge!r}' if edge.logic_file is None else f'{edge.logic_file}: {edge!r}'
+        return self._compile(edge.requirements, edge.src, context)
+
+    def _compile(
+        self, parsed_expr: list[str | list[str | list]], node: Node | None, context: str
+    ) -> Requirement:
+        operands: list[Requirement] = []
+        operator = '&'
+        i = 0
+        while i < len(parsed_expr):
+            elem = parsed_expr[i]
+            if isinstance(elem, list):
+                operands.append(self._compile(elem, node, context))
+                i += 1
+            elif elem in ('&', '|'):
+                operator = elem
+                i += 1
+            else:
+                value = parsed_expr[i + 1]
+                assert isinstance(value, str)
+                operands.append(self._compile_single(elem, value, node, context))
+                i += 2
+        return _combine(operator, operands)
+
+    def _compile_single(
+        self, type: str, value: str, node: Node | None, context: str
+    ) -> Requirement:
+        from ph_rando.common import RANDOMIZER_SETTINGS
+        from ph_rando.patcher._items import ITEMS
+
+        match type:
+            case EdgeDescriptor.ITEM:
+                count = 1
+                if (count_descriptor := _COUNTED_ITEM_REGEX.fullmatch(value)) is not None:
+                    value, item_count = count_descriptor.groups()
+                    count = int(item_count)
+                if value not in ITEMS:
+                    self.errors.append(f'{context}: invalid item "{value}"')
+                    return NEVER
+                if count > 1:
+                    return HasCount(value, self.index.count_slot(value, count), count)
+                return HasAll(self.index.item_bit(value), 0, 0, (f'item {value}',))
+            case EdgeDescriptor.FLAG:
+                return HasAll(0, self.index.flag_bit(value), 0, (f'flag {value}',))
+            case EdgeDescriptor.STATE:
+                return HasAll(0, 0, self.index.state_bit(value), (f'state {value}',))
+            case EdgeDescriptor.OPEN:
+                return ALWAYS  # Locked doors are handled separately during the search.
+            case EdgeDescriptor.SETTING:
+                if value not in RANDOMIZER_SETTINGS:
+                    self.errors.append(f'{context}: invalid setting "{value}"')
+                    return NEVER
+                if value not in self.settings:
+                    self.errors.append(f'{context}: setting "{value}" has no value')
+                    return NEVER
+                setting_value = self.settings[value]
+                if not isinstance(setting_value, bool):
+                    self.errors.append(f'{context}: setting "{value}" is not a flag')
+                    return NEVER
+                return Constant(setting_value)
+            case EdgeDescriptor.MACRO:
+                return self._compile_macro(value, context)
+            case EdgeDescriptor.DEFEATED:
+                return self._compile_enemy(value, node, context)
+            case other:
+                self.errors.append(f'{context}: invalid edge descriptor {other!r}')
+                return NEVER
+
+    def _compile_macro(self, name: str, context: str) -> Requirement:
+        from ph_rando.shuffler._parser import parse_edge_requirement
+
+        if name in self._compiled_macros:
+            return self._compiled_macros[name]
+        if name not in self.macros:
+            self.errors.append(f'{context}: invalid macro "{name}", not found in macros.json')
+            return NEVER
+        if name in self._in_progress:
+            cycle = ' -> '.join([*self._in_progress[self._in_progress.index(name) :], name])
+            self.errors.append(f'{context}: macro cycle detected ({cycle})')
+            return NEVER
+
+        self._in_progress.append(name)
+        try:
+            requirement = self._compile(
+                # The edge that references the macro first is part of the context as well
+                parse_edge_requirement(self.macros[name]),
+                None,
+                f'{context}: macro "{name}"',
+            )
+        finally:
+            self._in_progress.pop()
+
+        self._compiled_macros[name] = requirement
+        return requirement
+
+    def _compile_enemy(self, name: str, node: Node | None, context: str) -> Requirement:
+        from ph_rando.shuffler._parser import parse_edge_requirement
+
+        if node is None:
+            self.errors.append(f"{context}: can't evaluate requirement 'defeated {name}'")
+            return NEVER
+
+        enemy = next((enemy for enemy in node.room.enemies if enemy.name == name), None)
+        if enemy is None:
+            self.errors.append(f'{context}: enemy {name} not found!')
+            return NEVER
+        if enemy.type not in self.enemy_requirements:
+            self.errors.append(f'{context}: invalid enemy type {enemy.type!r}')
+            return NEVER
+
+        if enemy.type not in self._compiled_enemies:
+            self._compiled_enemies[enemy.type] = self._compile(
+                parse_edge_requirement(self.enemy_requirements[enemy.type]),
+                None,
+                f'enemy type "{enemy.type}"',
+            )
+        return self._compiled_enemies[enemy.type]
+
+
+def compile_requirements(
+    nodes: Iterable[Node],
+    macros: Mapping[str, str],
+    enemy_requirements: Mapping[str, str],
+    settings: Mapping[str, str | set[str] | bool],
+    index: NameIndex,
+) -> None:
+    """
+    Compile the requirements of every edge of the given nodes, and store them on the
+    edges' `requirement` attribute. Every item, flag and state name that is referenced
+    is interned into `index`.
+
+    Raises a `RequirementError` listing every invalid requirement, if there are any.
+    """
+    compiler = RequirementCompiler(macros, enemy_requirements, settings, index)
+    for node in nodes:
+        for edge in node.edges:
+            edge.requirement = compiler.compile_edge(edge)
+    if compiler.errors:
+        raise RequirementError(compiler.errors)
@@ -1,18 +1,30 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
-from copy import deepcopy
+from array import array
+from collections import Counter, deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 import importlib
 import logging
+import os
 from pathlib import Path
+import queue
 import random
-from typing import Self
+from typing import TYPE_CHECKING, Any, Literal, Self
 
 from ordered_set import OrderedSet
 
 from ph_rando.common import ShufflerAuxData
 from ph_rando.settings import ShufflerHook
+from ph_rando.shuffler._check_pool import EmptyChecks
+from ph_rando.shuffler._condensed_graph import CondensedGraph
+from ph_rando.shuffler._fill_slots import EMPTY, FillSlots
+from ph_rando.shuffler._key_logic import KeyLogic, RoundKeyLogic, locked_doors_by_area
 from ph_rando.shuffler._parser import (
+    ENEMY_MAPPING_FILE,
+    LOGIC_DIRECTORY,
+    MACROS_FILE,
     Edge,
     Node,
     annotate_logic,
@@ -21,7 +33,18 @@ from ph_rando.shuffler._parser import (
     connect_shop_nodes,
     parse_aux_data,
 )
-from ph_rando.shuffler.aux_models import Check, Item
+from ph_rando.shuffler._playthrough import IncrementalSearch
+from ph_rando.shuffler._requirements import (
+    DependencyIndex,
+    Inventory,
+    NameIndex,
+    compile_requirements,
+)
+from ph_rando.shuffler._snapshot import load_snapshot, save_snapshot, snapshot_key, snapshot_path
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Check, Item
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._numpy_search import NumpySearch
 
 logger = logging.getLogger(__name__)
 
@@ -103,15 +126,198 @@ IMPORTANT_ITEMS: set[str] = {
     'TreasureMapNE8',
 }
 
+# Number of times a placement phase is retried by `Shuffler._backtracking_fill` before the
+# phase before it is retried as well
+BACKTRACK_PHASE_RETRIES = 3
+
+
+def _remove_items(item_pool: list[Item], items: list[Item]) -> None:
+    """
+    Remove `items` from `item_pool`. Items are matched by identity, which is much cheaper
+    than `list.remove`'s (pydantic) equality, and removes the same items when all equal
+    items are removed together.
+    """
+    removed = {id(item) for item in items}
+    item_pool[:] = [item for item in item_pool if id(item) not in removed]
+
+
+def _small_key_counts(item_counts: Counter[str]) -> dict[str, int]:
+    """Return the number of small keys for each area in the given inventory."""
+    return {
+        item_name[len('SmallKey_') :]: count
+        for item_name, count in item_counts.items()
+        if item_name.startswith('SmallKey_')
+    }
+
 
 class AssumedFillFailed(Exception):
     pass
 
 
+@dataclass
+class FillStats:
+    """How many attempts the last `Shuffler.generate` needed, see `Shuffler.fill_stats`."""
+
+    # Number of times the fill failed and was retried
+    retries: int = 0
+    # Number of failures of each placement phase
+    failed_phases: Counter[str] = field(default_factory=Counter)
+    # Number of placements that were undone to retry the fill
+    undone_placements: int = 0
+
+
+@dataclass
+class FillState:
+    """
+    Everything that generating a seed changes: the item in every check, and the random
+    number generator. See `Shuffler.new_fill_state`.
+    """
+
+    seed: str
+    rng: random.Random
+    # Id of the item (see `ItemRegistry`) in each check (in `Shuffler.checks`)
+    slots: array[int]
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Items with states get their ids in the order they're first interned, which can
+        # differ between processes, so the items themselves are pickled
+        state = self.__dict__.copy()
+        state['slots'] = [
+            None if item_id == EMPTY else ITEM_REGISTRY[item_id] for item_id in self.slots
+        ]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        state['slots'] = array(
+            'i', [EMPTY if item is None else ITEM_REGISTRY.id(item) for item in state['slots']]
+        )
+        self.__dict__.update(state)
+
+
+def _check_filled(fill_state: FillState) -> None:
+    """Raise a `ValueError` if any check of `fill_state` is empty."""
+    if EMPTY in fill_state.slots:
+        raise ValueError(f'Fill state of seed {fill_state.seed!r} has empty checks')
+
+
+# A placement phase of the fill: its name, and a function that places the items of the phase
+_FillPhase = tuple[str, Callable[[list[Item]], None]]
+
+
+@dataclass
+class _AssumedSearchCache:
+    """Result of an assumed search, see `Shuffler._cached_assumed_search`."""
+
+    # `id()`s of the items in the assumed item pool the search was run with
+    pool: list[int]
+    reachable_nodes: OrderedSet[Node]
+    final_pass_nodes: set[Node]
+
+
+@dataclass
+class _ResumableSearch:
+    """
+    Search that the passes of an assumed search pick up from, see
+    `Shuffler(incremental_search=True)`.
+    """
+
+    search: IncrementalSearch
+    # Small key counts the search's `KeyLogic` reads; updated in place as keys are found
+    key_counts: dict[str, int]
+    inventory: Inventory
+    reachable_nodes: OrderedSet[Node]
+
+    def copy(self) -> _ResumableSearch:
+        """Return a copy of this search that can be continued independently of it."""
+        key_counts = dict(self.key_counts)
+        return _ResumableSearch(
+            self.search.copy(self.search.key_logic.copy(key_counts)),
+            key_counts,
+            self.inventory,
+            OrderedSet(self.reachable_nodes),
+        )
+
+
+@dataclass
+class _Playthrough:
+    """Progress of a playthrough, see `Shuffler._continue_playthrough`."""
+
+    # Item in each check of the fill state being played through, shared by its copies
+    slots: FillSlots
+    item_counts: Counter[str]
+    flags: set[str]
+    states: set[str]
+    # Ids of the checks whose items have been collected, or are never collected
+    collected: set[int]
+    reached_nodes: set[Node]
+    # Nodes reached by the latest search, or `None` if the playthrough hasn't started
+    reachable_nodes: OrderedSet[Node] | None
+    # Search that the next search continues, if searches are resumed (see `_explore`)
+    search: _ResumableSearch | None
+    spheres: list[list[tuple[Node, Check]]]
+
+    def copy(self) -> _Playthrough:
+        """Return a copy of this playthrough that can be continued independently of it."""
+        search = None if self.search is None else self.search.copy()
+        return _Playthrough(
+            slots=self.slots,
+            item_counts=self.item_counts.copy(),
+            flags=set(self.flags),
+            states=set(self.states),
+            collected=set(self.collected),
+            reached_nodes=set(self.reached_nodes),
+            # Searches that start over return a new set every time, so it can be shared
+            reachable_nodes=self.reachable_nodes if search is None else search.reachable_nodes,
+            search=search,
+            spheres=list(self.spheres),
+        )
+
+
+def _inventory_grew(old: Inventory, new: Inventory) -> bool:
+    """Return whether `new` contains at least everything that `old` does."""
+    return (
+        not old.items & ~new.items
+        and not old.flags & ~new.flags
+        and not old.states & ~new.states
+        and all(old_count <= new_count for old_count, new_count in zip(old.counts, new.counts))
+    )
+
+
+@dataclass(frozen=True)
+class SearchScope:
+    """A part of the logic graph that a search is limited to, see `Shuffler.search_scope`."""
+
+    nodes: frozenset[Node]
+    # Nodes in the scope that can be entered from outside of it, where searches start
+    entry_points: tuple[Node, ...]
+
+
+@dataclass
+class ScopedSearchResult:
+    """Result of `Shuffler.scoped_search`."""
+
+    reachable_nodes: OrderedSet[Node]
+
+    @property
+    def checks(self) -> list[Check]:
+        return [check for node in self.reachable_nodes for check in node.checks]
+
+
 class Shuffler:
+    """
+    Item shuffler for a single logic graph and set of settings.
+
+    A `Shuffler` fills one fill state at a time: `fill` keeps its progress (the slots being
+    filled, the random number generator and its caches) on the instance, so it isn't
+    re-entrant. Use a `Shuffler` per thread to generate seeds concurrently, like
+    `generate_many` does. Searches and playthroughs take the fill state to read the items
+    from as an argument, and only default to the one that was loaded (or generated) last.
+    """
+
     settings: dict[str, str | set[str] | bool]
     aux_data: ShufflerAuxData
     starting_node: Node
+    candidate_checks: dict[str, OrderedSet[Check]]
 
     _checks_to_exclude: set[Check]
 
@@ -123,27 +329,142 @@ class Shuffler:
         areas_directory: Path | None = None,
         enemy_mapping_file: Path | None = None,
         macros_file: Path | None = None,
+        cache_directory: Path | None = None,
+        loader_workers: int | None = None,
+        condense_graph: bool = False,
+        search_backend: Literal['python', 'numpy'] = 'python',
+        fill_strategy: Literal['restart', 'backtrack'] = 'restart',
+        max_fill_retries: int | None = None,
+        incremental_search: bool = False,
+        strict_key_logic: bool = False,
+        goal_node_name: str = 'FinalBoss.Main.Victory',
     ) -> None:
-        random.seed(seed)
-
+        """
+        Params:
+            cache_directory: Directory to store a snapshot of the parsed logic graph in, so
+                             that later runs can skip parsing the logic. Defaults to the
+                             `PH_RANDO_CACHE_DIR` environment variable; if neither is set,
+                             the logic is always parsed from scratch.
+            loader_workers: Number of processes to load the aux data and logic files in,
+                            see `parse_aux_data`.
+            condense_graph: Search a `CondensedGraph` of the logic instead of the logic graph
+                            itself. Searches reach the same nodes, but in a different order,
+                            so seeds generate differently than without it.
+            search_backend: Engine to run searches with. `numpy` runs them with a
+                            `NumpySearch`, which is meant for running large batches of
+                            searches at once (see `search_many`); like `condense_graph`,
+                            it changes the order nodes are reached in. Requires numpy.
+            fill_strategy: What to do when an item can't be placed. `restart` empties every
+                           check and starts the fill over, `backtrack` only undoes and
+                           retries the most recent placement phases (see
+                           `_backtracking_fill`).
+            max_fill_retries: Maximum number of times the fill is retried before giving up
+                              with `AssumedFillFailed`. Unlimited by default.
+            incremental_search: Have each pass of an assumed search continue the search of
+                                the previous pass, only re-evaluating the edges that depend
+                                on something the pass found (see `DependencyIndex`), instead
+                                of searching the graph from scratch. Passes start over when
+                                state is lost or a locked door may no longer be open. Like
+                                `condense_graph`, this changes the order nodes are reached
+                                in, so seeds generate differently than without it. Has no
+                                effect together with `condense_graph` or `search_backend`.
+            strict_key_logic: Charge the doors that a search opens against the area's keys
+                              for the rest of the search (see `KeyLogic`), instead of
+                              recounting the keys in every round of the search (see
+                              `RoundKeyLogic`). A key then only ever opens one door, but seeds
+                              generate differently than without it. `condense_graph`,
+                              `search_backend`, `incremental_search` and playthroughs always
+                              use strict key logic.
+            goal_node_name: Node that finishes the game once it's reached. Playthroughs only
+                            list the items needed to reach it (see `playthrough`).
+        """
         self.settings = settings
 
-        self.aux_data = parse_aux_data(
-            areas_directory=areas_directory,
-            enemy_mapping_file=enemy_mapping_file,
-            macros_file=macros_file,
+        if cache_directory is None and os.environ.get('PH_RANDO_CACHE_DIR'):
+            cache_directory = Path(os.environ['PH_RANDO_CACHE_DIR'])
+
+        self._checks_to_exclude: set[Check] = set()
+
+        self.fill_strategy = fill_strategy
+        self.max_fill_retries = max_fill_retries
+        self.incremental_search = incremental_search
+        self.strict_key_logic = strict_key_logic
+        self.fill_stats = FillStats()
+        self._empty_checks: EmptyChecks
+
+        self._assumed_search_cache: _AssumedSearchCache | None = None
+        self._search_scopes: dict[tuple[str, str | None], SearchScope] = {}
+
+        # Bit positions of the items, flags and states that edge requirements refer to
+        self.requirement_index = NameIndex()
+
+        self.aux_data = self._build_logic_graph(
+            areas_directory=areas_directory or LOGIC_DIRECTORY,
+            enemy_mapping_file=enemy_mapping_file or ENEMY_MAPPING_FILE,
+            macros_file=macros_file or MACROS_FILE,
+            cache_directory=cache_directory,
+            workers=loader_workers,
         )
         self.aux_data.seed = seed
 
-        self._checks_to_exclude: set[Check] = set()
+        # Every check, in the order of the aux data. Checks are identified by their index in
+        # this list (their check id), and items by the check id of their first vanilla
+        # location (their item id), see `FillSlots`. Items are interned (see `ItemRegistry`),
+        # so every copy of an item is the same instance and has the same item id.
+        self.checks: list[Check] = [
+            check for area in self.aux_data.areas for room in area.rooms for check in room.chests
+        ]
+        self._check_ids = {check: i for i, check in enumerate(self.checks)}
+        # Id of the vanilla item in each check, see `new_fill_state`
+        self._vanilla_slots = array(
+            'i', [ITEM_REGISTRY.id(check.contents) for check in self.checks]
+        )
+        self._fill_state = self.new_fill_state(seed)
+        self._slots = FillSlots(self._fill_state.slots)
+        self._rng = self._fill_state.rng
+
+        # Checks that each dungeon reward, boss key and small key can be placed at. These are
+        # built once here, so settings hooks can narrow them down.
+        self.candidate_checks = self._build_candidate_checks()
 
-        self._annotate_logic(logic_directory=areas_directory)
-        self._connect_rooms()
-        self._connect_mail_nodes()
-        self._connect_shop_nodes()
         self._apply_settings()
+        self._compile_requirements()
         self._remove_unsupported_items()
 
+        edges: list[Edge] = [
+            edge
+            for area in self.aux_data.areas
+            for room in area.rooms
+            for node in room.nodes
+            for edge in node.edges
+        ]
+        self._dependency_index = DependencyIndex(edges)
+        self._locked_doors = locked_doors_by_area(edges)
+
+        # Every node, and the ids of the checks in each node. Searches and fills use these
+        # rather than going through the rooms of the aux data, which are pydantic models.
+        nodes = [node for area in self.aux_data.areas for room in area.rooms for node in room.nodes]
+        self._nodes = nodes
+        self._node_check_ids = {
+            node: tuple(self._check_ids[check] for check in node.checks) for node in nodes
+        }
+
+        self.condensed_graph: CondensedGraph | None = None
+        if condense_graph:
+            self.condensed_graph = CondensedGraph(nodes)
+
+        self.search_engine: NumpySearch | None = None
+        if search_backend == 'numpy':
+            try:
+                from ph_rando.shuffler import _numpy_search
+            except ModuleNotFoundError as e:
+                raise ModuleNotFoundError(
+                    "'numpy' must be installed to use the numpy search backend."
+                ) from e
+            self.search_engine = _numpy_search.NumpySearch(
+                nodes, self.requirement_index, self._locked_doors
+            )
+
         self.starting_node = [
             node
             for area in self.aux_data.areas
@@ -151,9 +472,54 @@ class Shuffler:
             for node in room.nodes
             if node.name == starting_node_name
         ][0]
+        # Logic that doesn't include the goal (e.g. for testing) has no goal node
+        self.goal_node: Node | None = next(
+            (node for node in nodes if node.name == goal_node_name), None
+        )
 
-    def _annotate_logic(self: Self, logic_directory: Path | None = None) -> None:
-        return annotate_logic(areas=self.aux_data.areas, logic_directory=logic_directory)
+    def _build_logic_graph(
+        self: Self,
+        areas_directory: Path,
+        enemy_mapping_file: Path,
+        macros_file: Path,
+        cache_directory: Path | None,
+        workers: int | None = None,
+    ) -> ShufflerAuxData:
+        """
+        Parse the aux data and logic into a fully connected graph, or load it from a
+        snapshot in `cache_directory` if one was previously built from identical inputs.
+        The files are loaded in `workers` processes, see `parse_aux_data`.
+        """
+        if cache_directory is not None:
+            snapshot_file = snapshot_path(cache_directory, areas_directory)
+            key = snapshot_key(areas_directory, enemy_mapping_file, macros_file)
+            aux_data = load_snapshot(snapshot_file, key)
+            if aux_data is not None:
+                return aux_data
+
+        self.aux_data = parse_aux_data(
+            areas_directory=areas_directory,
+            enemy_mapping_file=enemy_mapping_file,
+            macros_file=macros_file,
+            workers=workers,
+            cache_directory=cache_directory,
+        )
+        self._annotate_logic(logic_directory=areas_directory, workers=workers)
+        self._connect_rooms()
+        self._connect_mail_nodes()
+        self._connect_shop_nodes()
+
+        if cache_directory is not None:
+            save_snapshot(snapshot_file, key, self.aux_data)
+
+        return self.aux_data
+
+    def _annotate_logic(
+        self: Self, logic_directory: Path | None = None, workers: int | None = None
+    ) -> None:
+        return annotate_logic(
+            areas=self.aux_data.areas, logic_directory=logic_directory, workers=workers
+        )
 
     def _connect_rooms(self: Self) -> None:
         return connect_rooms(self.aux_data.areas)
@@ -164,6 +530,40 @@ class Shuffler:
     def _connect_shop_nodes(self: Self) -> None:
         return connect_shop_nodes(self.aux_data.areas)
 
+    def _build_candidate_checks(self: Self) -> dict[str, OrderedSet[Check]]:
+        """
+        Return the checks that each item placed without logic can be placed at, by item name:
+        the dungeon reward checks for dungeon rewards, and every check in its own dungeon for
+        boss keys and small keys.
+        """
+        checks_by_area: dict[str, OrderedSet[Check]] = {}
+        reward_checks: OrderedSet[Check] = OrderedSet()
+        for area in self.aux_data.areas:
+            area_checks = checks_by_area.setdefault(area.name, OrderedSet())
+            for room in area.rooms:
+                for node in room.nodes:
+                    for check in node.checks:
+                        area_checks.add(check)
+                        if f'{area.name}.{room.name}.{check.name}' in DUNGEON_REWARD_CHECKS:
+                            reward_checks.add(check)
+
+        candidate_checks: dict[str, OrderedSet[Check]] = {}
+        for area in self.aux_data.areas:
+            for room in area.rooms:
+                for check in room.chests:
+                    name = check.contents.name
+                    if name in DUNGEON_REWARD_CHECKS.values():
+                        candidates = reward_checks
+                    elif name.startswith('BossKey'):
+                        candidates = checks_by_area.get(name[7:], OrderedSet())
+                    elif name.startswith('SmallKey_'):
+                        candidates = checks_by_area.get(name[9:], OrderedSet())
+                    else:
+                        continue
+                    # Each item gets its own copy, so narrowing one doesn't affect the others
+                    candidate_checks[name] = candidates.copy()
+        return candidate_checks
+
     def _apply_settings(self) -> None:
         from ph_rando.common import RANDOMIZER_SETTINGS
 
@@ -176,6 +576,17 @@ class Shuffler:
                 logger.debug(f'Setting "{setting_name}"...')
                 fn(value=setting_value, shuffler=self)
 
+    def _compile_requirements(self: Self) -> None:
+        compile_requirements(
+            nodes=(
+                node for area in self.aux_data.areas for room in area.rooms for node in room.nodes
+            ),
+            macros=self.aux_data.requirement_macros,
+            enemy_requirements=self.aux_data.enemy_requirements,
+            settings=self.settings,
+            index=self.requirement_index,
+        )
+
     def _remove_unsupported_items(self: Self) -> None:
         """Removes any items that cannot currently be patched from shuffle pool."""
         # TODO: remove this function when all item types are supported.
@@ -207,44 +618,186 @@ class Shuffler:
                         )
                         self.exclude_check(check)
 
-    def generate(self: Self) -> ShufflerAuxData:
-        # Copy all items to a list and set all checks to null
+    def new_fill_state(self: Self, seed: str) -> FillState:
+        """
+        Return a fresh fill state for generating `seed`, with every check holding its vanilla
+        item. The logic graph only has to be built once, and can then be used to generate
+        any number of seeds (with the same settings):
+
+            shuffler = Shuffler(seeds[0], settings)
+            for seed in seeds:
+                aux_data = shuffler.generate(shuffler.new_fill_state(seed))
+        """
+        return FillState(
+            seed=seed,
+            rng=random.Random(seed),
+            slots=array('i', self._vanilla_slots),
+        )
+
+    def load_fill_state(self: Self, fill_state: FillState) -> ShufflerAuxData:
+        """
+        Put the items of `fill_state` in the checks, and return the resulting aux data.
+        Searches and playthroughs use the items of the fill state that was loaded (or
+        generated) last.
+        """
+        _check_filled(fill_state)
+        for check, item_id in zip(self.checks, fill_state.slots, strict=True):
+            check.contents = ITEM_REGISTRY[item_id]
+        self._slots = FillSlots(fill_state.slots)
+        self.aux_data.seed = fill_state.seed
+        return self.aux_data
+
+    def generate(self: Self, fill_state: FillState | None = None) -> ShufflerAuxData:
+        """
+        Shuffle the items, and return the resulting aux data.
+
+        Params:
+            fill_state: The fill state to generate, see `new_fill_state`. It is updated with
+                        the shuffled items. Defaults to the fill state of the seed the
+                        `Shuffler` was created with.
+        """
+        if fill_state is None:
+            fill_state = self._fill_state
+        self.fill(fill_state)
+        return self.load_fill_state(fill_state)
+
+    def fill(self: Self, fill_state: FillState) -> None:
+        """
+        Shuffle the items of `fill_state`, like `generate`, but without putting them in the
+        checks of the aux data. If the fill fails, every check of `fill_state` is left
+        holding the item it held before.
+        """
+        _check_filled(fill_state)
+        original_slots = array('i', fill_state.slots)
+        self._slots = FillSlots(fill_state.slots)
+        self._rng = fill_state.rng
+
+        # Copy all items to a list and empty all checks
         item_pool: list[Item] = []
-        for area in self.aux_data.areas:
-            for room in area.rooms:
-                for check in room.chests:
-                    item = check.contents
+        for check_id, check in enumerate(self.checks):
+            if check not in self._checks_to_exclude:
+                item_pool.append(ITEM_REGISTRY[self._slots[check_id]])
+                self._slots.clear(check_id)
+
+        self._assumed_search_cache = None
+        self._empty_checks = EmptyChecks(self._nodes, self._is_empty)
+        self.fill_stats = FillStats()
 
-                    if check not in self._checks_to_exclude:
-                        item_pool.append(item)
-                        check.contents = None  # type: ignore
+        phases: list[_FillPhase] = [
+            ('dungeon_rewards', self._place_dungeon_rewards),
+            ('boss_keys', self._place_boss_keys),
+            ('small_keys', self._place_small_keys),
+            ('important_items', self._place_important_items),
+            ('rest_of_items', self._place_rest_of_items),
+        ]
+        try:
+            if self.fill_strategy == 'backtrack':
+                self._backtracking_fill(item_pool, phases)
+            else:
+                self._restarting_fill(item_pool, phases)
+        except AssumedFillFailed:
+            fill_state.slots[:] = original_slots
+            self._slots = FillSlots(fill_state.slots)
+            raise
+
+        logger.info(
+            f'Fill succeeded after {self.fill_stats.retries} retries '
+            f'({self.fill_stats.undone_placements} placements undone)'
+        )
 
+    def _restarting_fill(self: Self, item_pool: list[Item], phases: list[_FillPhase]) -> None:
+        """Run every placement phase, starting over from scratch whenever one fails."""
         while True:
             # Save shallow copy of original list so we can restart if the assumed fill fails
             backup_item_pool = item_pool.copy()
 
-            random.shuffle(item_pool)
+            self._rng.shuffle(item_pool)
 
-            try:
-                self._place_dungeon_rewards(item_pool)
-                self._place_boss_keys(item_pool)
-                self._place_small_keys(item_pool)
-                self._place_important_items(item_pool)
-                self._place_rest_of_items(item_pool)
+            if all(self._run_fill_phase(phase, item_pool) for phase in phases):
                 break
-            except AssumedFillFailed:
-                logging.info('Assumed fill failed! Trying again...\n')
-
-                # Remove all items that were placed, and add them back to the item pool
-                for area in self.aux_data.areas:
-                    for room in area.rooms:
-                        for check in room.chests:
-                            if check.contents is not None and check not in self._checks_to_exclude:
-                                check.contents = None  # type: ignore
-                item_pool = backup_item_pool
+
+            logger.info('Assumed fill failed! Trying again...\n')
+
+            # Remove all items that were placed, and add them back to the item pool
+            self._undo_placements(0)
+            item_pool = backup_item_pool
+
+    def _backtracking_fill(self: Self, item_pool: list[Item], phases: list[_FillPhase]) -> None:
+        """
+        Run every placement phase, undoing and retrying only the most recent phases when one
+        fails.
+
+        The items of a phase stay in the assumed item pool until the phase ends, so which
+        checks are reachable doesn't change while it runs, and whether it runs out of checks
+        is down to the placements of the phases before it. So when a phase fails, the phase
+        before it is undone and retried (with a freshly shuffled item pool). Once a phase has
+        been retried `BACKTRACK_PHASE_RETRIES` times, the phase before it is retried instead.
+        """
+        # Item pool and number of placements before each phase that was started
+        checkpoints: list[tuple[list[Item], int]] = []
+        retries = [0] * len(phases)
+
+        self._rng.shuffle(item_pool)
+
+        current = 0
+        while current < len(phases):
+            if len(checkpoints) == current:
+                checkpoints.append((item_pool.copy(), self._slots.checkpoint()))
+            if self._run_fill_phase(phases[current], item_pool):
+                current += 1
                 continue
 
-        return self.aux_data
+            current = max(current - 1, 0)
+            while current > 0 and retries[current] >= BACKTRACK_PHASE_RETRIES:
+                retries[current] = 0
+                current -= 1
+            retries[current] += 1
+            del checkpoints[current + 1 :]
+
+            logger.info(f'Assumed fill failed! Retrying from phase "{phases[current][0]}"...')
+
+            pool, checkpoint = checkpoints[current]
+            self._undo_placements(checkpoint)
+            item_pool = pool.copy()
+            self._rng.shuffle(item_pool)
+
+    def _run_fill_phase(self: Self, phase: _FillPhase, item_pool: list[Item]) -> bool:
+        """
+        Run a placement phase. Returns whether it succeeded, and records the failure in
+        `fill_stats` otherwise. Raises `AssumedFillFailed` once the fill has failed more than
+        `max_fill_retries` times.
+        """
+        name, place_items = phase
+        try:
+            place_items(item_pool)
+            return True
+        except AssumedFillFailed:
+            pass
+
+        stats = self.fill_stats
+        stats.retries += 1
+        stats.failed_phases[name] += 1
+        if self.max_fill_retries is not None and stats.retries > self.max_fill_retries:
+            raise AssumedFillFailed(
+                f'Assumed fill failed {stats.retries} times, giving up '
+                f'(failed phases: {dict(stats.failed_phases)})'
+            )
+        return False
+
+    def _undo_placements(self: Self, checkpoint: int) -> None:
+        """Remove the items that were placed after `checkpoint`, see `FillSlots.checkpoint`."""
+        for check_id in self._slots.rollback(checkpoint):
+            self._empty_checks.empty(self.checks[check_id])
+            self.fill_stats.undone_placements += 1
+        self._assumed_search_cache = None
+
+    def _fill_slots(self: Self, fill_state: FillState | None) -> FillSlots:
+        """Return the slots of `fill_state`, or of the last fill state loaded if it's `None`."""
+        return self._slots if fill_state is None else FillSlots(fill_state.slots)
+
+    def _is_empty(self: Self, check: Check) -> bool:
+        """Whether no item has been placed in `check` yet."""
+        return self._slots[self._check_ids[check]] == EMPTY
 
     def _place_item(
         self: Self,
@@ -257,38 +810,100 @@ class Shuffler:
         Places the given item in a location. Set `use_logic` to False to ignore logic
         and place the item in a completely random empty location.
         """
-        reachable_null_checks: dict[Check, str] = {}
-
         if use_logic:
+            reachable_null_checks: dict[Check, Node] = {}
+
             # Figure out what nodes are accessible
-            reachable_nodes = self.assumed_search(remaining_item_pool)
+            reachable_nodes = self._cached_assumed_search(remaining_item_pool)
 
             for node in reachable_nodes:
                 for check in node.checks:
                     if candidates is not None and check not in candidates:
                         continue
-                    if check.contents is None:
-                        reachable_null_checks[check] = node.name
+                    if self._is_empty(check):
+                        reachable_null_checks[check] = node
+
+            locations = list(reachable_null_checks.keys())
+            if len(locations) == 0:
+                raise AssumedFillFailed()
+
+            # Place the current item into a random location
+            r = locations[self._rng.randint(0, len(locations) - 1)]
+            node = reachable_null_checks[r]
 
         else:
-            for area in self.aux_data.areas:
-                for room in area.rooms:
-                    for node in room.nodes:
-                        for check in node.checks:
-                            if candidates is not None and check not in candidates:
-                                continue
-                            if check.contents is None:
-                                reachable_null_checks[check] = node.name
+            # Every empty check (among the candidates) will do, so pick one straight from the
+            # pool of empty checks instead of collecting all of them
+            pool = (
+                self._empty_checks.all
+                if candidates is None
+                else self._empty_checks.subpool(candidates)
+            )
+            if len(pool) == 0:
+                raise AssumedFillFailed()
+
+            r = pool[self._rng.randint(0, len(pool) - 1)]
+            node = self._empty_checks.node(r)
 
-        locations = list(reachable_null_checks.keys())
-        if len(locations) == 0:
-            raise AssumedFillFailed()
+        self._slots.place(self._check_ids[r], ITEM_REGISTRY.id(item))
+        self._empty_checks.fill(r)
+
+        if use_logic:
+            self._update_assumed_search_cache(item, node, remaining_item_pool)
+        else:
+            # Placements without logic never search, and their phases shrink the pool
+            # when they end, so the cached result would never be reused anyway
+            self._assumed_search_cache = None
 
-        # Place the current item into a random location
-        r = locations[random.randint(0, max(0, len(reachable_null_checks) - 1))]
-        r.contents = item
+        logger.info(f'Placed {item.name} at {node.name}')
 
-        logger.info(f'Placed {item.name} at {reachable_null_checks[r]}')
+    def _cached_assumed_search(self: Self, item_pool: list[Item]) -> OrderedSet[Node]:
+        """
+        Return the result of `assumed_search(item_pool)`, reusing the result of the previous
+        placement if it's still valid (see `_update_assumed_search_cache`).
+        """
+        cache = self._assumed_search_cache
+        if cache is not None and cache.pool == [id(item) for item in item_pool]:
+            return cache.reachable_nodes
+
+        reachable_nodes, final_pass_nodes = self._assumed_search(item_pool, self._slots)
+        self._assumed_search_cache = _AssumedSearchCache(
+            pool=[id(item) for item in item_pool],
+            reachable_nodes=reachable_nodes,
+            final_pass_nodes=final_pass_nodes,
+        )
+        return reachable_nodes
+
+    def _update_assumed_search_cache(
+        self: Self, item: Item, node: Node, item_pool: list[Item]
+    ) -> None:
+        """
+        Invalidate the cached assumed search result, unless placing `item` at a check in
+        `node` can't have changed it.
+
+        The items that are placed always come from the assumed item pool, which doesn't
+        shrink until the end of each placement phase. So, placing an item just means that
+        the assumed search will collect a second copy of it, which only matters if:
+          - the item grants states, or is a small key (which are counted to unlock doors),
+          - requirements need more copies of the item than the pool already contains, or
+          - the check is only reached in the search's final pass, in which case collecting
+            it triggers an extra pass that states gained/lost in the final pass can affect.
+        Otherwise, every pass of the search sees the same inventory as before, and the
+        result is identical.
+        """
+        cache = self._assumed_search_cache
+        if cache is None:
+            return
+
+        copies_in_pool = sum(1 for i in item_pool if i.name == item.name)
+        required_copies = self.requirement_index.required_counts.get(item.name, 1)
+        if (
+            item.states
+            or item.name.startswith('SmallKey_')
+            or copies_in_pool < required_copies
+            or node in cache.final_pass_nodes
+        ):
+            self._assumed_search_cache = None
 
     def _place_dungeon_rewards(self: Self, item_pool: list[Item]) -> None:
         logger.debug('Placing dungeon rewards...')
@@ -296,57 +911,24 @@ class Shuffler:
             item for item in item_pool if item.name in DUNGEON_REWARD_CHECKS.values()
         ]
         for item in dungeon_reward_pool:
-            possible_checks: OrderedSet[Check] = OrderedSet(
-                [
-                    check
-                    for area in self.aux_data.areas
-                    for room in area.rooms
-                    for node in room.nodes
-                    for check in node.checks
-                    if f'{node.area.name}.{node.room.name}.{check.name}' in DUNGEON_REWARD_CHECKS
-                ]
-            )
-            self._place_item(item, item_pool, possible_checks, use_logic=False)
-        for item in dungeon_reward_pool:
-            item_pool.remove(item)
+            self._place_item(item, item_pool, self.candidate_checks[item.name], use_logic=False)
+        _remove_items(item_pool, dungeon_reward_pool)
 
     def _place_boss_keys(self: Self, item_pool: list[Item]) -> None:
         """Place all boss keys in `item_pool`."""
         logger.debug('Placing boss keys...')
         key_pool = [item for item in item_pool if item.name.startswith('BossKey')]
         for item in key_pool:
-            possible_checks: OrderedSet[Check] = OrderedSet(
-                [
-                    check
-                    for area in self.aux_data.areas
-                    for room in area.rooms
-                    for node in room.nodes
-                    for check in node.checks
-                    if node.area.name == item.name[7:]
-                ]
-            )
-            self._place_item(item, item_pool, possible_checks, use_logic=False)
-        for item in key_pool:
-            item_pool.remove(item)
+            self._place_item(item, item_pool, self.candidate_checks[item.name], use_logic=False)
+        _remove_items(item_pool, key_pool)
 
     def _place_small_keys(self: Self, item_pool: list[Item]) -> None:
         """Place all small keys in `item_pool`."""
         logger.debug('Placing small keys...')
         key_pool = [item for item in item_pool if item.name.startswith('SmallKey_')]
         for item in key_pool:
-            possible_checks: OrderedSet[Check] = OrderedSet(
-                [
-                    check
-                    for area in self.aux_data.areas
-                    for room in area.rooms
-                    for node in room.nodes
-                    for check in node.checks
-                    if node.area.name == item.name[9:]
-                ]
-            )
-            self._place_item(item, item_pool, possible_checks, use_logic=False)
-        for item in key_pool:
-            item_pool.remove(item)
+            self._place_item(item, item_pool, self.candidate_checks[item.name], use_logic=False)
+        _remove_items(item_pool, key_pool)
 
     def _place_important_items(self: Self, item_pool: list[Item]) -> None:
         """Place all "important" items in the given item_pool."""
@@ -354,8 +936,7 @@ class Shuffler:
         important_items = [item for item in item_pool if item.name in IMPORTANT_ITEMS]
         for item in important_items:
             self._place_item(item, item_pool)
-        for item in important_items:
-            item_pool.remove(item)
+        _remove_items(item_pool, important_items)
 
     def _place_rest_of_items(self: Self, item_pool: list[Item]) -> None:
         """Place all items remaining in item_pool."""
@@ -374,84 +955,473 @@ class Shuffler:
         flags: set[str],
         states: set[str],
     ) -> OrderedSet[Node]:
+        item_counts = Counter(item.name for item in items)
+        return self._search(
+            self.requirement_index.inventory(item_counts.elements(), flags, states),
+            _small_key_counts(item_counts),
+        )
+
+    def search_many(
+        self: Self, searches: Sequence[tuple[list[Item], set[str], set[str]]]
+    ) -> list[set[Node]]:
+        """
+        Run `search` for each (items, flags, states) tuple in `searches`. With the numpy
+        search backend, every search is run at once.
+        """
+        inventories = []
+        for items, flags, states in searches:
+            item_counts = Counter(item.name for item in items)
+            inventories.append(
+                (
+                    self.requirement_index.inventory(item_counts.elements(), flags, states),
+                    _small_key_counts(item_counts),
+                )
+            )
+
+        if self.search_engine is None:
+            return [set(self._search(*inventory)) for inventory in inventories]
+
+        nodes = self.search_engine.nodes
+        return [
+            {nodes[i] for i in reachable.nonzero()[0]}
+            for reachable in self.search_engine.search_many(inventories, self.starting_node)
+        ]
+
+    def _search(
+        self: Self,
+        inventory: Inventory,
+        key_counts: dict[str, int],
+        scope: SearchScope | None = None,
+    ) -> OrderedSet[Node]:
+        """
+        Implementation of `search`, taking the inventory that edges are evaluated against
+        and the number of small keys for each area. If `scope` is given, the search starts
+        at its entry points and never leaves it.
+        """
+        if self.search_engine is not None and scope is None:
+            return self.search_engine.search(inventory, key_counts, self.starting_node)
+
+        if self.condensed_graph is not None and scope is None:
+            return self.condensed_graph.search(
+                inventory, KeyLogic(key_counts, self._locked_doors), self.starting_node
+            )
+
         reachable_nodes: OrderedSet[Node] = OrderedSet()
 
-        queue: deque[Node] = deque([self.starting_node])
+        start = [self.starting_node] if scope is None else scope.entry_points
 
-        # Mapping to keep track of the state of `locks` (unlocked vs locked)
-        locks: dict[str, bool] = {}
+        queue: deque[Node] = deque(start)
+
+        key_logic: KeyLogic | RoundKeyLogic
+        if self.strict_key_logic:
+            key_logic = KeyLogic(key_counts, self._locked_doors)
+        else:
+            key_logic = RoundKeyLogic(key_counts)
 
-        visited_nodes: set[Node] = {self.starting_node}
+        visited_nodes: set[Node] = set(start)
 
         while len(queue) > 0:
-            # Mapping to keep track of edges that contain an `open` descriptor, but are
-            # otherwise traversable
-            edges_with_locked_door: dict[str, list[Edge]] = defaultdict(list)
             while len(queue) > 0:
                 r = queue.popleft()
                 for edge in r.edges:
                     target = edge.dest
 
-                    requirements_met = edge.is_traversable(
-                        [i.name for i in items],
-                        flags,
-                        states,
-                        self,
-                    )
+                    assert edge.requirement is not None
+                    requirements_met = edge.requirement.evaluate(inventory)
 
                     if requirements_met and target not in visited_nodes:
-                        if edge.locked_door:
-                            edges_with_locked_door[edge.src.area.name].append(edge)
-                        else:
-                            queue.append(target)
-                            visited_nodes.add(target)
+                        if scope is not None and target not in scope.nodes:
+                            continue
+                        if edge.locked_door and not key_logic.reach(edge):
+                            continue
+                        queue.append(target)
+                        visited_nodes.add(target)
                 reachable_nodes.add(r)
 
-            # Calculate key counts for each area
-            keys: dict[str, int] = defaultdict(int)
-            for item in items:
-                if item.name.startswith('SmallKey_'):
-                    area_name = item.name[9:]
-                    keys[area_name] += 1
-
-            # Record any newly-reachable locked doors
-            for node in reachable_nodes:
-                if not node.lock:
-                    continue
-                full_lock_name = '.'.join([node.area.name, node.room.name, node.lock])
-                if full_lock_name in locks:
-                    continue
-                locks[full_lock_name] = False
-
-            # Figure out which doors we can unlock, and mark
-            # them as "unlocked" + update key counts
-            for area_name, edges in edges_with_locked_door.items():
-                doors_to_unlock = {e.locked_door for e in edges}
-                if keys[area_name] >= len(doors_to_unlock):
-                    keys[area_name] -= len(doors_to_unlock)
-                    for door in doors_to_unlock:
-                        assert door is not None
-                        locks[door] = True
-
-            for edges in edges_with_locked_door.values():
-                for edge in edges:
-                    assert edge.locked_door is not None
-                    if locks.get(edge.locked_door):
+            # Open any locked doors that we have enough keys for, now that every
+            # door reachable without them has been found
+            if isinstance(key_logic, RoundKeyLogic):
+                for edge in key_logic.open_doors():
+                    queue.append(edge.dest)
+                    visited_nodes.add(edge.dest)
+            else:
+                for edge in key_logic.open_doors(visited_nodes.__contains__):
+                    if edge.dest not in visited_nodes:
                         queue.append(edge.dest)
                         visited_nodes.add(edge.dest)
 
         return reachable_nodes
 
-    def assumed_search(self: Self, items: list[Item], area: str | None = None) -> OrderedSet[Node]:
+    def _resume_search(
+        self: Self,
+        previous: _ResumableSearch | None,
+        inventory: Inventory,
+        key_counts: dict[str, int],
+    ) -> _ResumableSearch:
+        """
+        Search with `inventory` and `key_counts` by continuing the search of the previous
+        pass of an assumed search, or from scratch if its result could have changed in a way
+        that a continued search can't account for: something was lost since the previous
+        pass, or a door has been opened in an area where more reachable doors could have
+        kept it locked.
+        """
+        if (
+            previous is not None
+            and _inventory_grew(previous.inventory, inventory)
+            and all(key_counts.get(area, 0) >= count for area, count in previous.key_counts.items())
+        ):
+            # More keys may unlock areas, so the key counts are updated before checking
+            previous.key_counts.update(key_counts)
+            if not previous.search.key_logic.opened_key_locked_doors():
+                edges = self._dependency_index.affected_edges(previous.inventory, inventory)
+                previous.reachable_nodes.update(previous.search.expand(inventory, edges))
+                previous.inventory = inventory
+                return previous
+
+        key_counts = dict(key_counts)
+        # Later passes pass the edges to evaluate again to `expand`, so blocked edges are
+        # never needed
+        search = IncrementalSearch(
+            self.starting_node, KeyLogic(key_counts, self._locked_doors), track_blocked=False
+        )
+        return _ResumableSearch(
+            search, key_counts, inventory, OrderedSet(search.expand(inventory, ()))
+        )
+
+    def playthrough(
+        self: Self, fill_state: FillState | None = None
+    ) -> list[list[tuple[Node, Check]]]:
+        """
+        Return the spheres of a minimal playthrough of the items of `fill_state` (by default,
+        the fill state that was loaded or generated last), i.e. the checks that can be
+        reached with no items (sphere 0), then the checks that can be reached with the items
+        from sphere 0 (sphere 1), and so on.
+
+        Only checks with items that are needed to reach the goal node are included:
+        progression items (items that logic depends on) are dropped from the playthrough,
+        latest sphere first, as long as the goal node can still be reached without them.
+        If the logic has no goal node, the goal is every node that can be reached when
+        collecting every progression item. If the goal node can't be reached, nothing is
+        dropped, and the playthrough lists every progression item it can collect; see
+        `beatable_playthrough` to tell the two apart.
+        """
+        spheres, _ = self._playthrough(self._fill_slots(fill_state))
+        return spheres
+
+    def beatable_playthrough(
+        self: Self, fill_state: FillState | None = None
+    ) -> list[list[tuple[Node, Check]]] | None:
+        """
+        Return the playthrough of `fill_state` like `playthrough`, or `None` if its goal node
+        can't be reached, e.g. for spoiler logs, which shouldn't present a playthrough that
+        doesn't finish the game as a route through the seed.
+        """
+        spheres, beatable = self._playthrough(self._fill_slots(fill_state))
+        return spheres if beatable else None
+
+    def _playthrough(self: Self, slots: FillSlots) -> tuple[list[list[tuple[Node, Check]]], bool]:
+        """
+        Implementation of `playthrough` and `beatable_playthrough`. In addition to the
+        spheres, returns whether the goal node was reached.
+        """
+        # Progress of the playthrough right before each of its spheres was collected
+        checkpoints: list[_Playthrough] = []
+        full = self._continue_playthrough(
+            self._new_playthrough(slots, set()),
+            None if self.goal_node is None else {self.goal_node},
+            checkpoints,
+        )
+        if self.goal_node is None:
+            goal = set(full.reached_nodes)
+        elif self.goal_node in full.reached_nodes:
+            goal = {self.goal_node}
+        else:
+            logger.debug(f"{self.goal_node.name} can't be reached, so nothing is pruned")
+            return full.spheres, False
+
+        # Removing the items of a sphere doesn't change anything that happened before it was
+        # collected, so each attempt continues from the checkpoint of the sphere the item
+        # was found in, rather than playing through the seed from scratch
+        removed: set[int] = set()
+        for checkpoint, sphere in reversed(list(zip(checkpoints, full.spheres))):
+            for _, check in reversed(sphere):
+                check_id = self._check_ids[check]
+                removed.add(check_id)
+                attempt = checkpoint.copy()
+                attempt.collected.update(removed)
+                if not goal <= self._continue_playthrough(attempt, goal).reached_nodes:
+                    removed.remove(check_id)
+        return self._continue_playthrough(self._new_playthrough(slots, removed)).spheres, True
+
+    def _spheres(
+        self: Self,
+        removed: set[int],
+        goal: set[Node] | None = None,
+        fill_state: FillState | None = None,
+    ) -> tuple[list[list[tuple[Node, Check]]], set[Node]]:
+        """
+        Return the spheres of a playthrough of `fill_state` in which the items in the checks
+        with the ids in `removed` are never collected, and every node it reached. If `goal`
+        is given, the playthrough stops as soon as all of its nodes have been reached.
+        """
+        playthrough = self._continue_playthrough(
+            self._new_playthrough(self._fill_slots(fill_state), removed), goal
+        )
+        return playthrough.spheres, playthrough.reached_nodes
+
+    def _new_playthrough(self: Self, slots: FillSlots, removed: set[int]) -> _Playthrough:
+        """
+        Return a playthrough of the items in `slots` that hasn't started yet, and never
+        collects the items in the checks with the ids in `removed`.
+        """
+        return _Playthrough(
+            slots=slots,
+            item_counts=Counter(),
+            flags=set(),
+            states=set(),
+            collected=set(removed),
+            reached_nodes=set(),
+            reachable_nodes=None,
+            search=None,
+            spheres=[],
+        )
+
+    def _continue_playthrough(
+        self: Self,
+        playthrough: _Playthrough,
+        goal: set[Node] | None = None,
+        checkpoints: list[_Playthrough] | None = None,
+    ) -> _Playthrough:
+        """
+        Play through the items of `playthrough.slots`, continuing from `playthrough` (which is
+        updated in place and returned), until no more progression items can be collected.
+        If `goal` is given, the playthrough stops as soon as all of its nodes have been
+        reached. If `checkpoints` is given, a copy of the playthrough is added to it right
+        before each sphere is collected; continuing a checkpoint collects that sphere next,
+        except for the checks that were added to its `collected` in the meantime.
+
+        Within a sphere, flags and states take effect as soon as they're reached, and states
+        are lost the same way as in `_assumed_search`. Locked doors are opened by the same
+        rules as in the fill's searches, see `_explore`.
+        """
+        slots = playthrough.slots
+        node_check_ids = self._node_check_ids
+
+        if playthrough.reachable_nodes is None and self._explore(playthrough, goal):
+            return playthrough
+
+        while True:
+            assert playthrough.reachable_nodes is not None
+            sphere = [
+                (node, self.checks[check_id])
+                for node in playthrough.reachable_nodes
+                for check_id in node_check_ids[node]
+                if check_id not in playthrough.collected
+                and slots[check_id] != EMPTY
+                and self._is_progression(ITEM_REGISTRY[slots[check_id]])
+            ]
+            if not sphere:
+                return playthrough
+            if checkpoints is not None:
+                checkpoints.append(playthrough.copy())
+            playthrough.spheres.append(sphere)
+
+            for _, check in sphere:
+                check_id = self._check_ids[check]
+                playthrough.collected.add(check_id)
+                item = ITEM_REGISTRY[slots[check_id]]
+                playthrough.item_counts[item.name] += 1
+                playthrough.states.update(item.states)
+
+            if self._explore(playthrough, goal):
+                return playthrough
+
+    def _explore(self: Self, playthrough: _Playthrough, goal: set[Node] | None) -> bool:
+        """
+        Search with the items of `playthrough` until the flags and states it reaches stop
+        changing. Returns whether every node of `goal` has been reached.
+
+        If the fill's searches charge opened doors against the keys (see `KeyLogic`), each
+        search continues the previous one (see `_resume_search`), so locked doors stay open
+        once they've been opened. Otherwise, whether a door opens depends on every door
+        reached in the same round of the search (see `RoundKeyLogic`), which a continued
+        search can't reproduce, so each search starts over like the fill's.
+        """
+        item_counts = playthrough.item_counts
+        flags = playthrough.flags
+        states = playthrough.states
+
+        # States held after each search. Losing states may make nodes that gain them
+        # unreachable again, so they could otherwise keep changing.
+        seen_states: set[frozenset[str]] = set()
+        while True:
+            inventory = self.requirement_index.inventory(item_counts.elements(), flags, states)
+            key_counts = _small_key_counts(item_counts)
+            if self._recounts_keys():
+                reachable_nodes = self._search(inventory, key_counts)
+            else:
+                playthrough.search = self._resume_search(playthrough.search, inventory, key_counts)
+                reachable_nodes = playthrough.search.reachable_nodes
+            playthrough.reachable_nodes = reachable_nodes
+            playthrough.reached_nodes.update(reachable_nodes)
+            if goal is not None and goal <= playthrough.reached_nodes:
+                return True
+            seen_states.add(frozenset(states))
+            found_flags = False
+            for node in reachable_nodes:
+                if not node.flags <= flags:
+                    flags.update(node.flags)
+                    found_flags = True
+                states.update(node.states_gained)
+                states.difference_update(node.states_lost)
+            if not found_flags and frozenset(states) in seen_states:
+                return False
+
+    def _recounts_keys(self: Self) -> bool:
+        """
+        Whether the fill's searches recount the small keys in every round of a search (see
+        `RoundKeyLogic`), rather than charging opened doors against them (see `KeyLogic`).
+        """
+        return not (
+            self.strict_key_logic
+            or self.incremental_search
+            or self.search_engine is not None
+            or self.condensed_graph is not None
+        )
+
+    def _is_progression(self: Self, item: Item) -> bool:
+        """Whether logic depends on `item`."""
+        return bool(
+            item.name in self.requirement_index.items
+            or item.name in self.requirement_index.counted_items
+            or item.name.startswith('SmallKey_')
+            or item.states
+        )
+
+    def assumed_search(
+        self: Self,
+        items: list[Item],
+        area: str | None = None,
+        fill_state: FillState | None = None,
+    ) -> OrderedSet[Node]:
+        """
+        Return the nodes that can be reached with `items`, and the items in the checks of
+        `fill_state` (by default, the fill state that was loaded or generated last).
+        """
+        reachable_nodes, _ = self._assumed_search(items, self._fill_slots(fill_state), area)
+        return reachable_nodes
+
+    def search_scope(self: Self, area: str, room: str | None = None) -> SearchScope:
+        """
+        Return the scope consisting of every node in the given area (or in a single room
+        of it), for use with `scoped_search`.
+
+        Its entry points are the nodes that an edge from outside of the scope leads to,
+        as well as the starting node if it's in the scope.
+        """
+        key = (area, room)
+        if key not in self._search_scopes:
+            nodes = frozenset(
+                node
+                for a in self.aux_data.areas
+                if a.name == area
+                for r in a.rooms
+                if room is None or r.name == room
+                for node in r.nodes
+            )
+            if not nodes:
+                raise ValueError(f'No nodes found in {area if room is None else f"{area}.{room}"}')
+
+            entry_points: OrderedSet[Node] = OrderedSet()
+            if self.starting_node in nodes:
+                entry_points.add(self.starting_node)
+            for a in self.aux_data.areas:
+                for r in a.rooms:
+                    for node in r.nodes:
+                        if node in nodes:
+                            continue
+                        for edge in node.edges:
+                            if edge.dest in nodes:
+                                entry_points.add(edge.dest)
+
+            self._search_scopes[key] = SearchScope(nodes, tuple(entry_points))
+        return self._search_scopes[key]
+
+    def scoped_search(
+        self: Self,
+        items: list[Item],
+        area: str,
+        room: str | None = None,
+        flags: set[str] | None = None,
+        states: set[str] | None = None,
+        fill_state: FillState | None = None,
+    ) -> ScopedSearchResult:
+        """
+        Assumed search limited to a single area or room, e.g. to check whether a dungeon can
+        be completed with the given items.
+
+        Unlike `assumed_search(items, area=...)`, the rest of the world isn't searched at
+        all: the player is assumed to be able to reach every entry point of the scope (see
+        `search_scope`), and only items, flags and states found inside of it are collected,
+        in addition to `items`, `flags` and `states`. Items are found in the checks of
+        `fill_state`, like in `assumed_search`.
+        """
+        reachable_nodes, _ = self._assumed_search(
+            items,
+            self._fill_slots(fill_state),
+            scope=self.search_scope(area, room),
+            flags=flags,
+            states=states,
+        )
+        return ScopedSearchResult(reachable_nodes)
+
+    def _assumed_search(
+        self: Self,
+        items: list[Item],
+        slots: FillSlots,
+        area: str | None = None,
+        scope: SearchScope | None = None,
+        flags: set[str] | None = None,
+        states: set[str] | None = None,
+    ) -> tuple[OrderedSet[Node], set[Node]]:
+        """
+        Implementation of `assumed_search` and `scoped_search`. In addition to the reachable
+        nodes, returns the nodes that were only reached in the final pass of the search.
+        Items are found in the checks of `slots`.
+        """
         # Used to keep track of what checks/flags we've encountered
-        completed_checks: set[Check] = set()
+        completed_checks: set[int] = set()
+        node_check_ids = self._node_check_ids
 
-        flags: set[str] = set()
-        items = deepcopy(items)  # make copy of items so we don't mutate the original list
-        states: set[str] = {state for item in items for state in item.states}
+        flags = set() if flags is None else set(flags)
+        # Only the number of each item matters, so collected items are counted rather than
+        # added to a copy of `items`
+        item_counts = Counter(item.name for item in items)
+        states = set() if states is None else set(states)
+        states.update(state for item in items for state in item.states)
+
+        # Nodes reached in any pass before the current one
+        previously_reached_nodes: set[Node] = set()
+
+        # Search that each pass continues, if searches are incremental
+        resumable_search: _ResumableSearch | None = None
+        incremental = (
+            self.incremental_search
+            and scope is None
+            and self.search_engine is None
+            and self.condensed_graph is None
+        )
 
         while True:
-            reachable_nodes = self.search(items, flags, states)
+            inventory = self.requirement_index.inventory(item_counts.elements(), flags, states)
+            key_counts = _small_key_counts(item_counts)
+            if incremental:
+                resumable_search = self._resume_search(resumable_search, inventory, key_counts)
+                # Copied, since the search keeps adding to its own set in later passes
+                reachable_nodes = OrderedSet(resumable_search.reachable_nodes)
+            else:
+                reachable_nodes = self._search(inventory, key_counts, scope)
+
             if area is not None:
                 reachable_nodes = OrderedSet(
                     [node for node in reachable_nodes if node.area.name == area]
@@ -459,13 +1429,14 @@ class Shuffler:
             found_new_items = False
 
             for node in reachable_nodes:
-                for check in node.checks:
-                    if check.contents and check not in completed_checks:
-                        item = check.contents
-                        items.append(item)
+                for check_id in node_check_ids[node]:
+                    item_id = slots[check_id]
+                    if item_id != EMPTY and check_id not in completed_checks:
+                        item = ITEM_REGISTRY[item_id]
+                        item_counts[item.name] += 1
                         states.update(item.states)
                         found_new_items = True
-                        completed_checks.add(check)
+                        completed_checks.add(check_id)
                 for flag in node.flags:
                     if flag not in flags:
                         flags.add(flag)
@@ -479,4 +1450,134 @@ class Shuffler:
             if not found_new_items:
                 break
 
-        return reachable_nodes
+            previously_reached_nodes.update(reachable_nodes)
+
+        return reachable_nodes, set(reachable_nodes) - previously_reached_nodes
+
+
+def generate_many(
+    seeds: Sequence[str],
+    settings: dict[str, str | set[str] | bool],
+    max_workers: int | None = None,
+    **shuffler_kwargs: Any,
+) -> list[FillState]:
+    """
+    Generate every seed in `seeds` with the same settings on a pool of threads, and return
+    their fill states, in the same order as `seeds`. `Shuffler.load_fill_state` turns a fill
+    state into aux data.
+
+    Each thread generates its seeds with its own `Shuffler`, so the logic graph is built once
+    per thread rather than once per seed, and every seed comes out exactly the same as when
+    it's generated on its own.
+
+    Params:
+        max_workers: Number of threads to use. Defaults to the number of CPUs.
+        shuffler_kwargs: Passed on to `Shuffler`.
+    """
+    if not seeds:
+        return []
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(seeds))
+
+    # The shufflers are all built up front, on this thread, since building one may start a
+    # process pool to parse the logic (see `parse_aux_data`)
+    shufflers: queue.SimpleQueue[Shuffler] = queue.SimpleQueue()
+    for _ in range(max_workers):
+        shufflers.put(Shuffler(seeds[0], settings, **shuffler_kwargs))
+
+    def _generate(seed: str) -> FillState:
+        shuffler = shufflers.get()
+        try:
+            fill_state = shuffler.new_fill_state(seed)
+            shuffler.fill(fill_state)
+            return fill_state
+        finally:
+            shufflers.put(shuffler)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_generate, seeds))
+
+
+# The `Shuffler` that fill attempts run on in each process of `generate_speculative`
+_attempt_shuffler: Shuffler | None = None
+
+
+def _init_attempt_worker(
+    settings: dict[str, str | set[str] | bool], kwargs: dict[str, Any]
+) -> None:
+    global _attempt_shuffler
+    # This already runs in a pool's worker process, so the logic is loaded serially here
+    # rather than by starting another pool from each worker
+    _attempt_shuffler = Shuffler('', settings, **{**kwargs, 'loader_workers': 1})
+
+
+def _fill_attempt(seed: str) -> FillState | None:
+    """Make a single fill attempt for `seed`, returning its fill state if it succeeded."""
+    assert _attempt_shuffler is not None
+    fill_state = _attempt_shuffler.new_fill_state(seed)
+    try:
+        _attempt_shuffler.fill(fill_state)
+    except AssumedFillFailed:
+        return None
+    return fill_state
+
+
+def attempt_seed(seed: str, attempt: int) -> str:
+    """Return the seed that fill attempt number `attempt` of `generate_speculative` uses."""
+    return f'{seed}:{attempt}'
+
+
+def generate_speculative(
+    seed: str,
+    settings: dict[str, str | set[str] | bool],
+    max_workers: int | None = None,
+    max_attempts: int | None = None,
+    **shuffler_kwargs: Any,
+) -> FillState:
+    """
+    Generate `seed` by making fill attempts in parallel, on a pool of processes.
+
+    Attempt `i` fills the checks with a `random.Random` seeded with `attempt_seed(seed, i)`
+    and gives up as soon as it fails, instead of retrying. The result is the first attempt
+    (by number) that succeeds, so it only depends on the seed and settings, not on the
+    number of processes or on which attempt happens to finish first. Attempts are made in
+    order, `max_workers` at a time, until one succeeds.
+
+    Note that seeds generated like this differ from seeds generated by `Shuffler.generate`.
+
+    Params:
+        max_workers: Number of processes to use. Defaults to the number of CPUs.
+        max_attempts: Number of attempts to make before giving up with
+                      `AssumedFillFailed`. Unlimited by default.
+        shuffler_kwargs: Passed on to `Shuffler`. `max_fill_retries` defaults to 0, so that
+                         each attempt only tries to fill the checks once.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    shuffler_kwargs.setdefault('max_fill_retries', 0)
+
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_attempt_worker,
+        initargs=(settings, shuffler_kwargs),
+    )
+    try:
+        attempts: deque[Future[FillState | None]] = deque()
+        for _ in range(max_workers if max_attempts is None else min(max_workers, max_attempts)):
+            attempts.append(executor.submit(_fill_attempt, attempt_seed(seed, len(attempts))))
+        submitted = len(attempts)
+
+        while attempts:
+            fill_state = attempts.popleft().result()
+            if fill_state is not None:
+                fill_state.seed = seed
+                return fill_state
+            if max_attempts is None or submitted < max_attempts:
+                attempts.append(executor.submit(_fill_attempt, attempt_seed(seed, submitted)))
+                submitted += 1
+    finally:
+        # Attempts after the successful one are no longer needed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    raise AssumedFillFailed(f'All {max_attempts} fill attempts failed')
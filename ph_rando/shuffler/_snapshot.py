@@ -0,0 +1,175 @@
+"""
+On-disk snapshots of the fully built logic graph.
+
+Building the logic graph (parsing aux data, parsing .logic files and wiring up all of the
+nodes and edges) is by far the most expensive part of creating a `Shuffler`. Since the
+result only depends on the input files, it can be saved to disk once and loaded on later
+runs instead of being rebuilt from scratch.
+
+Each snapshot file starts with a header containing a hash of every input file, of the
+source of the modules that build the graph, and of the randomizer version. If the hash
+doesn't match the current inputs, the snapshot is considered stale and is rebuilt and
+replaced.
+"""
+
+from __future__ import annotations
+
+from dataclasses import fields
+import hashlib
+import importlib
+import io
+import logging
+import os
+from pathlib import Path
+import pickle
+from typing import Any
+
+from ph_rando import __version__
+from ph_rando.common import ShufflerAuxData
+from ph_rando.shuffler._parser import Node
+
+logger = logging.getLogger(__name__)
+
+# Bump this whenever the layout of the snapshot (or of the graph classes) changes,
+# so that snapshots written by older versions of the code are ignored.
+SNAPSHOT_FORMAT_VERSION = 3
+
+_MAGIC = b'PHRANDO-LOGIC-SNAPSHOT'
+
+# Modules whose code builds the logic graph, or defines the classes stored in snapshots.
+# Their source is part of the snapshot key, so that editing them (e.g. in an editable
+# install) invalidates existing snapshots.
+_GRAPH_MODULES = (
+    'ph_rando.shuffler.aux_models',
+    'ph_rando.shuffler._descriptors',
+    'ph_rando.shuffler._logic_parser',
+    'ph_rando.shuffler._parser',
+    'ph_rando.shuffler._requirements',
+    'ph_rando.shuffler._snapshot',
+)
+
+
+def snapshot_key(
+    areas_directory: Path,
+    enemy_mapping_file: Path,
+    macros_file: Path,
+) -> str:
+    """Return a hash of all of the inputs that the logic graph is built from."""
+    digest = hashlib.sha256()
+    digest.update(f'{__version__}:{SNAPSHOT_FORMAT_VERSION}'.encode())
+    for module_name in _GRAPH_MODULES:
+        module_file = importlib.import_module(module_name).__file__
+        digest.update(module_name.encode())
+        # Frozen builds may not ship the source, but their code can't change without a new
+        # version either
+        if module_file is not None and os.path.isfile(module_file):
+            digest.update(hashlib.sha256(Path(module_file).read_bytes()).digest())
+    # Area files are identified by their path relative to the areas directory, since the
+    # same file name may be used in several of its subdirectories
+    input_files = sorted(
+        (file.relative_to(areas_directory).as_posix(), file)
+        for file in [*areas_directory.rglob('*.json'), *areas_directory.rglob('*.logic')]
+    )
+    input_files += [(enemy_mapping_file.name, enemy_mapping_file), (macros_file.name, macros_file)]
+    for name, file in input_files:
+        digest.update(name.encode())
+        digest.update(hashlib.sha256(file.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def snapshot_path(cache_directory: Path, areas_directory: Path) -> Path:
+    """
+    Return the location of the snapshot for the logic in `areas_directory`.
+
+    Snapshots are named after the location of the logic rather than its contents, so
+    that a snapshot is replaced (instead of accumulating a new file) when the logic changes.
+    """
+    location_hash = hashlib.sha256(str(areas_directory.resolve()).encode()).hexdigest()
+    return cache_directory / f'logic-{location_hash[:16]}.snapshot'
+
+
+class _SnapshotPickler(pickle.Pickler):
+    """
+    Pickler that stores references to `Node`s as indices into a flat node table.
+
+    The logic graph is full of cycles, and pickling it naively recurses once per edge that
+    is followed, which overflows the stack for a graph the size of the full game.
+    """
+
+    def __init__(self, file: io.BytesIO, node_ids: dict[int, int]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._node_ids = node_ids
+
+    def persistent_id(self, obj: Any) -> int | None:
+        if isinstance(obj, Node):
+            return self._node_ids[id(obj)]
+        return None
+
+
+class _SnapshotUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO) -> None:
+        super().__init__(file)
+        self.nodes: dict[int, Node] = {}
+
+    def persistent_load(self, pid: Any) -> Node:
+        if pid not in self.nodes:
+            self.nodes[pid] = Node.__new__(Node)
+        return self.nodes[pid]
+
+
+def save_snapshot(snapshot_file: Path, key: str, aux_data: ShufflerAuxData) -> None:
+    """Serialize the given logic graph to `snapshot_file`."""
+    nodes = [node for area in aux_data.areas for room in area.rooms for node in room.nodes]
+    node_ids = {id(node): i for i, node in enumerate(nodes)}
+    node_table = [tuple(getattr(node, f.name) for f in fields(Node)) for node in nodes]
+
+    buffer = io.BytesIO()
+    _SnapshotPickler(buffer, node_ids).dump(
+        (aux_data.areas, aux_data.enemy_requirements, aux_data.requirement_macros, node_table)
+    )
+
+    snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temporary file first so that a concurrent reader never sees a partial snapshot
+    tmp_file = snapshot_file.with_name(f'{snapshot_file.name}.{os.getpid()}.tmp')
+    tmp_file.write_bytes(b'\n'.join([_MAGIC, key.encode(), buffer.getvalue()]))
+    os.replace(tmp_file, snapshot_file)
+    logger.debug(f'Saved logic snapshot to {snapshot_file}')
+
+
+def load_snapshot(snapshot_file: Path, key: str) -> ShufflerAuxData | None:
+    """
+    Load the logic graph stored in `snapshot_file`.
+
+    Returns `None` if the snapshot doesn't exist, was built from different inputs
+    than the ones described by `key`, or can't be read.
+    """
+    try:
+        magic, snapshot_key, payload = snapshot_file.read_bytes().split(b'\n', 2)
+    except (OSError, ValueError):
+        return None
+
+    if magic != _MAGIC or snapshot_key != key.encode():
+        logger.debug(f'Logic snapshot {snapshot_file} is stale, ignoring it')
+        return None
+
+    unpickler = _SnapshotUnpickler(io.BytesIO(payload))
+    try:
+        areas, enemy_requirements, requirement_macros, node_table = unpickler.load()
+    except Exception:
+        logger.warning(f'Failed to load logic snapshot {snapshot_file}, ignoring it')
+        return None
+
+    node_fields = [f.name for f in fields(Node)]
+    for i, values in enumerate(node_table):
+        node = unpickler.persistent_load(i)
+        for name, value in zip(node_fields, values):
+            setattr(node, name, value)
+
+    logger.debug(f'Loaded logic snapshot from {snapshot_file}')
+
+    return ShufflerAuxData(
+        areas=areas,
+        enemy_requirements=enemy_requirements,
+        requirement_macros=requirement_macros,
+    )
@@ -1,17 +1,31 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from pydantic import BaseModel
 
 from ph_rando import __version__
 from ph_rando.common import ShufflerAuxData
 
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Node
+    from ph_rando.shuffler.aux_models import Check
+
 
 class SpoilerLog(BaseModel):
     version: str
     seed: str
     settings: dict
     items: dict[str, dict[str, dict[str, str]]]
+    # Items needed to finish the game, by the sphere they're found in, see `Shuffler.playthrough`
+    playthrough: list[dict[str, str]] = []
 
 
-def generate_spoiler_log(randomized_aux_data: ShufflerAuxData, settings: dict) -> SpoilerLog:
+def generate_spoiler_log(
+    randomized_aux_data: ShufflerAuxData,
+    settings: dict,
+    playthrough: list[list[tuple[Node, Check]]] | None = None,
+) -> SpoilerLog:
     seed = randomized_aux_data.seed
     assert seed is not None
 
@@ -25,9 +39,20 @@ def generate_spoiler_log(randomized_aux_data: ShufflerAuxData, settings: dict) -
             for chest in room.chests:
                 items[area.name][room.name][chest.display_name or chest.name] = chest.contents.name
 
+    spheres = [
+        {
+            f'{node.area.name}.{node.room.name}.{check.display_name or check.name}': (
+                check.contents.name
+            )
+            for node, check in sphere
+        }
+        for sphere in playthrough or []
+    ]
+
     return SpoilerLog(
         version=__version__,
         seed=seed,
         items=items,
         settings=settings,
+        playthrough=spheres,
     )
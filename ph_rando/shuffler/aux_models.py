@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Iterable
+from functools import cache
 import json
 from pathlib import Path
-from typing import TYPE_CHECKING, Annotated, Literal, TypeAlias, Union
+import threading
+from typing import TYPE_CHECKING, Annotated, Any, Literal, TypeAlias, Union
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
@@ -10,25 +13,128 @@ if TYPE_CHECKING:
     from ph_rando.shuffler._shuffler import Node
 
 
+@cache
+def _item_names() -> frozenset[str]:
+    """Names of all valid items, loaded once per process."""
+    from ph_rando.patcher._items import ITEMS
+
+    return frozenset(ITEMS)
+
+
+class ItemRegistry:
+    """
+    Interned `Item`s: a single shared instance of each distinct item (by name and states),
+    each with a small integer id. Checks intern their contents when they're loaded, so
+    items can be compared with `is` (or by id) rather than by their fields.
+
+    Items without states are registered up front in the order of the patcher's item table,
+    so their ids are the same in every process. Items with states get the next free id the
+    first time they're interned. Registration is guarded by a lock, so items can be interned
+    from several threads at once (e.g. by concurrent `Shuffler`s).
+    """
+
+    __slots__ = ('_items', '_ids', '_lock', '_item_table_registered')
+
+    def __init__(self) -> None:
+        self._items: list[Item] = []
+        self._ids: dict[tuple[str, frozenset[str]], int] = {}
+        self._lock = threading.Lock()
+        self._item_table_registered = False
+
+    def __len__(self) -> int:
+        self._register_item_table()
+        return len(self._items)
+
+    def __getitem__(self, item_id: int) -> Item:
+        """Return the item with the given id."""
+        self._register_item_table()
+        return self._items[item_id]
+
+    def get(self, name: str, states: Iterable[str] = ()) -> Item:
+        """Return the interned item with the given name and states."""
+        return self._items[self._id(name, frozenset(states))]
+
+    def intern(self, item: Item) -> Item:
+        """Return the interned item that is equal to `item`."""
+        return self._items[self._id(item.name, item.states)]
+
+    def id(self, item: Item) -> int:
+        """Return the id of the interned item that is equal to `item`."""
+        return self._id(item.name, item.states)
+
+    def _id(self, name: str, states: frozenset[str]) -> int:
+        self._register_item_table()
+        item_id = self._ids.get((name, states))
+        if item_id is None:
+            with self._lock:
+                # Another thread may have registered the item while this one waited
+                item_id = self._ids.get((name, states))
+                if item_id is None:
+                    item_id = self._register(Item(name=name, states=states))
+        return item_id
+
+    def _register(self, item: Item) -> int:
+        # The item is added before its id, so an id can be looked up without the lock
+        item_id = len(self._items)
+        self._items.append(item)
+        self._ids[(item.name, item.states)] = item_id
+        return item_id
+
+    def _register_item_table(self) -> None:
+        if self._item_table_registered:
+            return
+        with self._lock:
+            if not self._item_table_registered:
+                from ph_rando.patcher._items import ITEMS
+
+                for name in ITEMS:
+                    self._register(Item(name=name, states=frozenset()))
+                self._item_table_registered = True
+
+
+ITEM_REGISTRY = ItemRegistry()
+
+
+def _interned_item(name: str, states: frozenset[str]) -> Item:
+    return ITEM_REGISTRY.get(name, states)
+
+
+@cache
+def _enemy_types() -> frozenset[str]:
+    """Names of all valid enemy types, loaded once per process."""
+    return frozenset(json.loads((Path(__file__).parent / 'enemies.json').read_text()))
+
+
 class Item(BaseModel):
+    # Items are shared between checks (see `ItemRegistry`), so they can't be modified
+    model_config = ConfigDict(frozen=True)
+
     name: str
-    states: set[str] = Field(
-        set(),
+    states: frozenset[str] = Field(
+        frozenset(),
         description='State(s) that should be gained upon obtaining this item.',
     )
 
     def __repr__(self) -> str:
         s = self.name
         if self.states:
-            s += f' ({self.states})'
+            s += f' ({set(self.states)})'
         return s
 
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Unpickled items are interned, like the ones that are loaded
+        return _interned_item, (self.name, self.states)
+
+    def __copy__(self) -> Item:
+        return self
+
+    def __deepcopy__(self, memo: dict[int, Any] | None = None) -> Item:
+        return self
+
     @field_validator('name')
     def check_if_item_is_valid(cls, v: str) -> str:
         """Ensure that this check's `contents` is set to a valid item."""
-        from ph_rando.patcher._items import ITEMS
-
-        assert v in ITEMS
+        assert v in _item_names()
         return v
 
 
@@ -40,8 +146,13 @@ class BaseCheck(BaseModel):
         None, description='Human-readable name used in spoiler logs, etc.'
     )
 
-    def __hash__(self) -> int:
-        return id(self)
+    # Checks are hashed by identity, without calling into Python
+    __hash__ = object.__hash__
+
+    @field_validator('contents')
+    def intern_contents(cls, v: Item) -> Item:
+        """Share a single instance of each item between all checks that contain it."""
+        return ITEM_REGISTRY.intern(v)
 
 
 class Chest(BaseCheck):
@@ -185,9 +296,7 @@ class Enemy(BaseModel):
 
     @field_validator('type')
     def validate_enemy_name(cls, v: str) -> str:
-        assert v in json.loads(
-            (Path(__file__).parent / 'enemies.json').read_text()
-        ), f'{v} is not a valid enemy type'
+        assert v in _enemy_types(), f'{v} is not a valid enemy type'
         return v
 
 
@@ -1,15 +1,20 @@
+from __future__ import annotations
+
 import json
 import logging
 from pathlib import Path
 import random
 import string
 import sys
+from typing import TYPE_CHECKING
 
 import click
 
 from ph_rando.common import ShufflerAuxData, click_setting_options
-from ph_rando.shuffler._shuffler import Shuffler
-from ph_rando.shuffler._spoiler_log import generate_spoiler_log
+
+if TYPE_CHECKING:
+    from ph_rando.shuffler._parser import Node
+    from ph_rando.shuffler.aux_models import Check
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +29,31 @@ def shuffle(seed: str, settings: dict[str, str | set[str] | bool]) -> ShufflerAu
     Returns:
         Randomized aux data.
     """
+    from ph_rando.shuffler._shuffler import Shuffler
+
     shuffler = Shuffler(seed, settings)
 
     return shuffler.generate()
 
 
+def shuffle_with_playthrough(
+    seed: str, settings: dict[str, str | set[str] | bool]
+) -> tuple[ShufflerAuxData, list[list[tuple[Node, Check]]] | None]:
+    """
+    Like `shuffle`, but also returns the playthrough of the seed, for spoiler logs.
+
+    Returns:
+        Randomized aux data, and the spheres of the playthrough, or `None` if the seed
+        can't be beaten.
+    """
+    from ph_rando.shuffler._shuffler import Shuffler
+
+    shuffler = Shuffler(seed, settings)
+    aux_data = shuffler.generate()
+
+    return aux_data, shuffler.beatable_playthrough()
+
+
 @click.command()
 @click.option('-s', '--seed', type=str, required=False, help='Seed for the RNG.')
 @click.option(
@@ -69,7 +94,10 @@ def shuffler_cli(
         seed = ''.join(random.choices(string.ascii_letters, k=20))
         logger.info(f'No seed provided. Autogenerated seed :"{seed}"')
 
-    results = shuffle(seed, settings)
+    if spoiler_log:
+        results, playthrough = shuffle_with_playthrough(seed, settings)
+    else:
+        results = shuffle(seed, settings)
 
     if output == '--':
         for area in results.areas:
@@ -83,7 +111,9 @@ def shuffler_cli(
         (output_path / 'seed.txt').write_text(seed)
 
     if spoiler_log:
-        sl = generate_spoiler_log(results, settings).dict()
+        from ph_rando.shuffler._spoiler_log import generate_spoiler_log
+
+        sl = generate_spoiler_log(results, settings, playthrough).dict()
         Path(spoiler_log).write_text(json.dumps(sl, indent=2))
 
 
@@ -5,10 +5,6 @@ from pathlib import Path
 import click
 
 from ph_rando.common import click_setting_options
-from ph_rando.patcher._patcher import Patcher
-from ph_rando.shuffler._shuffler import Shuffler
-from ph_rando.shuffler._spoiler_log import generate_spoiler_log
-from ph_rando.shuffler._util import generate_random_seed
 
 
 @click.command()
@@ -51,6 +47,13 @@ def randomizer_cli(
     log_level: str,
     **settings: bool | str | set[str],
 ) -> None:
+    # The patcher and shuffler are imported here rather than at the top of the module,
+    # so that e.g. `--help` doesn't need to import them.
+    from ph_rando.patcher._patcher import Patcher
+    from ph_rando.shuffler._shuffler import Shuffler
+    from ph_rando.shuffler._spoiler_log import generate_spoiler_log
+    from ph_rando.shuffler._util import generate_random_seed
+
     logging.basicConfig(level=logging.getLevelNamesMapping()[log_level])
 
     # Generate random seed if one isn't provided
@@ -58,10 +61,13 @@ def randomizer_cli(
         seed = generate_random_seed()
 
     # Run the shuffler
-    shuffled_aux_data = Shuffler(seed, settings).generate()
+    shuffler = Shuffler(seed, settings)
+    shuffled_aux_data = shuffler.generate()
 
     if spoiler_log:
-        sl = generate_spoiler_log(shuffled_aux_data, settings).dict()
+        sl = generate_spoiler_log(
+            shuffled_aux_data, settings, shuffler.beatable_playthrough()
+        ).dict()
         Path(spoiler_log).write_text(json.dumps(sl, indent=2))
 
     patcher = Patcher(rom=input_rom_path, aux_data=shuffled_aux_data, settings=settings)
@@ -42,11 +42,15 @@ class RandomizerWorker(QObject):
 
     @Slot()
     def randomize(self) -> None:
-        # Run the shuffler
-        shuffled_aux_data = Shuffler(self.seed, self.settings).generate()
+        # Run the shuffler. This runs on a worker thread, which can't safely fork a pool of
+        # processes to load the logic in, so the logic is loaded in this process.
+        shuffler = Shuffler(self.seed, self.settings, loader_workers=1)
+        shuffled_aux_data = shuffler.generate()
 
         # Generate spoiler log
-        sl = generate_spoiler_log(shuffled_aux_data, self.settings).dict()
+        sl = generate_spoiler_log(
+            shuffled_aux_data, self.settings, shuffler.beatable_playthrough()
+        ).dict()
         (Path.cwd() / f'{self.seed}_spoiler.json').write_text(json.dumps(sl, indent=2))
 
         # Patch the rom
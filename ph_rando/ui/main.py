@@ -1,10 +1,14 @@
+import multiprocessing
 import sys
 
-from ph_rando.ui.cli import randomizer_cli
-
 
 def main() -> None:
+    # Logic files can be loaded in a process pool (see `PH_RANDO_LOADER_WORKERS`), which
+    # needs this in frozen builds
+    multiprocessing.freeze_support()
     if '--no-gui' in sys.argv:
+        from ph_rando.ui.cli import randomizer_cli
+
         sys.argv.remove('--no-gui')
         randomizer_cli()
     else:
@@ -0,0 +1,57 @@
+import argparse
+import statistics
+import time
+import tracemalloc
+
+from ph_rando.common import RANDOMIZER_SETTINGS
+from ph_rando.shuffler._fill_slots import EMPTY
+from ph_rando.shuffler._shuffler import Shuffler
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Measure the time and memory allocated per call of `Shuffler.assumed_search`.'
+    )
+    parser.add_argument('-n', '--iterations', type=int, default=20, help='Number of calls to time.')
+    parser.add_argument('-s', '--seed', default='benchmark', help='Seed for the shuffler.')
+    args = parser.parse_args()
+
+    settings = {name: setting.default for name, setting in RANDOMIZER_SETTINGS.items()}
+    shuffler = Shuffler(args.seed, settings)
+
+    # Empty out every check, like `Shuffler.fill` does before placing items, and use their
+    # items as the assumed item pool. Searches read the fill state's slots, not
+    # `check.contents`.
+    fill_state = shuffler.new_fill_state(args.seed)
+    item_pool: list[Item] = []
+    for check_id, item_id in enumerate(fill_state.slots):
+        item_pool.append(ITEM_REGISTRY[item_id])
+        fill_state.slots[check_id] = EMPTY
+
+    shuffler.assumed_search(item_pool, fill_state=fill_state)  # warm up
+
+    timings = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        shuffler.assumed_search(item_pool, fill_state=fill_state)
+        timings.append(time.perf_counter() - start)
+
+    # Memory is measured separately, because tracing allocations slows everything down
+    tracemalloc.start()
+    allocated = []
+    for _ in range(args.iterations):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        shuffler.assumed_search(item_pool, fill_state=fill_state)
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+    tracemalloc.stop()
+
+    print(f'item pool size:       {len(item_pool)}')
+    print(f'time per call:        {statistics.median(timings) * 1000:.2f}ms (median)')
+    print(f'peak memory per call: {statistics.median(allocated) / 1024:.1f}KiB (median)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import logging
+from pathlib import Path
+import statistics
+import tempfile
+import time
+
+from ph_rando.common import RANDOMIZER_SETTINGS
+from ph_rando.shuffler import _parser
+from ph_rando.shuffler._shuffler import Shuffler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            'Measure the time to create a `Shuffler` from scratch, and from a snapshot of the '
+            'logic graph in a warm cache directory.'
+        )
+    )
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='Number of builds to time.')
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of processes to load the logic files in (default: one per CPU).',
+    )
+    args = parser.parse_args()
+
+    # Excluded checks are logged for every build, which would dominate the output
+    logging.disable(logging.WARNING)
+
+    settings = {name: setting.default for name, setting in RANDOMIZER_SETTINGS.items()}
+
+    cold = []
+    for _ in range(args.iterations):
+        # Forget the aux data files validated by earlier builds in this process as well
+        _parser._validated_areas.clear()
+        with tempfile.TemporaryDirectory() as cache_directory:
+            start = time.perf_counter()
+            Shuffler(
+                'benchmark',
+                settings,
+                cache_directory=Path(cache_directory),
+                loader_workers=args.workers,
+            )
+            cold.append(time.perf_counter() - start)
+
+    warm = []
+    with tempfile.TemporaryDirectory() as cache_directory:
+        Shuffler('benchmark', settings, cache_directory=Path(cache_directory))
+        for _ in range(args.iterations):
+            _parser._validated_areas.clear()
+            start = time.perf_counter()
+            Shuffler('benchmark', settings, cache_directory=Path(cache_directory))
+            warm.append(time.perf_counter() - start)
+
+    print(f'empty cache:    {statistics.median(cold) * 1000:.1f}ms (median)')
+    print(f'warm snapshot:  {statistics.median(warm) * 1000:.1f}ms (median)')
+    print(f'speedup:        {statistics.median(cold) / statistics.median(warm):.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import argparse
+from collections import Counter
+import logging
+import statistics
+import time
+
+from ph_rando.common import RANDOMIZER_SETTINGS
+from ph_rando.shuffler._shuffler import AssumedFillFailed, Shuffler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description='Measure the retries and time per seed of `Shuffler.generate`.'
+    )
+    parser.add_argument('-n', '--seeds', type=int, default=100, help='Number of seeds to generate.')
+    parser.add_argument(
+        '-f',
+        '--fill-strategy',
+        choices=['restart', 'backtrack'],
+        default='restart',
+        help='Fill strategy to generate seeds with.',
+    )
+    parser.add_argument(
+        '-r',
+        '--max-retries',
+        type=int,
+        default=None,
+        help='Maximum number of retries per seed. Unlimited by default.',
+    )
+    parser.add_argument(
+        '-i',
+        '--incremental-search',
+        action='store_true',
+        help='Generate seeds with `Shuffler(incremental_search=True)`.',
+    )
+    parser.add_argument(
+        '--setting',
+        action='append',
+        default=[],
+        metavar='NAME=VALUE',
+        help='Override a boolean or string setting (can be passed multiple times).',
+    )
+    args = parser.parse_args()
+
+    # The fill logs every placement, which would dominate the timings
+    logging.disable(logging.INFO)
+
+    settings = {name: setting.default for name, setting in RANDOMIZER_SETTINGS.items()}
+    for override in args.setting:
+        name, value = override.split('=', 1)
+        settings[name] = {'true': True, 'false': False}.get(value.lower(), value)
+
+    timings = []
+    retries = []
+    undone_placements = []
+    failed_phases: Counter[str] = Counter()
+    failed_seeds = 0
+    for i in range(args.seeds):
+        shuffler = Shuffler(
+            f'benchmark-{i}',
+            settings,
+            fill_strategy=args.fill_strategy,
+            max_fill_retries=args.max_retries,
+            incremental_search=args.incremental_search,
+        )
+        start = time.perf_counter()
+        try:
+            shuffler.generate()
+        except AssumedFillFailed:
+            failed_seeds += 1
+        timings.append(time.perf_counter() - start)
+        retries.append(shuffler.fill_stats.retries)
+        undone_placements.append(shuffler.fill_stats.undone_placements)
+        failed_phases.update(shuffler.fill_stats.failed_phases)
+
+    print(f'fill strategy:           {args.fill_strategy}')
+    print(f'incremental search:      {args.incremental_search}')
+    print(f'seeds:                   {args.seeds} ({failed_seeds} gave up)')
+    print(
+        f'time per seed:           {statistics.median(timings) * 1000:.1f}ms (median), '
+        f'{max(timings) * 1000:.1f}ms (max)'
+    )
+    print(f'retries per seed:        {statistics.mean(retries):.2f} (mean), {max(retries)} (max)')
+    print(f'undone placements/seed:  {statistics.mean(undone_placements):.1f} (mean)')
+    print(f'failed phases:           {dict(failed_phases) or "none"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse
+import logging
+import os
+import statistics
+import time
+
+from ph_rando.shuffler import _parser
+from ph_rando.shuffler._parser import annotate_logic, parse_aux_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            'Measure the time to load the aux data and logic files with different numbers of '
+            'loader processes, to choose the default of `_load_files`.'
+        )
+    )
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='Number of loads to time.')
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        nargs='+',
+        default=None,
+        help='Numbers of processes to time (default: 1, 2, 4, ... up to the number of CPUs).',
+    )
+    args = parser.parse_args()
+
+    # Unimplemented node descriptors are logged for every load, which would dominate the output
+    logging.disable(logging.WARNING)
+
+    cpus = os.cpu_count() or 1
+    workers_to_time = args.workers
+    if workers_to_time is None:
+        workers_to_time = [1]
+        while workers_to_time[-1] * 2 < cpus:
+            workers_to_time.append(workers_to_time[-1] * 2)
+        if cpus > 1:
+            workers_to_time.append(cpus)
+
+    print(f'CPUs: {cpus}')
+    serial_time = None
+    for workers in workers_to_time:
+        times = []
+        for _ in range(args.iterations):
+            # Forget the aux data files validated by earlier loads in this process as well
+            _parser._validated_areas.clear()
+            start = time.perf_counter()
+            areas = parse_aux_data(workers=workers).areas
+            annotate_logic(areas, workers=workers)
+            times.append(time.perf_counter() - start)
+        median = statistics.median(times)
+        if serial_time is None:
+            serial_time = median
+        print(
+            f'{workers:>3} worker(s): {median * 1000:.1f}ms (median), '
+            f'{serial_time / median:.2f}x vs. the first row'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+import argparse
+from dataclasses import MISSING, field, fields, make_dataclass
+import gc
+import logging
+import statistics
+import time
+import tracemalloc
+from typing import Any
+
+from ph_rando.common import RANDOMIZER_SETTINGS
+from ph_rando.shuffler._parser import Node
+from ph_rando.shuffler._shuffler import Shuffler
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Item
+
+
+def _allocated(create: Any, repeat: int = 5) -> tuple[Any, int]:
+    """
+    Call `create`, and return its result and the number of bytes it left allocated (the
+    smallest of `repeat` calls, since unrelated allocations may be traced as well).
+    """
+    sizes = []
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.start()
+        result = create()
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        sizes.append(size)
+    return result, min(sizes)
+
+
+def _visit(nodes: list[Any]) -> int:
+    """Hash every node and read the fields that searches read, like a search does."""
+    visited = set()
+    count = 0
+    for node in nodes:
+        visited.add(node)
+        count += len(node.edges) + len(node.checks) + len(node.flags)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compare the memory and search time of the slotted logic graph nodes and the '
+            'interned items of the full default world against dict-based nodes and one item '
+            'instance per check.'
+        )
+    )
+    parser.add_argument(
+        '-n', '--iterations', type=int, default=200, help='Number of passes over the nodes to time.'
+    )
+    args = parser.parse_args()
+
+    # Excluded checks are logged for every build, which would dominate the output
+    logging.disable(logging.WARNING)
+
+    settings = {name: setting.default for name, setting in RANDOMIZER_SETTINGS.items()}
+    shuffler = Shuffler('benchmark', settings)
+    nodes = shuffler._nodes
+
+    # The same fields as `Node`, but stored in an instance `__dict__`
+    unslotted_node = make_dataclass(
+        'UnslottedNode',
+        [
+            (
+                f.name,
+                f.type,
+                (
+                    field(default=f.default)
+                    if f.default_factory is MISSING
+                    else field(default_factory=f.default_factory)
+                ),
+            )
+            for f in fields(Node)
+        ],
+        eq=False,
+    )
+
+    def _copies(node_class: type) -> list[Any]:
+        return [
+            node_class(**{f.name: getattr(node, f.name) for f in fields(Node)}) for node in nodes
+        ]
+
+    slotted, slotted_size = _allocated(lambda: _copies(Node))
+    unslotted, unslotted_size = _allocated(lambda: _copies(unslotted_node))
+
+    print(f'nodes:                {len(nodes)}')
+    print(f'  slotted:            {slotted_size / 1024:.1f}KiB')
+    print(f'  dict-based:         {unslotted_size / 1024:.1f}KiB')
+
+    # Passes over both kinds of nodes are interleaved, so they're timed in the same conditions
+    times: dict[str, list[float]] = {'slotted': [], 'dict-based': []}
+    for _ in range(args.iterations):
+        for name, copies in [('slotted', slotted), ('dict-based', unslotted)]:
+            start = time.perf_counter()
+            _visit(copies)
+            times[name].append(time.perf_counter() - start)
+    for name, name_times in times.items():
+        print(f'  {name + " pass:":<20}{statistics.median(name_times) * 1e6:.0f}us (median)')
+
+    # Every check shares the interned instance of its item (see `ItemRegistry`)
+    items = [check.contents for check in shuffler.checks]
+    _, per_check_size = _allocated(
+        lambda: [Item(name=item.name, states=item.states) for item in items]
+    )
+    print(f'items in checks:      {len(items)}')
+    print(f'  interned instances: {len({id(item) for item in items})} (of {len(ITEM_REGISTRY)})')
+    print(f'  one per check:      {per_check_size / 1024:.1f}KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 from pathlib import Path
 import sys
 
+from ph_rando.common import RANDOMIZER_SETTINGS
 from ph_rando.shuffler._shuffler import Shuffler
 
 try:
@@ -13,7 +14,8 @@ except ModuleNotFoundError:
 
 
 def main():
-    aux_data = Shuffler('test', {}).aux_data
+    settings = {name: setting.default for name, setting in RANDOMIZER_SETTINGS.items()}
+    aux_data = Shuffler('test', settings).aux_data
 
     G = pgv.AGraph(strict=False, directed=True)
 
@@ -1,9 +1,12 @@
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
 import pytest
 
 from ph_rando.common import RANDOMIZER_SETTINGS, ShufflerAuxData
 from ph_rando.shuffler._parser import parse_aux_data
+from ph_rando.shuffler._shuffler import Shuffler
 
 
 @pytest.fixture
@@ -19,3 +22,26 @@ def aux_data() -> ShufflerAuxData:
         enemy_mapping_file=shuffler_dir / 'enemies.json',
         macros_file=shuffler_dir / 'macros.json',
     )
+
+
+@pytest.fixture
+def test_data_shuffler(
+    default_settings, monkeypatch: pytest.MonkeyPatch
+) -> Callable[..., Shuffler]:
+    """
+    Return a function that creates a `Shuffler` for the logic in a test data directory, with
+    the default settings unless other `settings` are passed. Test data has no mailbox, so
+    mail nodes aren't connected.
+    """
+    monkeypatch.setattr(Shuffler, '_connect_mail_nodes', lambda _: None)
+
+    def _create(areas_directory: Path, starting_node_name: str, **kwargs: Any) -> Shuffler:
+        kwargs.setdefault('settings', default_settings)
+        return Shuffler(
+            seed='test',
+            starting_node_name=starting_node_name,
+            areas_directory=areas_directory,
+            **kwargs,
+        )
+
+    return _create
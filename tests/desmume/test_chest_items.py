@@ -33,7 +33,7 @@ def chest_test_emu(
         and chest.zmb_file_path == 'Map/isle_main/map19.bin/zmb/isle_main_19.zmb'
     ]
     for chest in chests:
-        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=set())
+        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=frozenset())
 
     _patch_zmb_map_objects(aux_data.areas, rom)
 
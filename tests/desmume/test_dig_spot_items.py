@@ -40,7 +40,7 @@ def dig_spot_test_emu(
         and chest.zmb_file_path == 'Map/isle_main/map00.bin/zmb/isle_main_00.zmb'
     ]
     for chest in chests:
-        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=set())
+        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=frozenset())
 
     _patch_zmb_actors(aux_data.areas, rom)
 
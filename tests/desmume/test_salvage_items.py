@@ -31,7 +31,7 @@ def salvage_item_test_emu(
         and chest.zmb_file_path == 'Map/sea/map00.bin/zmb/sea_00.zmb'
     ]
     for chest in chests:
-        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=set())
+        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=frozenset())
 
     _patch_zmb_actors(aux_data.areas, rom)
 
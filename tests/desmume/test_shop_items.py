@@ -30,7 +30,7 @@ def island_shop_test_emu(
         if type(chest) is Shop
     ]
     for chest in chests:
-        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=set())
+        chest.contents = Item(name=ITEMS_REVERSED[request.param], states=frozenset())
 
     _patch_shop_items(aux_data.areas, rom)
 
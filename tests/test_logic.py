@@ -1,13 +1,32 @@
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import copy
 import json
+import os
 from pathlib import Path
+import pickle
 from pprint import pprint
+import shutil
+
+from pydantic import ValidationError
+import pytest
 
 from ph_rando.common import RANDOMIZER_SETTINGS
+from ph_rando.shuffler import _parser
 from ph_rando.shuffler._descriptors import EdgeDescriptor
-from ph_rando.shuffler._parser import Edge, parse_edge_requirement
+from ph_rando.shuffler._logic_parser import LogicSyntaxError, parse_logic
+from ph_rando.shuffler._parser import (
+    ENEMY_MAPPING_FILE,
+    LOGIC_DIRECTORY,
+    MACROS_FILE,
+    Edge,
+    _parse_logic_file,
+    annotate_logic,
+    parse_aux_data,
+    parse_edge_requirement,
+)
 from ph_rando.shuffler._shuffler import Shuffler
-from ph_rando.shuffler.aux_models import Area, Item
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Area, Item
 
 
 def test_graph_connectedness() -> None:
@@ -35,7 +54,7 @@ def test_graph_connectedness() -> None:
     items: list[Item] = []
     for chest, area_name in all_checks:
         if chest.contents.name == 'SmallKey':
-            chest.contents.name += f'_{area_name}'
+            chest.contents = ITEM_REGISTRY.get(f'SmallKey_{area_name}')
         items.append(chest.contents)
 
     # Populate the `keys` dict for the assumed search function with all of
@@ -130,8 +149,8 @@ def _get_required_states(edge: Edge, macros: dict[str, str]) -> set[str]:
     return _contains_state(edge.requirements) if edge.requirements else set()
 
 
-def test_ensure_states_exist() -> None:
-    shuffler = Shuffler(seed='test', settings={})
+def test_ensure_states_exist(default_settings) -> None:
+    shuffler = Shuffler(seed='test', settings=default_settings)
 
     aux_data = shuffler.aux_data
 
@@ -160,3 +179,169 @@ def test_ensure_states_exist() -> None:
 
     assert states_required == states_gained
     assert states_lost.issubset(states_gained)
+
+
+LOGIC_FILES = sorted(
+    [*LOGIC_DIRECTORY.rglob('*.logic'), *(Path(__file__).parent / 'test_data').rglob('*.logic')]
+)
+
+
+def test_logic_parser_matches_reference() -> None:
+    """Test that the hand-written .logic parser produces the same output as the pyparsing one."""
+    for logic_file in LOGIC_FILES:
+        contents = logic_file.read_text()
+        assert parse_logic(contents) == _parse_logic_file(contents), logic_file
+
+
+def test_requirement_parser_matches_reference() -> None:
+    """
+    Test that the hand-written edge requirement parser produces the same output as the
+    pyparsing one, for every requirement in the logic, macros and enemy mappings.
+    """
+    requirements = {
+        *json.loads(MACROS_FILE.read_text()).values(),
+        *json.loads(ENEMY_MAPPING_FILE.read_text()).values(),
+        'item A & item B | item C',
+        'item A | item B & item C',
+        '(item A & item B) & item C',
+        '((item A | ((item B))))',
+    }
+    for logic_file in LOGIC_FILES:
+        for area in parse_logic(logic_file.read_text()).areas:
+            for room in area.rooms:
+                requirements.update(edge.requirements for edge in room.edges if edge.requirements)
+
+    reference_parser = Edge.get_edge_parser()
+    for requirement in requirements:
+        assert (
+            parse_edge_requirement(requirement)
+            == reference_parser.parse_string(requirement, parse_all=True).as_list()
+        ), requirement
+
+
+@pytest.mark.parametrize(
+    'contents,line,column',
+    [
+        ('', 1, 1),
+        ('area A\n  room R:\n', 2, 3),
+        ('area A:\n  room R:\n    node X:\n      chest\n', 4, 12),
+        ('area A:\n  room R:\n    node X\n    X => Y\n', 4, 7),
+        ('area A:\n  room R:\n    node X\n    X -> Y: item A & # comment\n', 4, 21),
+        ('area A:\n  room R:\n    node X\n    X -> Y: item A | potato B\n', 4, 22),
+        ('area A:\n  room R:\n    node X\n    X -> Y: (item A | item B\n', 4, 29),
+    ],
+)
+def test_logic_parser_errors(contents: str, line: int, column: int) -> None:
+    with pytest.raises(LogicSyntaxError) as e:
+        parse_logic(contents, 'test.logic')
+    assert (e.value.line, e.value.column) == (line, column)
+    assert str(e.value).startswith(f'test.logic:{line}:{column}: ')
+    for error in (pickle.loads(pickle.dumps(e.value)), copy.copy(e.value)):
+        assert str(error) == str(e.value)
+
+
+def test_parallel_loading_matches_serial(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that loading logic in a process pool gives the same result as loading it serially."""
+
+    def _load(workers: int) -> list[tuple]:
+        areas = parse_aux_data(workers=workers).areas
+        annotate_logic(areas, workers=workers)
+        return [
+            (
+                area.name,
+                room.name,
+                [check.name for check in room.chests],
+                [
+                    (node.name, [(e.dest.name, e.requirements) for e in node.edges])
+                    for node in room.nodes
+                ],
+            )
+            for area in areas
+            for room in area.rooms
+        ]
+
+    assert _load(workers=4) == _load(workers=1)
+
+    # Syntax errors raised in worker processes are propagated as-is
+    monkeypatch.setattr(_parser, 'MIN_PARALLEL_FILES', 0)
+    (tmp_path / 'a.logic').write_text('area A:\n  room R:\n    node X:\n      chest\n')
+    (tmp_path / 'b.logic').write_text('area B:\n  room R:\n    node X\n')
+    with pytest.raises(LogicSyntaxError) as e:
+        annotate_logic([], logic_directory=tmp_path, workers=2)
+    assert (e.value.filename, e.value.line, e.value.column) == (str(tmp_path / 'a.logic'), 4, 12)
+
+
+def test_loader_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that files are loaded in a pool of one process per CPU by default, and serially
+    when there's a single CPU or only a few files.
+    """
+    pool_sizes: list[int] = []
+
+    class _Pool(ThreadPoolExecutor):
+        def __init__(self, max_workers: int) -> None:
+            pool_sizes.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(_parser, 'ProcessPoolExecutor', _Pool)
+    monkeypatch.delenv(_parser.LOADER_WORKERS_ENV_VAR, raising=False)
+    files = [Path(f'{i}.logic') for i in range(_parser.MIN_PARALLEL_FILES)]
+
+    monkeypatch.setattr(os, 'cpu_count', lambda: 4)
+    assert _parser._load_files(str, files, None) == [str(file) for file in files]
+    _parser._load_files(str, files[:-1], None)
+    assert pool_sizes == [4]
+
+    monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+    _parser._load_files(str, files, None)
+    assert pool_sizes == [4]
+
+    # The environment variable overrides the number of CPUs
+    monkeypatch.setenv(_parser.LOADER_WORKERS_ENV_VAR, '2')
+    _parser._load_files(str, files, None)
+    assert pool_sizes == [4, 2]
+
+
+def test_validated_aux_data_records(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Test that unchanged aux data files are loaded from their validated records, and that
+    changed files are validated again.
+    """
+    areas_directory = tmp_path / 'logic'
+    shutil.copytree(LOGIC_DIRECTORY, areas_directory)
+    cache_directory = tmp_path / 'cache'
+
+    def _load() -> list[Area]:
+        return parse_aux_data(areas_directory, cache_directory=cache_directory, workers=1).areas
+
+    monkeypatch.setattr('ph_rando.shuffler._parser._validated_areas', {})
+    expected = _load()
+    assert len(list((cache_directory / 'aux').iterdir())) == len(
+        list(areas_directory.rglob('*.json'))
+    )
+
+    # Load from the records on disk without validating anything
+    def _fail(*args, **kwargs):
+        raise AssertionError('aux data should not be re-validated')
+
+    monkeypatch.setattr('ph_rando.shuffler._parser._validated_areas', {})
+    monkeypatch.setattr(Area, 'model_validate_json', _fail)
+    assert _load() == expected
+    assert _load() == expected  # in-memory records
+
+    # Records are ignored once the item table or enemy types that validation checks
+    # against change
+    monkeypatch.setattr(
+        'ph_rando.shuffler._parser._validation_inputs_digest', lambda: b'changed inputs'
+    )
+    with pytest.raises(AssertionError, match='should not be re-validated'):
+        _load()
+    monkeypatch.undo()
+
+    # Invalid changes are still rejected
+    aux_file = next(areas_directory.rglob('*.json'))
+    aux_data = json.loads(aux_file.read_text())
+    aux_data['rooms'][0]['name'] = ''
+    aux_file.write_text(json.dumps(aux_data))
+    with pytest.raises(ValidationError):
+        _load()
@@ -1,14 +1,68 @@
+from array import array
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import itertools
+import os
 from pathlib import Path
+import pickle
+import random
+import shutil
+import threading
 
+from ordered_set import OrderedSet
+from pydantic import ValidationError
 import pytest
 
-from ph_rando.common import RANDOMIZER_SETTINGS
-from ph_rando.shuffler._parser import parse_edge_requirement
-from ph_rando.shuffler._shuffler import Edge, Node, Shuffler
+from ph_rando.common import RANDOMIZER_SETTINGS, ShufflerAuxData
+from ph_rando.patcher._items import ITEMS
+from ph_rando.shuffler import _parser, _shuffler, _snapshot
+from ph_rando.shuffler._check_pool import EmptyChecks
+from ph_rando.shuffler._fill_slots import EMPTY, FillSlots
+from ph_rando.shuffler._parser import parse_edge_requirement, requirements_met
+from ph_rando.shuffler._requirements import NameIndex, RequirementCompiler, RequirementError
+from ph_rando.shuffler._shuffler import (
+    IMPORTANT_ITEMS,
+    AssumedFillFailed,
+    Edge,
+    FillState,
+    Node,
+    Shuffler,
+    attempt_seed,
+    generate_many,
+    generate_speculative,
+)
+from ph_rando.shuffler._snapshot import snapshot_key
+from ph_rando.shuffler._spoiler_log import generate_spoiler_log
+from ph_rando.shuffler.aux_models import ITEM_REGISTRY, Check, Item, ItemRegistry
 
 TEST_DATA_DIR = Path(__file__).parent / 'test_data'
 
 
+def _placements(aux_data: ShufflerAuxData) -> list[tuple[str, str]]:
+    """Return the item placed at each check in `aux_data`."""
+    return [
+        (f'{area.name}.{room.name}.{check.name}', check.contents.name)
+        for area in aux_data.areas
+        for room in area.rooms
+        for check in room.chests
+    ]
+
+
+def _aux_data_signature(aux_data: ShufflerAuxData) -> tuple:
+    """
+    Return a comparable representation of `aux_data`. Nodes compare by identity, so only
+    the names of the nodes of each room are compared.
+    """
+    return (
+        aux_data.seed,
+        aux_data.enemy_requirements,
+        aux_data.requirement_macros,
+        [area.model_dump() for area in aux_data.areas],
+        [[node.name for node in room.nodes] for area in aux_data.areas for room in area.rooms],
+    )
+
+
 @pytest.mark.repeat(3)
 @pytest.mark.parametrize('seed', ['test', 'another_test', 'another_another_test'])
 def test_seeds(seed: str, default_settings):
@@ -16,7 +70,31 @@ def test_seeds(seed: str, default_settings):
     first = Shuffler(seed=seed, settings=default_settings).generate()
     second = Shuffler(seed=seed, settings=default_settings).generate()
     third = Shuffler(seed=seed, settings=default_settings).generate()
-    assert first == second == third
+    assert _aux_data_signature(first) == _aux_data_signature(second) == _aux_data_signature(third)
+
+
+@pytest.mark.parametrize(
+    'seed,fingerprint',
+    [
+        ('2', '74e87998f2e8'),
+        ('x1', '6b1bac058578'),
+        ('x2', '6677f253bbb4'),
+        ('test', '10316bf1bcdd'),
+        ('another_test', '98d055071e77'),
+        ('abc', '082c8c761ba9'),
+    ],
+)
+def test_seed_placements(seed: str, fingerprint: str, default_settings):
+    """
+    Test that seeds with default settings keep placing the same items at the same checks.
+
+    Changes to the fill or the search can change the output of every seed without failing
+    any other test. The fingerprints are those of the original shuffler, so that the same
+    seed keeps generating the same placements.
+    """
+    aux_data = Shuffler(seed=seed, settings=default_settings).generate()
+    placements = repr(_placements(aux_data)).encode()
+    assert hashlib.sha256(placements).hexdigest()[:12] == fingerprint
 
 
 @pytest.mark.parametrize(
@@ -71,6 +149,7 @@ def test_edge_parser(
     flags: set[str],
     states: set[str],
     expected_result: bool,
+    default_settings,
 ):
     node1 = Node(
         name='test1',
@@ -86,12 +165,76 @@ def test_edge_parser(
     node1.edges.append(edge)
     assert (
         edge.is_traversable(
-            inventory, flags, states, shuffler_instance=Shuffler(seed='test', settings={})
+            inventory,
+            flags,
+            states,
+            shuffler_instance=Shuffler(seed='test', settings=default_settings),
         )
         == expected_result
     )
 
 
+def test_compiled_requirements_match_reference(default_settings):
+    """
+    Test that the compiled requirement of every edge in the logic evaluates the same as
+    the reference implementation that interprets the parsed requirements directly.
+    """
+    shuffler = Shuffler(seed='test', settings=default_settings)
+    edges = [
+        edge
+        for area in shuffler.aux_data.areas
+        for room in area.rooms
+        for node in room.nodes
+        for edge in node.edges
+        if edge.requirements
+    ]
+    all_flags = sorted({flag for edge in edges for flag in edge.src.flags})
+    all_states = sorted({state for edge in edges for state in edge.src.states_gained})
+
+    rng = random.Random('test')
+    for _ in range(20):
+        items = rng.choices(list(ITEMS), k=rng.randint(0, 60))
+        flags = set(rng.sample(all_flags, k=rng.randint(0, len(all_flags))))
+        states = set(rng.sample(all_states, k=rng.randint(0, len(all_states))))
+        inventory = shuffler.requirement_index.inventory(items, flags, states)
+        for edge in edges:
+            assert edge.requirement is not None
+            assert edge.requirement.evaluate(inventory) == requirements_met(
+                edge.requirements, items, flags, states, shuffler, edge
+            ), edge
+
+
+def test_requirement_errors_reported_at_compile_time():
+    """Test that all invalid references in requirements are reported at once."""
+    compiler = RequirementCompiler(
+        macros={'A': 'macro B', 'B': 'item Bombs & macro A', 'C': 'item NotAnItem'},
+        enemy_requirements={},
+        settings={},
+        index=NameIndex(),
+    )
+    edge = Edge(
+        src=Node(name='test1', area=None, room=None),  # type: ignore
+        dest=Node(name='test2', area=None, room=None),  # type: ignore
+        requirements=parse_edge_requirement(
+            'macro A | macro C | macro D | setting NotASetting | setting NoPuzzleSolution | '
+            'item ProgressiveSword[2]'
+        ),
+        logic_file='test.logic',
+    )
+    compiler.compile_edge(edge)
+
+    assert len(compiler.errors) == 5
+    assert 'macro cycle detected (A -> B -> A)' in compiler.errors[0]
+    assert 'invalid item "NotAnItem"' in compiler.errors[1]
+    assert 'invalid macro "D"' in compiler.errors[2]
+    assert 'invalid setting "NotASetting"' in compiler.errors[3]
+    # Known settings that aren't given a value are reported as well, with the edge's file
+    assert (
+        compiler.errors[4] == 'test.logic: test1 -> test2: setting "NoPuzzleSolution" has no value'
+    )
+    assert str(RequirementError(compiler.errors)).count('\n') == 5
+
+
 # @pytest.mark.parametrize(
 #     ('expression', 'result'),
 #     [
@@ -176,14 +319,11 @@ def test_assumed_search(
     starting_node_name: str,
     accessible_nodes_names: list[str],
     non_accessible_nodes_names: list[str],
+    test_data_shuffler: Callable[..., Shuffler],
 ) -> None:
-    current_test_dir = TEST_DATA_DIR / test_data_name
-
-    # Patch out check for mailbox node
-    Shuffler._connect_mail_nodes = lambda _: None  # type: ignore
-
-    shuffler = Shuffler(
-        seed='test',
+    shuffler = test_data_shuffler(
+        TEST_DATA_DIR / test_data_name,
+        starting_node_name,
         settings={
             setting.name: (
                 True
@@ -192,8 +332,6 @@ def test_assumed_search(
             )
             for setting in RANDOMIZER_SETTINGS.values()
         },
-        starting_node_name=starting_node_name,
-        areas_directory=current_test_dir,
     )
 
     reachable_nodes = shuffler.assumed_search(items=[])
@@ -202,3 +340,745 @@ def test_assumed_search(
 
     assert all(node in reachable_nodes_names for node in accessible_nodes_names)
     assert all(node not in reachable_nodes_names for node in non_accessible_nodes_names)
+
+
+def _graph_signature(shuffler: Shuffler) -> list:
+    """Return a comparable representation of the logic graph of the given shuffler."""
+    return [
+        (
+            node.name,
+            [(edge.dest.name, edge.requirements) for edge in node.edges],
+            [check.name for check in node.checks],
+            [exit.entrance for exit in node.exits],
+            sorted(node.entrances),
+            sorted(node.flags),
+            node.lock,
+        )
+        for area in shuffler.aux_data.areas
+        for room in area.rooms
+        for node in room.nodes
+    ]
+
+
+def test_logic_snapshot(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, default_settings):
+    """Test that a logic graph loaded from a snapshot is identical to a freshly parsed one."""
+    fresh = Shuffler(seed='test', settings=default_settings)
+
+    # First run builds the snapshot, second run loads it
+    Shuffler(seed='test', settings=default_settings, cache_directory=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    def _fail(*args, **kwargs):
+        raise AssertionError('logic should have been loaded from the snapshot')
+
+    monkeypatch.setattr(Shuffler, '_annotate_logic', _fail)
+    cached = Shuffler(seed='test', settings=default_settings, cache_directory=tmp_path)
+
+    assert _graph_signature(cached) == _graph_signature(fresh)
+    assert _aux_data_signature(cached.aux_data) == _aux_data_signature(fresh.aux_data)
+
+    # Nodes must reference the same objects as the rest of the aux data
+    for area in cached.aux_data.areas:
+        for room in area.rooms:
+            for node in room.nodes:
+                assert node.area is area
+                assert node.room is room
+                assert all(any(check is chest for chest in room.chests) for check in node.checks)
+
+
+def test_logic_snapshot_invalidation(tmp_path: Path, test_data_shuffler: Callable[..., Shuffler]):
+    """Test that the logic snapshot is rebuilt when any of its inputs change."""
+    logic_directory = tmp_path / 'logic'
+    cache_directory = tmp_path / 'cache'
+    shutil.copytree(TEST_DATA_DIR / 'flag_test', logic_directory)
+
+    def _build() -> Shuffler:
+        return test_data_shuffler(
+            logic_directory,
+            'FlagTest.Test.Start',
+            settings={},
+            cache_directory=cache_directory,
+        )
+
+    original = _build()
+    # The cache directory also holds records of validated aux data files
+    (snapshot_file,) = cache_directory.glob('*.snapshot')
+    original_snapshot = snapshot_file.read_bytes()
+
+    # Remove an edge from the logic
+    logic_file = logic_directory / 'test.logic'
+    lines = logic_file.read_text().splitlines()
+    edge_line = next(line for line in lines if '->' in line)
+    logic_file.write_text('\n'.join(line for line in lines if line != edge_line))
+
+    modified = _build()
+
+    assert _graph_signature(modified) != _graph_signature(original)
+    assert list(cache_directory.glob('*.snapshot')) == [snapshot_file]
+    assert snapshot_file.read_bytes() != original_snapshot
+
+
+def test_logic_snapshot_key_paths(tmp_path: Path):
+    """Test that moving a logic file to another subdirectory changes the snapshot key."""
+    areas_directory = tmp_path / 'logic'
+    shutil.copytree(TEST_DATA_DIR / 'flag_test', areas_directory / 'a')
+    (areas_directory / 'b').mkdir()
+
+    def _key() -> str:
+        return snapshot_key(areas_directory, _parser.ENEMY_MAPPING_FILE, _parser.MACROS_FILE)
+
+    original_key = _key()
+    (areas_directory / 'a' / 'test.logic').rename(areas_directory / 'b' / 'test.logic')
+    assert _key() != original_key
+
+
+def test_logic_snapshot_key_source(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that editing the code that builds the logic graph changes the snapshot key."""
+    module_file = tmp_path / 'graph_module.py'
+    module_file.write_text('VALUE = 1\n')
+    monkeypatch.syspath_prepend(tmp_path)
+    monkeypatch.setattr(_snapshot, '_GRAPH_MODULES', (*_snapshot._GRAPH_MODULES, 'graph_module'))
+
+    def _key() -> str:
+        return snapshot_key(
+            TEST_DATA_DIR / 'flag_test', _parser.ENEMY_MAPPING_FILE, _parser.MACROS_FILE
+        )
+
+    original_key = _key()
+    assert _key() == original_key
+    module_file.write_text('VALUE = 2\n')
+    assert _key() != original_key
+
+
+@pytest.mark.parametrize('seed', ['test', 'another_test'])
+def test_cached_assumed_search(seed: str, default_settings, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that reusing assumed search results across placements places every item in
+    exactly the same location as running a full assumed search for every placement.
+    """
+
+    def _clear_cache(self: Shuffler, *args) -> None:
+        self._assumed_search_cache = None
+
+    cached_placements = _placements(Shuffler(seed, default_settings).generate())
+
+    monkeypatch.setattr(Shuffler, '_update_assumed_search_cache', _clear_cache)
+    assert _placements(Shuffler(seed, default_settings).generate()) == cached_placements
+
+
+@pytest.mark.parametrize('seed', ['test', 'another_test'])
+def test_incremental_search(seed: str, default_settings):
+    """
+    Test that continuing the search of the previous pass in assumed searches reaches exactly
+    the same nodes as searching from scratch in every pass (with the same key logic).
+    """
+    shuffler = Shuffler(seed, default_settings, strict_key_logic=True)
+    incremental_shuffler = Shuffler(seed, default_settings, incremental_search=True)
+
+    fill_state = shuffler.new_fill_state(seed)
+    shuffler.generate(fill_state)
+    incremental_shuffler.load_fill_state(fill_state)
+
+    rng = random.Random(seed)
+    for _ in range(20):
+        # Empty some of the checks, like the fill does while placing items
+        empty = rng.sample(range(len(shuffler.checks)), rng.randint(0, len(shuffler.checks)))
+        partial_fill_state = FillState(seed, fill_state.rng, array('i', fill_state.slots))
+        for check_id in empty:
+            partial_fill_state.slots[check_id] = EMPTY
+
+        items = [ITEM_REGISTRY[fill_state.slots[check_id]] for check_id in empty]
+        pool = rng.sample(items, rng.randint(0, len(items)))
+        reachable_nodes = shuffler.assumed_search(pool, fill_state=partial_fill_state)
+        incremental_reachable_nodes = incremental_shuffler.assumed_search(
+            pool, fill_state=partial_fill_state
+        )
+        assert {node.name for node in reachable_nodes} == {
+            node.name for node in incremental_reachable_nodes
+        }
+
+    # Generating with it still works, though the items end up in different checks
+    incremental_shuffler.generate(incremental_shuffler.new_fill_state(seed))
+
+
+@pytest.mark.parametrize('keys,end_reachable', [(0, False), (1, False), (2, True), (3, True)])
+def test_small_key_doors(
+    keys: int, end_reachable: bool, test_data_shuffler: Callable[..., Shuffler]
+):
+    """
+    Test that locked doors are only opened once there are enough keys to open every
+    reachable door in the area, since otherwise the keys could be spent on the wrong door.
+    """
+    shuffler = test_data_shuffler(TEST_DATA_DIR / 'key_test', 'FireTemple.Test.Start')
+
+    reachable_nodes = shuffler.search(
+        [Item(name='SmallKey_FireTemple', states=frozenset())] * keys, set(), set()
+    )
+
+    assert {node.name for node in reachable_nodes} >= {
+        'FireTemple.Test.Start',
+        'FireTemple.Test.LockedDoor1',
+        'FireTemple.Test.LockedDoor2',
+    }
+    assert ('FireTemple.Test.End' in [node.name for node in reachable_nodes]) == end_reachable
+
+
+@pytest.mark.parametrize('strict_key_logic,end_reachable', [(False, True), (True, False)])
+def test_strict_key_logic(
+    strict_key_logic: bool, end_reachable: bool, test_data_shuffler: Callable[..., Shuffler]
+):
+    """
+    Test that a single key opens two doors that are reached one after the other by default,
+    but only the first one with `strict_key_logic`.
+    """
+    shuffler = test_data_shuffler(
+        TEST_DATA_DIR / 'key_chain_test',
+        'FireTemple.Test.Start',
+        strict_key_logic=strict_key_logic,
+    )
+
+    reachable_nodes = {
+        node.name
+        for node in shuffler.search(
+            [Item(name='SmallKey_FireTemple', states=frozenset())], set(), set()
+        )
+    }
+
+    assert 'FireTemple.Test.Middle' in reachable_nodes
+    assert ('FireTemple.Test.End' in reachable_nodes) == end_reachable
+    assert 'FireTemple.Test.Middle' not in {node.name for node in shuffler.search([], set(), set())}
+
+
+@pytest.mark.parametrize('area', ['FireTemple', 'GoronTemple', 'MutohTemple', 'WindTemple'])
+def test_scoped_search(area: str, default_settings):
+    """
+    Test that a search scoped to a dungeon reaches everything in it that a search of the
+    whole world does, given the flags that are set outside of the dungeon.
+    """
+    shuffler = Shuffler('test', default_settings)
+    items = [check.contents for a in shuffler.aux_data.areas for r in a.rooms for check in r.chests]
+
+    reachable_nodes = shuffler.assumed_search(items)
+    flags = {flag for node in reachable_nodes for flag in node.flags}
+
+    result = shuffler.scoped_search(items, area, flags=flags)
+
+    assert all(node.area.name == area for node in result.reachable_nodes)
+    assert {node for node in reachable_nodes if node.area.name == area} <= set(
+        result.reachable_nodes
+    )
+    assert {check.name for check in result.checks} >= {
+        check.name for node in reachable_nodes if node.area.name == area for check in node.checks
+    }
+
+
+def test_scoped_search_room(test_data_shuffler: Callable[..., Shuffler]):
+    """Test that a search scoped to a room starts at the room's entry points and stays in it."""
+    shuffler = test_data_shuffler(TEST_DATA_DIR / 'key_test', 'FireTemple.Test.Start')
+
+    scope = shuffler.search_scope('FireTemple', 'Test2')
+    assert [node.name for node in scope.entry_points] == ['FireTemple.Test2.Test']
+
+    result = shuffler.scoped_search([], 'FireTemple', 'Test2')
+    assert [node.name for node in result.reachable_nodes] == ['FireTemple.Test2.Test']
+
+    with pytest.raises(ValueError):
+        shuffler.search_scope('FireTemple', 'NotARoom')
+
+
+@pytest.mark.parametrize('seed', ['test', 'another_test'])
+def test_condensed_graph(seed: str, default_settings):
+    """
+    Test that searching the condensed logic graph reaches exactly the same nodes (with the
+    same key logic).
+    """
+    shuffler = Shuffler(seed, default_settings, strict_key_logic=True)
+    condensed_shuffler = Shuffler(seed, default_settings, condense_graph=True)
+    graph = condensed_shuffler.condensed_graph
+    assert graph is not None
+
+    nodes = [
+        node
+        for area in condensed_shuffler.aux_data.areas
+        for room in area.rooms
+        for node in room.nodes
+    ]
+    assert len(graph) < len(nodes)
+    assert sorted(node.name for s in graph.super_nodes for node in s.nodes) == sorted(
+        node.name for node in nodes
+    )
+    for super_node in graph.super_nodes:
+        assert all(graph.super_node(node) is super_node for node in super_node.nodes)
+        assert all(edge.dest is not super_node for edge in super_node.edges)
+
+    items = [check.contents for a in shuffler.aux_data.areas for r in a.rooms for check in r.chests]
+    all_flags = sorted({flag for node in nodes for flag in node.flags})
+    rng = random.Random(seed)
+    for _ in range(100):
+        inventory = rng.sample(items, rng.randint(0, len(items)))
+        flags = set(rng.sample(all_flags, rng.randint(0, len(all_flags))))
+        assert {node.name for node in shuffler.search(inventory, flags, set())} == {
+            node.name for node in condensed_shuffler.search(inventory, flags, set())
+        }
+
+
+@pytest.mark.parametrize('seed', ['test', 'another_test', 'another_another_test'])
+def test_numpy_search_backend(seed: str, default_settings):
+    """
+    Test that the numpy search backend reaches exactly the same nodes as the default one
+    (with the same key logic).
+    """
+    shuffler = Shuffler(seed, default_settings, strict_key_logic=True)
+    numpy_shuffler = Shuffler(seed, default_settings, search_backend='numpy')
+
+    items = [check.contents for a in shuffler.aux_data.areas for r in a.rooms for check in r.chests]
+    all_flags = sorted(shuffler.requirement_index.flags)
+    all_states = sorted(shuffler.requirement_index.states)
+    rng = random.Random(seed)
+    searches = [
+        (
+            rng.sample(items, rng.randint(0, len(items))),
+            set(rng.sample(all_flags, rng.randint(0, len(all_flags)))),
+            set(rng.sample(all_states, rng.randint(0, len(all_states)))),
+        )
+        for _ in range(200)
+    ]
+
+    expected = [{node.name for node in nodes} for nodes in shuffler.search_many(searches)]
+    assert [{node.name for node in nodes} for nodes in numpy_shuffler.search_many(searches)] == (
+        expected
+    )
+    # Single searches go through the same engine
+    assert {node.name for node in numpy_shuffler.search(*searches[0])} == expected[0]
+
+
+def test_playthrough(default_settings):
+    """Test the spheres of a playthrough of the vanilla item placement."""
+    # The vanilla logic can't reach the goal node yet, so the test runs without one, and the
+    # playthrough has to reach everything that collecting every progression item does
+    shuffler = Shuffler('test', default_settings, goal_node_name='NotANode')
+    assert shuffler.goal_node is None
+
+    spheres = shuffler.playthrough()
+
+    assert spheres and all(spheres)
+    checks = [(node.name, check.name) for sphere in spheres for node, check in sphere]
+    assert len(checks) == len(set(checks))
+    assert all(shuffler._is_progression(check.contents) for s in spheres for _, check in s)
+
+    all_spheres, reached_nodes = shuffler._spheres(set())
+    assert len(checks) < len([check for sphere in all_spheres for check in sphere])
+
+    kept = {shuffler._check_ids[check] for sphere in spheres for _, check in sphere}
+    removed = {shuffler._check_ids[check] for sphere in all_spheres for _, check in sphere} - kept
+    assert shuffler._spheres(removed)[1] == reached_nodes
+    # Each item in the playthrough is needed
+    for check_id in kept:
+        assert shuffler._spheres(removed | {check_id})[1] < reached_nodes
+
+    spoiler_log = generate_spoiler_log(shuffler.aux_data, default_settings, spheres)
+    assert [len(sphere) for sphere in spoiler_log.playthrough] == [len(s) for s in spheres]
+
+
+def test_playthrough_unreachable_goal(default_settings, caplog: pytest.LogCaptureFixture):
+    """
+    Test that the playthrough of a generated seed whose goal node can't be reached lists
+    every progression item it can collect, rather than none of them, and that it isn't
+    considered beatable.
+    """
+    shuffler = Shuffler('test', default_settings)
+    shuffler.generate()
+
+    spheres = shuffler.playthrough()
+
+    all_spheres, reached_nodes = shuffler._spheres(set())
+    assert shuffler.goal_node is not None and shuffler.goal_node not in reached_nodes
+    assert spheres and spheres == all_spheres
+    assert "can't be reached" not in caplog.text
+    assert shuffler.beatable_playthrough() is None
+
+    spoiler_log = generate_spoiler_log(
+        shuffler.aux_data, default_settings, shuffler.beatable_playthrough()
+    )
+    assert spoiler_log.playthrough == []
+
+
+def test_playthrough_fill_state(default_settings):
+    """Test that playthroughs read the fill state they're given, not the last one loaded."""
+    shuffler = Shuffler('test', default_settings)
+    vanilla_fill_state = shuffler.new_fill_state('test')
+    spheres = shuffler.playthrough(vanilla_fill_state)
+
+    shuffler.generate()
+    assert shuffler.playthrough() != spheres
+    assert shuffler.playthrough(vanilla_fill_state) == spheres
+
+
+def test_playthrough_small_keys(test_data_shuffler: Callable[..., Shuffler]):
+    """Test that doors stay locked in a playthrough until there are enough keys for them."""
+    shuffler = test_data_shuffler(TEST_DATA_DIR / 'key_test', 'FireTemple.Test.Start')
+
+    spheres, reached_nodes = shuffler._spheres(set())
+
+    # The key chest is reachable right away, but one key isn't enough for both doors
+    assert [[check.name for _, check in sphere] for sphere in spheres] == [['KeyChest']]
+    assert 'FireTemple.Test.End' not in {node.name for node in reached_nodes}
+    # So the key doesn't help, and isn't part of the playthrough
+    assert shuffler.playthrough() == []
+
+
+@pytest.mark.parametrize('strict_key_logic,end_reachable', [(False, True), (True, False)])
+def test_playthrough_key_logic(
+    strict_key_logic: bool, end_reachable: bool, test_data_shuffler: Callable[..., Shuffler]
+):
+    """Test that playthroughs open locked doors by the same rules as the fill's searches."""
+    shuffler = test_data_shuffler(
+        TEST_DATA_DIR / 'key_chain_test',
+        'FireTemple.Test.Start',
+        strict_key_logic=strict_key_logic,
+    )
+
+    _, reached_nodes = shuffler._spheres(set())
+
+    assert ('FireTemple.Test.End' in {node.name for node in reached_nodes}) == end_reachable
+
+
+def test_playthrough_state_loss(test_data_shuffler: Callable[..., Shuffler]):
+    """
+    Test that states are lost in a playthrough like in an assumed search, and that items
+    that don't help reach anything are left out of it.
+    """
+    shuffler = test_data_shuffler(TEST_DATA_DIR / 'playthrough_test', 'PlaythroughTest.Test.Start')
+
+    # The switch is reset right after it's hit, so the gate stays closed, and the shovel
+    # isn't needed for anything
+    assert [[check.name for _, check in sphere] for sphere in shuffler.playthrough()] == [
+        ['BowChest']
+    ]
+    assert 'PlaythroughTest.Test.Gate' not in {node.name for node in shuffler.assumed_search([])}
+
+
+def test_backtracking_fill(default_settings, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that the backtracking fill only undoes and retries the phase that failed and the
+    one before it.
+    """
+    place_important_items = Shuffler._place_important_items
+    placements: list[tuple[Check, Item]] = []
+    retried_placements: list[tuple[Check, Item]] = []
+    undone_placements = 0
+
+    def _current_placements(self: Shuffler) -> list[tuple[Check, Item]]:
+        return [(self.checks[i], ITEM_REGISTRY[self._slots[i]]) for i in self._slots.placements]
+
+    def _fail_once(self: Shuffler, item_pool: list[Item]) -> None:
+        nonlocal undone_placements
+        if placements:
+            if not retried_placements:
+                retried_placements.extend(_current_placements(self))
+                undone_placements = self.fill_stats.undone_placements
+            return place_important_items(self, item_pool)
+        placements.extend(_current_placements(self))
+        # Place an item before failing, so the phase has something to undo
+        self._place_item(next(i for i in item_pool if i.name in IMPORTANT_ITEMS), item_pool)
+        raise AssumedFillFailed()
+
+    monkeypatch.setattr(Shuffler, '_place_important_items', _fail_once)
+
+    shuffler = Shuffler('test', default_settings, fill_strategy='backtrack')
+    aux_data = shuffler.generate()
+
+    assert shuffler.fill_stats.failed_phases['important_items'] >= 1
+    assert all(
+        check.contents is not None for a in aux_data.areas for r in a.rooms for check in r.chests
+    )
+
+    # The failed phase and the small keys phase before it were undone and retried, and
+    # the placements of the phases before that were kept
+    small_keys = [(check, item) for check, item in placements if item.name.startswith('SmallKey_')]
+    assert small_keys
+    assert undone_placements == len(small_keys) + 1
+    assert retried_placements[: -len(small_keys)] == placements[: -len(small_keys)]
+    assert sorted(item.name for _, item in retried_placements[-len(small_keys) :]) == sorted(
+        item.name for _, item in small_keys
+    )
+
+
+@pytest.mark.parametrize('fill_strategy', ['restart', 'backtrack'])
+def test_max_fill_retries(fill_strategy: str, default_settings, monkeypatch: pytest.MonkeyPatch):
+    """Test that the fill gives up once it has been retried `max_fill_retries` times."""
+
+    def _fail(self: Shuffler, item_pool: list[Item]) -> None:
+        raise AssumedFillFailed()
+
+    monkeypatch.setattr(Shuffler, '_place_rest_of_items', _fail)
+
+    shuffler = Shuffler(
+        'test', default_settings, fill_strategy=fill_strategy, max_fill_retries=5  # type: ignore
+    )
+    with pytest.raises(AssumedFillFailed):
+        shuffler.generate()
+
+    assert shuffler.fill_stats.retries == 6
+    assert shuffler.fill_stats.failed_phases['rest_of_items'] >= 1
+
+
+@pytest.mark.parametrize('fill_strategy', ['restart', 'backtrack'])
+def test_failed_fill_keeps_items(fill_strategy: str, default_settings):
+    """
+    Test that a fill that fails leaves every check of the fill state with the item it had,
+    rather than with the checks it emptied.
+    """
+    shuffler = Shuffler(
+        '2', default_settings, fill_strategy=fill_strategy, max_fill_retries=0  # type: ignore
+    )
+    fill_state = shuffler.new_fill_state('2')
+    slots = array('i', fill_state.slots)
+
+    with pytest.raises(AssumedFillFailed):
+        shuffler.fill(fill_state)
+    assert fill_state.slots == slots
+
+    vanilla = _placements(Shuffler('2', default_settings).aux_data)
+    assert _placements(shuffler.load_fill_state(fill_state)) == vanilla
+
+    fill_state.slots[0] = EMPTY
+    with pytest.raises(ValueError):
+        shuffler.fill(fill_state)
+    with pytest.raises(ValueError):
+        shuffler.load_fill_state(fill_state)
+
+
+def test_check_pool(default_settings):
+    """Test that check pools return the same empty checks as filtering a list of checks."""
+    aux_data = Shuffler('test', default_settings).aux_data
+    nodes = [node for area in aux_data.areas for room in area.rooms for node in room.nodes]
+    checks = [check for node in nodes for check in node.checks]
+    rng = random.Random(0)
+    for check in checks:
+        check.contents = None  # type: ignore
+    candidates = rng.sample(checks, 40)
+
+    empty_checks = EmptyChecks(nodes, lambda check: check.contents is None)
+    subpool = empty_checks.subpool(candidates)
+    assert empty_checks.subpool(reversed(candidates)) is subpool
+
+    for _ in range(500):
+        check = rng.choice(checks)
+        if check.contents is None:
+            check.contents = Item(name='Bombs')
+            empty_checks.fill(check)
+        else:
+            check.contents = None  # type: ignore
+            empty_checks.empty(check)
+
+        expected = [check for check in checks if check.contents is None]
+        assert len(empty_checks.all) == len(expected)
+        assert [empty_checks.all[i] for i in range(len(expected))] == expected
+        assert [subpool[i] for i in range(len(subpool))] == [c for c in expected if c in candidates]
+        assert (check in empty_checks.all) == (check.contents is None)
+
+    with pytest.raises(IndexError):
+        empty_checks.all[len(empty_checks.all)]
+
+
+def test_fill_slots():
+    """Test that rolling back to a checkpoint undoes exactly the placements made after it."""
+    slots = FillSlots(array('i', [EMPTY, 3, EMPTY, EMPTY]))
+    slots.place(0, 5)
+    checkpoint = slots.checkpoint()
+    slots.place(3, 7)
+    slots.place(2, 0)
+    assert [slots[i] for i in range(len(slots))] == [5, 3, 0, 7]
+    assert list(slots.placements) == [0, 3, 2]
+
+    assert slots.rollback(checkpoint) == [2, 3]
+    assert [slots[i] for i in range(len(slots))] == [5, 3, EMPTY, EMPTY]
+    assert list(slots.placements) == [0]
+    assert slots.rollback(0) == [0]
+    assert [slots[i] for i in range(len(slots))] == [EMPTY, 3, EMPTY, EMPTY]
+
+
+def test_candidate_checks(default_settings):
+    """
+    Test that dungeon rewards and keys are only placed at their candidate checks, and that
+    the candidates can be narrowed down before generating a seed.
+    """
+    shuffler = Shuffler('test', default_settings)
+
+    fire_temple_checks = shuffler.candidate_checks['BossKeyFireTemple']
+    assert fire_temple_checks
+    fire_temple = next(area for area in shuffler.aux_data.areas if area.name == 'FireTemple')
+    assert set(fire_temple_checks) == {check for room in fire_temple.rooms for check in room.chests}
+    assert shuffler.candidate_checks['SmallKey_FireTemple'] == fire_temple_checks
+    assert shuffler.candidate_checks['SmallKey_FireTemple'] is not fire_temple_checks
+
+    # Narrow down the boss key to a single check, like a settings hook could
+    boss_key_check = fire_temple_checks[-1]
+    shuffler.candidate_checks['BossKeyFireTemple'] = OrderedSet([boss_key_check])
+
+    shuffler.generate()
+
+    assert boss_key_check.contents.name == 'BossKeyFireTemple'
+    for check_id in shuffler._slots.placements:
+        check = shuffler.checks[check_id]
+        if check.contents.name in shuffler.candidate_checks:
+            assert check in shuffler.candidate_checks[check.contents.name]
+
+
+def test_fill_states(default_settings):
+    """
+    Test that generating several seeds with one `Shuffler` gives the same result for each
+    seed as creating a new `Shuffler` for it.
+    """
+    seeds = ['test', 'another_test', 'abc']
+
+    shuffler = Shuffler('template', default_settings)
+    fill_states = [shuffler.new_fill_state(seed) for seed in seeds]
+    placements = [_placements(shuffler.generate(fill_state)) for fill_state in fill_states]
+
+    # Filling a state without generating it leaves the aux data as it was
+    fill_state = shuffler.new_fill_state('another_another_test')
+    shuffler.fill(fill_state)
+    assert _placements(shuffler.aux_data) == placements[-1]
+    assert _placements(shuffler.load_fill_state(fill_state)) != placements[-1]
+
+    for seed, fill_state, seed_placements in zip(seeds, fill_states, placements):
+        expected = _placements(Shuffler(seed, default_settings).generate())
+        assert seed_placements == expected
+
+        aux_data = shuffler.load_fill_state(fill_state)
+        assert aux_data.seed == seed
+        assert _placements(aux_data) == expected
+
+
+def test_load_fill_state_round_trip(default_settings):
+    """Test that filling and loading fill states back into the aux data is lossless."""
+    shuffler = Shuffler('test', default_settings)
+    vanilla = [area.model_dump() for area in shuffler.aux_data.areas]
+    vanilla_items = [check.contents for check in shuffler.checks]
+
+    aux_data = shuffler.generate()
+    assert [area.model_dump() for area in aux_data.areas] != vanilla
+
+    aux_data = shuffler.load_fill_state(shuffler.new_fill_state('test'))
+    assert [area.model_dump() for area in aux_data.areas] == vanilla
+    assert all(check.contents is item for check, item in zip(shuffler.checks, vanilla_items))
+
+
+def test_item_registry(default_settings):
+    """
+    Test that every check shares the interned instance of its item, and that fill states
+    hold the ids of the items.
+    """
+    shuffler = Shuffler('test', default_settings)
+    aux_data = shuffler.aux_data
+    items = [
+        check.contents for area in aux_data.areas for room in area.rooms for check in room.chests
+    ]
+
+    assert all(ITEM_REGISTRY.intern(item) is item for item in items)
+    assert len({id(item) for item in items}) < len(items)
+    assert pickle.loads(pickle.dumps(aux_data.areas[0])).rooms[0].chests[0].contents is (
+        aux_data.areas[0].rooms[0].chests[0].contents
+    )
+
+    # Items without states have the same id in every process
+    assert [ITEM_REGISTRY.id(Item(name=name)) for name in ITEMS] == list(range(len(ITEMS)))
+    item = ITEM_REGISTRY.get('Bombs', {'TestState'})
+    assert ITEM_REGISTRY[ITEM_REGISTRY.id(item)] is item
+    assert ITEM_REGISTRY.get('Bombs', ['TestState']) is item is not ITEM_REGISTRY.get('Bombs')
+
+    with pytest.raises(ValidationError):
+        item.name = 'Bow'
+
+    fill_state = shuffler.new_fill_state('test')
+    assert list(fill_state.slots) == [ITEM_REGISTRY.id(check.contents) for check in shuffler.checks]
+    fill_state.slots[0] = EMPTY
+    assert pickle.loads(pickle.dumps(fill_state)).slots == fill_state.slots
+
+
+def test_item_registry_threads():
+    """Test that items interned from several threads at once get a single id each."""
+    registry = ItemRegistry()
+    names = list(ITEMS)[:20]
+    barrier = threading.Barrier(8)
+
+    def intern_items(thread: int) -> list[int]:
+        barrier.wait()
+        return [registry.id(Item(name=name, states={f'State{i}'})) for i, name in enumerate(names)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(intern_items, range(8)))
+
+    assert all(result == results[0] for result in results)
+    assert len(set(results[0])) == len(names)
+    assert len(registry) == len(ITEMS) + len(names)
+    assert [registry.id(Item(name=name)) for name in ITEMS] == list(range(len(ITEMS)))
+
+
+def test_generate_many(default_settings):
+    """Test that generating seeds concurrently gives the same results as one at a time."""
+    seeds = ['test', 'another_test', 'another_another_test', 'abc']
+
+    expected = [_placements(Shuffler(seed, default_settings).generate()) for seed in seeds]
+
+    fill_states = generate_many(seeds, default_settings, max_workers=3)
+
+    shuffler = Shuffler('template', default_settings)
+    assert [_placements(shuffler.load_fill_state(state)) for state in fill_states] == expected
+    assert [state.seed for state in fill_states] == seeds
+
+
+def test_global_random_state_unchanged(default_settings):
+    """Test that generating a seed doesn't use the global random number generator."""
+    state = random.getstate()
+    Shuffler('test', default_settings).generate()
+    assert random.getstate() == state
+
+
+def test_generate_speculative(default_settings):
+    """
+    Test that speculative fills take the first attempt that succeeds, no matter how many
+    attempts are made at the same time.
+    """
+    seed = 'another_test'
+
+    # Make the attempts one at a time to find the first one that succeeds
+    shuffler = Shuffler(seed, default_settings, max_fill_retries=0)
+    for attempt in itertools.count():
+        fill_state = shuffler.new_fill_state(attempt_seed(seed, attempt))
+        try:
+            shuffler.generate(fill_state)
+            break
+        except AssumedFillFailed:
+            pass
+    # The first attempts for this seed fail, so these are actually skipped
+    assert attempt > 0
+    expected = _placements(shuffler.load_fill_state(fill_state))
+
+    for max_workers in (1, 2):
+        fill_state = generate_speculative(seed, default_settings, max_workers=max_workers)
+        assert fill_state.seed == seed
+        assert _placements(shuffler.load_fill_state(fill_state)) == expected
+
+    with pytest.raises(AssumedFillFailed):
+        generate_speculative(seed, default_settings, max_workers=2, max_attempts=attempt)
+
+
+def test_attempt_worker_loads_serially(default_settings, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that the worker processes of speculative fills don't start process pools, and
+    don't change the environment that processes they start inherit.
+    """
+    monkeypatch.setenv(_parser.LOADER_WORKERS_ENV_VAR, '4')
+    monkeypatch.setattr(_shuffler, '_attempt_shuffler', None)
+
+    def _no_pool(*args, **kwargs):
+        raise AssertionError('Logic files should be loaded in the worker process itself')
+
+    monkeypatch.setattr(_parser, 'ProcessPoolExecutor', _no_pool)
+
+    _shuffler._init_attempt_worker(default_settings, {'loader_workers': 4})
+    assert _shuffler._attempt_shuffler is not None
+    assert os.environ[_parser.LOADER_WORKERS_ENV_VAR] == '4'
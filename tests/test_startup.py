@@ -0,0 +1,109 @@
+from pathlib import Path
+import subprocess
+import sys
+import tomllib
+
+import pytest
+
+from ph_rando.common import load_randomizer_settings
+
+PYPROJECT = Path(__file__).parents[1] / 'pyproject.toml'
+
+ENTRY_POINTS = tomllib.loads(PYPROJECT.read_text())['project']['scripts']
+
+# Budget for the cumulative time it takes to import the module of each entry point, as a
+# multiple of the time it takes to import `REFERENCE_MODULE`. Timing both on the same
+# machine at the same time keeps the budgets independent of how fast the machine is, and
+# of how busy it is with other tests running in parallel. These are deliberately generous
+# (several times the measured import time), so that they only catch regressions like an
+# expensive module being imported eagerly.
+IMPORT_TIME_BUDGETS = {
+    'ph_rando': 1,  # measured: 0.25
+    'ph_rando_shuffler': 12,  # measured: 3.6
+    'ph_rando_patcher': 12,  # measured: 3.6
+}
+
+# Standard library module that import times are compared against. It takes about as long
+# to import as the entry points, and none of them import it.
+REFERENCE_MODULE = 'asyncio'
+
+# Number of fresh interpreters each import is timed in. Only the fastest import counts, so
+# that a single import slowed down by other tests running in parallel doesn't fail the test.
+IMPORT_TIME_RUNS = 5
+
+# Modules that should never be imported just to start up one of the CLIs.
+# They're only needed once the shuffler/patcher/GUI actually run.
+LAZY_MODULES = [
+    'PySide6',
+    'ndspy',
+    'numpy',
+    'pyparsing',
+    'zed',
+    'vidua',
+    'ph_rando.patcher._patcher',
+    'ph_rando.shuffler._shuffler',
+]
+
+
+def _import_times(module: str) -> dict[str, int]:
+    """
+    Import `module` in a new interpreter and return the cumulative import time (in
+    microseconds) of every module it imports.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.removeprefix('import time:').split('|')
+        import_times[name.strip()] = int(cumulative)
+    return import_times
+
+
+def test_entry_point_budgets_exist() -> None:
+    assert IMPORT_TIME_BUDGETS.keys() == ENTRY_POINTS.keys()
+
+
+@pytest.mark.parametrize('entry_point', ENTRY_POINTS)
+def test_entry_point_import_time(entry_point: str) -> None:
+    module = ENTRY_POINTS[entry_point].split(':')[0]
+    assert REFERENCE_MODULE not in _import_times(module)
+
+    # The two imports are timed in turns, so both see the same load on the machine
+    import_times: list[int] = []
+    reference_times: list[int] = []
+    for _ in range(IMPORT_TIME_RUNS):
+        import_times.append(_import_times(module)[module])
+        reference_times.append(_import_times(REFERENCE_MODULE)[REFERENCE_MODULE])
+
+    ratio = min(import_times) / min(reference_times)
+    assert ratio < IMPORT_TIME_BUDGETS[entry_point], (
+        f'Importing {module} took {min(import_times) / 1000:.1f}ms, {ratio:.2f} times as long '
+        f'as importing {REFERENCE_MODULE}; budget is {IMPORT_TIME_BUDGETS[entry_point]} times'
+    )
+
+
+@pytest.mark.parametrize('entry_point', ENTRY_POINTS)
+def test_entry_point_lazy_imports(entry_point: str) -> None:
+    module = ENTRY_POINTS[entry_point].split(':')[0]
+    imported_modules = _import_times(module).keys()
+    assert module in imported_modules
+
+    eagerly_imported = [
+        lazy_module
+        for lazy_module in LAZY_MODULES
+        if any(
+            name == lazy_module or name.startswith(f'{lazy_module}.') for name in imported_modules
+        )
+    ]
+    assert not eagerly_imported, f'{entry_point} eagerly imports {eagerly_imported}'
+
+
+def test_setting_hooks_exist() -> None:
+    """Hooks aren't checked when settings are loaded normally, so make sure they're valid here."""
+    load_randomizer_settings(check_hooks=True)